@@ -14,12 +14,13 @@ import yaml
 
 from abc import ABCMeta, abstractmethod
 from copy import copy
+from itertools import izip
 from operator import itemgetter
 
 from analysis_engine.api_handler import (APIHandlerHTTP,
                                          IncompleteEntryError,
                                          NotFoundError)
-from analysis_engine.library import bearing_and_distance
+from analysis_engine.library import bearings_and_distances_matrix
 
 
 ##############################################################################
@@ -393,15 +394,14 @@ class AnalysisEngineAPIHandlerLocal(AnalysisEngineAPI):
         :returns: Airport dictionary.
         :rtype: dict
         '''
-        airports = []
-        for airport in self.airports:
-            if 'latitude' not in airport or 'longitude' not in airport:
-                continue
-            airport = copy(airport)
-            airport['distance'] = bearing_and_distance(latitude, longitude,
-                                                       airport['latitude'],
-                                                       airport['longitude'])[1]
-            airports.append(airport)
+        airports = [copy(airport) for airport in self.airports
+                    if 'latitude' in airport and 'longitude' in airport]
+        _, distances = bearings_and_distances_matrix(
+            [airport['latitude'] for airport in airports],
+            [airport['longitude'] for airport in airports],
+            [latitude], [longitude])
+        for airport, distance in izip(airports, distances[:, 0]):
+            airport['distance'] = float(distance)
         
         airport = min(airports, key=itemgetter('distance'))
         return airport
@@ -441,15 +441,19 @@ class AnalysisEngineAPIHandlerLocal(AnalysisEngineAPI):
             raise NotFoundError('Local API Handler: Runway could not be found')
 
         runways = []
+        runways_coords = []
         for runway in self.runways:
-            runway = copy(runway)
             runway_coords = runway.get('start', runway.get('end'))
             if not runway_coords:
                 continue
-            runway['distance'] = bearing_and_distance(
-                latitude, longitude, runway_coords['latitude'],
-                runway_coords['longitude'])[1]
-            runways.append(runway)
+            runways.append(copy(runway))
+            runways_coords.append(runway_coords)
+        _, distances = bearings_and_distances_matrix(
+            [runway_coords['latitude'] for runway_coords in runways_coords],
+            [runway_coords['longitude'] for runway_coords in runways_coords],
+            [latitude], [longitude])
+        for runway, distance in izip(runways, distances[:, 0]):
+            runway['distance'] = float(distance)
 
         runway = min(runways, key=itemgetter('distance'))
         return runway
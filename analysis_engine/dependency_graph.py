@@ -1,9 +1,17 @@
+import base64
+import errno
+import json
 import os
+import re
 import sys
 import logging 
 import networkx as nx # pip install networkx or /opt/epd/bin/easy_install networkx
+import tempfile
+import zlib
 
 from collections import deque
+from hashlib import sha256
+from networkx.readwrite import json_graph
 
 from flightdatautilities.dict_helpers import dict_filter
 
@@ -16,6 +24,7 @@ from analysis_engine.node import (
     KeyPointValueNode,
     KeyTimeInstanceNode,
 )
+from analysis_engine.recordtype import recordtype
 
 logger = logging.getLogger(__name__)
 not_windows = sys.platform not in ('win32', 'win64') # False for Windows :-(
@@ -39,6 +48,23 @@ class RequiredNodesMissing(KeyError):
     pass
 
 
+# Result of visiting a node within the current branch path.
+CIRCULAR = object()
+
+# Prefixes of dependency trees encoded by encode_dependency_tree and of the
+# hashes of trees within a registry (see register_dependency_tree).
+COMPACT_TREE_PREFIX = 'compact:'
+TREE_HASH_PREFIX = 'sha256:'
+
+# Labels of nodes within the processing order (see process_order).
+ORDER_LABEL = re.compile(r'^(\d+): ')
+
+# Traversal of a node's dependencies: the dependencies yet to be visited, the
+# available dependencies (layer) and whether a circular dependency was avoided
+# below the node.
+Traversal = recordtype('Traversal', 'node dependencies layer circular')
+
+
 def indent_tree(graph, node, level=0, space='  ', delim='- ', label=True, 
                 recurse_active=True):
     '''
@@ -120,6 +146,12 @@ def dependencies3(di_graph, root, node_mgr):
     Heading -> Heading True + Magnetic Variation
     Heading True -> Heading - Magnetic Variation
     
+    The search is iterative (using a stack rather than recursion) so that
+    deep chains of dependencies cannot exceed Python's recursion limit.
+    Operational nodes are remembered, as are inoperable nodes unless a
+    circular dependency was avoided below them. Those may be operational
+    when reached through a different path, so are traversed again.
+    
     :param di_graph: Directed graph of all nodes and their dependencies.
     :type di_graph: nx.DiGraph
     :param root: Root node to start traversing from, usually named 'root'
@@ -127,42 +159,64 @@ def dependencies3(di_graph, root, node_mgr):
     :param node_mgr: Node manager which can assess whether nodes are operational with the available dependencies at each layer of the tree.
     :type node_mgr: analysis_engine.node.NodeManager
     '''
-    def traverse_tree(node):
-        "Begin the recursion at this node's position in the dependency tree"
-        if node in path:
-            # add node for it to be removed (pop'd) in a moment
-            path.append(node)
+    def visit(node):
+        "Traverse the node's dependencies unless it is known to be (un)available"
+        if node in on_path:
             # we've met this node before; start of circular dependency?
             logger.info("Circular dependency avoided at node '%s'. "
-                        "Branch path: %s", node, path)
-            return False  # establishing if available; cannot yet be available
-        # we're recursing down
-        path.append(node)
+                        "Branch path: %s", node, path + [node])
+            return CIRCULAR
         if node in active_nodes:
             # node already discovered operational
             return True
-        
-        layer = []  # layer of current node's available dependencies
-        for dependency in di_graph.successors(node):
-            # traverse again, 'like we did last summer'
-            if traverse_tree(dependency):
-                layer.append(dependency)
-            # each time traverse_tree returns, remove node from visited path
-            path.pop()
-            
-        if node_mgr.operational(node, layer):
-            # node will work at this level with the available dependencies
-            active_nodes.add(node)
-            ordering.append(node)
-            return True  # layer below works
-        else:
-            # node will not work with available dependencies
+        if node in inoperable_nodes:
+            # node already discovered inoperable through any path
             return False
-        
+        # we're descending
+        path.append(node)
+        on_path.add(node)
+        stack.append(Traversal(node, iter(di_graph.successors(node)), [],
+                               False))
+        return None
+
     ordering = []
-    path = deque()  # current branch path
+    path = []  # current branch path
+    on_path = set()  # nodes within path for fast lookup
     active_nodes = set()  # operational nodes visited for fast lookup
-    traverse_tree(root)  # start recursion
+    inoperable_nodes = set()  # inoperable nodes regardless of path
+    stack = []  # traversals of the nodes within path
+    visit(root)
+    while stack:
+        traversal = stack[-1]
+        for dependency in traversal.dependencies:
+            available = visit(dependency)
+            if available is None:
+                # descend into the dependency before continuing this layer
+                break
+            elif available is CIRCULAR:
+                traversal.circular = True
+            elif available:
+                traversal.layer.append(dependency)
+        else:
+            # all dependencies traversed; ascend
+            stack.pop()
+            path.pop()
+            on_path.remove(traversal.node)
+            available = node_mgr.operational(traversal.node, traversal.layer)
+            if available:
+                # node will work at this level with the available dependencies
+                active_nodes.add(traversal.node)
+                ordering.append(traversal.node)
+            elif not traversal.circular:
+                # node will not work with available dependencies through any
+                # path
+                inoperable_nodes.add(traversal.node)
+            if stack:
+                parent = stack[-1]
+                if available:
+                    parent.layer.append(traversal.node)
+                elif traversal.circular:
+                    parent.circular = True
     return ordering
 
 
@@ -234,6 +288,68 @@ def any_predecessors_in_requested(node_name, requested, graph):
         return False
 
 
+def requested_root_nodes(graph, requested):
+    '''
+    Find the requested nodes which root must be linked to for the tree to
+    include every requested node, i.e. those which no other requested node
+    depends upon either directly or indirectly.
+
+    Rather than searching the predecessors of each requested node, all nodes
+    which are depended upon by a requested node are found with a single
+    search from the requested nodes.
+
+    Requested nodes within a circular dependency are always linked. When
+    reached through another node within the circular dependency,
+    dependencies3 avoids the circular dependency by treating that node as
+    unavailable, which may make the requested node inoperable although it
+    is operational when reached directly from root.
+
+    :param graph: Directed graph of the nodes and their dependencies.
+    :type graph: nx.DiGraph
+    :param requested: Names of the requested nodes.
+    :type requested: list of str
+    :raises nx.NetworkXError: If a requested node is not within the graph.
+    :returns: Names of the requested nodes to link root to, in order of request.
+    :rtype: list of str
+    '''
+    # Nodes which a requested node depends upon.
+    dependencies = set()
+    stack = list(requested)
+    while stack:
+        for successor in graph.successors(stack.pop()):
+            if successor not in dependencies:
+                dependencies.add(successor)
+                stack.append(successor)
+    # Nodes within circular dependencies.
+    circular = set(graph.nodes_with_selfloops())
+    for component in nx.strongly_connected_components(graph):
+        if len(component) > 1:
+            circular.update(component)
+    return [node for node in requested
+            if node not in dependencies or node in circular]
+
+
+def requested_dependencies(node_mgr):
+    '''
+    :param node_mgr: Node manager of the requested and required nodes.
+    :type node_mgr: NodeManager
+    :returns: Names of the requested and required nodes and all of the nodes they depend upon either directly or indirectly.
+    :rtype: set of str
+    '''
+    names = set()
+    stack = list(node_mgr.requested) + list(node_mgr.required)
+    while stack:
+        name = stack.pop()
+        if name in names:
+            continue
+        names.add(name)
+        if name in node_mgr.hdf_keys or name not in node_mgr.derived_nodes:
+            # LFL parameters and missing nodes have no dependencies.
+            continue
+        stack.extend(node_mgr.derived_nodes[name].get_dependency_names())
+    return names
+
+
 def graph_adjacencies(graph):
     '''
     Create a dictionary of each nodes adjacencies within the graph. Useful for
@@ -255,19 +371,224 @@ def graph_adjacencies(graph):
     return data
 
 
-def graph_nodes(node_mgr):
+def _compact_tree_data(graph):
+    """
+    :param graph: Dependency tree graph.
+    :type graph: nx.DiGraph
+    :returns: JSON of the graph's nodes, the distinct attributes of the nodes and the edges between them indexed by node.
+    :rtype: str
+    """
+    node_attrs = dict(graph.nodes(data=True))
+
+    def order(node):
+        match = ORDER_LABEL.match(str(node_attrs[node].get('label', '')))
+        return int(match.group(1)) if match else None
+
+    # Labels of nodes within the processing order are recreated from the
+    # order of the nodes.
+    nodes = sorted(node_attrs, key=order)
+    ordered = all(node_attrs[node].get('label') == '%d: %s' % (n, node)
+                  for n, node in enumerate(nodes))
+    if not ordered:
+        nodes = sorted(node_attrs)
+    index = dict((node, n) for n, node in enumerate(nodes))
+    attributes = []
+    attribute_index = {}
+    node_attributes = []
+    for node in nodes:
+        attrs = node_attrs[node]
+        if ordered:
+            attrs = dict_filter(attrs, remove=['label'])
+        key = json.dumps(attrs, sort_keys=True)
+        if key not in attribute_index:
+            attribute_index[key] = len(attributes)
+            attributes.append(attrs)
+        node_attributes.append(attribute_index[key])
+    edges = []
+    for edge in sorted((index[u], index[v]) for u, v in graph.edges()):
+        edges.extend(edge)
+    return json.dumps({
+        'nodes': nodes,
+        'ordered': ordered,
+        'attributes': attributes,
+        'node_attributes': node_attributes,
+        'edges': edges,
+    }, sort_keys=True, separators=(',', ':'))
+
+
+def _compress_tree_data(data):
+    """
+    :param data: JSON of a graph from _compact_tree_data.
+    :type data: str
+    :returns: Compressed data encoded as ASCII (HDF attributes cannot contain null bytes).
+    :rtype: str
+    """
+    return COMPACT_TREE_PREFIX + base64.b64encode(zlib.compress(data, 9))
+
+
+def encode_dependency_tree(graph):
+    """
+    Encode a dependency tree more compactly than networkx's node-link JSON.
+    Nodes are listed once and edges refer to them by index, each distinct set
+    of node attributes is stored once and the result is compressed.
+
+    :param graph: Dependency tree graph, e.g. the spanning tree returned by dependency_order.
+    :type graph: nx.DiGraph
+    :returns: Encoded graph which decode_dependency_tree reconstructs.
+    :rtype: str
+    """
+    return _compress_tree_data(_compact_tree_data(graph))
+
+
+def decode_dependency_tree(encoded):
+    """
+    :param encoded: Graph encoded by encode_dependency_tree.
+    :type encoded: str
+    :raises ValueError: If encoded is not an encoded graph.
+    :returns: Dependency tree graph.
+    :rtype: nx.DiGraph
+    """
+    if not encoded.startswith(COMPACT_TREE_PREFIX):
+        raise ValueError('Not a compact dependency tree.')
+    data = json.loads(zlib.decompress(
+        base64.b64decode(encoded[len(COMPACT_TREE_PREFIX):])))
+    graph = nx.DiGraph()
+    nodes = data['nodes']
+    for n, (node, attribute_index) in \
+            enumerate(zip(nodes, data['node_attributes'])):
+        attrs = dict(data['attributes'][attribute_index])
+        if data['ordered']:
+            attrs['label'] = '%d: %s' % (n, node)
+        graph.add_node(node, **attrs)
+    edges = data['edges']
+    graph.add_edges_from((nodes[u], nodes[v]) for u, v in
+                         zip(edges[::2], edges[1::2]))
+    return graph
+
+
+def _registry_tree_path(registry_path, tree_hash):
+    """
+    :returns: Path of the file within the registry directory which the tree with the hash is stored in.
+    :rtype: str
+    """
+    return os.path.join(registry_path, tree_hash[len(TREE_HASH_PREFIX):])
+
+
+def register_dependency_tree(graph, path):
+    """
+    Add the compact encoding of a dependency tree to a registry directory
+    shared by flights which are processed with the same trees so that each
+    flight only needs to store the tree's hash.
+
+    Each tree is stored within its own file named by its hash. The file is
+    written to a temporary file within the directory and renamed into place,
+    so processes registering trees at the same time never replace one
+    another's trees and readers never see a partially written tree.
+
+    :param graph: Dependency tree graph.
+    :type graph: nx.DiGraph
+    :param path: Path of the registry directory, created if it does not exist.
+    :type path: str
+    :returns: Hash of the tree which read_dependency_tree finds within the registry.
+    :rtype: str
+    """
+    data = _compact_tree_data(graph)
+    tree_hash = TREE_HASH_PREFIX + sha256(data).hexdigest()
+    tree_path = _registry_tree_path(path, tree_hash)
+    if os.path.exists(tree_path):
+        return tree_hash
+    logger.info("Registering dependency tree '%s' within '%s'.",
+                tree_hash, path)
+    try:
+        os.makedirs(path)
+    except OSError as err:
+        if err.errno != errno.EEXIST:
+            raise
+    fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=path)
+    try:
+        with os.fdopen(fd, 'w') as tree_file:
+            tree_file.write(_compress_tree_data(data))
+        # mkstemp creates the file readable only by its owner. Registered
+        # trees are given the mode of an ordinary file so that they can be
+        # read by other users' processes sharing the registry.
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(temp_path, 0o666 & ~umask)
+        os.rename(temp_path, tree_path)
+    except:
+        os.remove(temp_path)
+        raise
+    return tree_hash
+
+
+def dump_dependency_tree(graph, tree_format='json', registry_path=None):
+    """
+    :param graph: Dependency tree graph.
+    :type graph: nx.DiGraph
+    :param tree_format: 'json' for node-link JSON, 'compact' for encode_dependency_tree or 'hash' for register_dependency_tree.
+    :type tree_format: str
+    :param registry_path: Path of the registry directory to register the tree within if tree_format is 'hash'.
+    :type registry_path: str or None
+    :raises ValueError: If tree_format is unknown.
+    :returns: Dependency tree to store within an HDF file which read_dependency_tree reconstructs.
+    :rtype: str
+    """
+    if tree_format == 'json':
+        return json.dumps(json_graph.node_link_data(graph))
+    elif tree_format == 'compact':
+        return encode_dependency_tree(graph)
+    elif tree_format == 'hash':
+        return register_dependency_tree(graph, registry_path)
+    raise ValueError("Unknown dependency tree format '%s'." % tree_format)
+
+
+def read_dependency_tree(value, registry_path=None):
+    """
+    Reconstruct a dependency tree stored by dump_dependency_tree in any
+    format.
+
+    :param value: Dependency tree attribute of an HDF file: node-link JSON, a compact encoding or the hash of a tree within a registry.
+    :type value: str
+    :param registry_path: Path of the registry directory of trees stored as hashes.
+    :type registry_path: str or None
+    :raises KeyError: If the tree is stored as a hash which is not within the registry.
+    :returns: Dependency tree graph.
+    :rtype: nx.DiGraph
+    """
+    if value.startswith(TREE_HASH_PREFIX):
+        if not registry_path:
+            raise KeyError(value)
+        try:
+            with open(_registry_tree_path(registry_path, value)) as tree_file:
+                value = tree_file.read()
+        except IOError:
+            raise KeyError(value)
+    if value.startswith(COMPACT_TREE_PREFIX):
+        return decode_dependency_tree(value)
+    return json_graph.node_link_graph(json.loads(value))
+
+
+def graph_nodes(node_mgr, prune=False):
     """
     :param node_mgr:
     :type node_mgr: NodeManager
+    :param prune: Only add the requested and required nodes and the nodes they depend upon rather than all LFL parameters and derived nodes.
+    :type prune: bool
     """
     # gr_all will contain all nodes
     gr_all = nx.DiGraph()
+    hdf_keys = node_mgr.hdf_keys
+    derived_minus_lfl = dict_filter(node_mgr.derived_nodes, remove=hdf_keys)
+    if prune:
+        names = requested_dependencies(node_mgr)
+        hdf_keys = [name for name in hdf_keys if name in names]
+        derived_minus_lfl = dict((name, node) for name, node in
+                                 derived_minus_lfl.iteritems()
+                                 if name in names)
     # create nodes without attributes now as you can only add attributes once
     # (limitation of add_node_attribute())
-    gr_all.add_nodes_from(node_mgr.hdf_keys, color='#72f4eb', # turquoise
+    gr_all.add_nodes_from(hdf_keys, color='#72f4eb', # turquoise
                           node_type='HDFNode')
-    derived_minus_lfl = dict_filter(node_mgr.derived_nodes,
-                                    remove=node_mgr.hdf_keys)
     # Group into node types to apply colour. TODO: Make colours less garish.
     colors = {
         ApproachNode: '#663399', # purple
@@ -295,25 +616,20 @@ def graph_nodes(node_mgr):
     # build list of dependencies
     derived_deps = set()  # list of derived dependencies
     for node_name, node_obj in derived_minus_lfl.iteritems():
-        derived_deps.update(node_obj.get_dependency_names())
+        dependency_names = node_obj.get_dependency_names()
+        derived_deps.update(dependency_names)
         # Create edges between node and its dependencies
-        edges = [(node_name, dep, {}) for dep in node_obj.get_dependency_names()]
+        edges = [(node_name, dep, {}) for dep in dependency_names]
         gr_all.add_edges_from(edges)
             
     # add root - the top level application dependency structure based on required nodes
     # filter only nodes which are at the top of the tree (no predecessors)
     # TODO: Ask Chris about this causing problems with the trimmer.
+    # No need to link root to requested nodes which other requested nodes
+    # depend upon as the tree will be built inclusive of them.
+    root_edges = [('root', node_req) for node_req in
+                  requested_root_nodes(gr_all, node_mgr.requested)]
     gr_all.add_node('root', color='#ffffff')
-    root_edges = []
-    for node_req in node_mgr.requested:
-        if any_predecessors_in_requested(node_req, node_mgr.requested, gr_all):
-            # no need to link root to this requested node as one of it's
-            # predecessors will have the link therefore the tree will be
-            # built inclusive of this node.
-            continue
-        else:
-            # This node is required to build the tree
-            root_edges.append(('root', node_req))
     gr_all.add_edges_from(root_edges) ##, color='red')
     
     #TODO: Split this up into the following lists of nodes
@@ -424,7 +740,7 @@ def remove_floating_nodes(graph):
      
      
 def dependency_order(node_mgr, draw=not_windows,
-                     raise_inoperable_requested=False):
+                     raise_inoperable_requested=False, prune=False):
     """
     Main method for retrieving processing order of nodes.
     
@@ -432,10 +748,12 @@ def dependency_order(node_mgr, draw=not_windows,
     :type node_mgr: NodeManager
     :param draw: Will draw the graph. Green nodes are available LFL params, Blue are operational derived, Black are not requested derived, Red are active top level requested params, Grey are inactive params. Edges are labelled with processing order.
     :type draw: boolean
+    :param prune: Only build the graph from the requested and required nodes and their dependencies. The processing order is unchanged, but the drawn Dependency Tree will not include unused nodes.
+    :type prune: boolean
     :returns: List of Nodes determining the order for processing and the spanning tree graph.
     :rtype: (list of strings, dict)
     """
-    _graph = graph_nodes(node_mgr)
+    _graph = graph_nodes(node_mgr, prune=prune)
     gr_all, gr_st, order = process_order(_graph, node_mgr,
                                          raise_inoperable_requested)
     
@@ -10,7 +10,7 @@ from flightdatautilities import aircrafttables as at, units as ut
 
 from analysis_engine.exceptions import DataFrameError
 from analysis_engine.node import (
-    A, App, DerivedParameterNode, KPV, KTI, M, P, S,
+    A, App, DerivedParameterNode, EngineAggregateNode, KPV, KTI, M, P, S,
 )
 from analysis_engine.library import (actuator_mismatch,
                                      air_track,
@@ -2021,7 +2021,7 @@ class BrakePressure(DerivedParameterNode):
 # Engine EPR
 
 
-class Eng_EPRAvg(DerivedParameterNode):
+class Eng_EPRAvg(EngineAggregateNode):
     '''
     '''
 
@@ -2040,12 +2040,11 @@ class Eng_EPRAvg(DerivedParameterNode):
                eng3=P('Eng (3) EPR'),
                eng4=P('Eng (4) EPR')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.average(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).avg
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_EPRMax(DerivedParameterNode):
+class Eng_EPRMax(EngineAggregateNode):
     '''
     '''
 
@@ -2064,12 +2063,11 @@ class Eng_EPRMax(DerivedParameterNode):
                eng3=P('Eng (3) EPR'),
                eng4=P('Eng (4) EPR')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_EPRMin(DerivedParameterNode):
+class Eng_EPRMin(EngineAggregateNode):
     '''
     '''
 
@@ -2088,8 +2086,7 @@ class Eng_EPRMin(DerivedParameterNode):
                eng3=P('Eng (3) EPR'),
                eng4=P('Eng (4) EPR')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.min(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).min
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
@@ -2124,7 +2121,7 @@ class EngTPRLimitDifference(DerivedParameterNode):
         self.array = eng_tpr_max.array - eng_tpr_limit.array
 
 
-class Eng_TPRMax(DerivedParameterNode):
+class Eng_TPRMax(EngineAggregateNode):
     '''
     '''
 
@@ -2143,12 +2140,11 @@ class Eng_TPRMax(DerivedParameterNode):
                eng3=P('Eng (3) TPR'),
                eng4=P('Eng (4) TPR')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_TPRMin(DerivedParameterNode):
+class Eng_TPRMin(EngineAggregateNode):
     '''
     '''
 
@@ -2167,8 +2163,7 @@ class Eng_TPRMin(DerivedParameterNode):
                eng3=P('Eng (3) TPR'),
                eng4=P('Eng (4) TPR')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.min(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).min
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
@@ -2176,7 +2171,7 @@ class Eng_TPRMin(DerivedParameterNode):
 # Engine Fuel Flow
 
 
-class Eng_FuelFlow(DerivedParameterNode):
+class Eng_FuelFlow(EngineAggregateNode):
     '''
     '''
 
@@ -2196,12 +2191,11 @@ class Eng_FuelFlow(DerivedParameterNode):
                eng4=P('Eng (4) Fuel Flow')):
 
         # assume all engines Fuel Flow are record at the same frequency
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.sum(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).sum
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_FuelFlowMin(DerivedParameterNode):
+class Eng_FuelFlowMin(EngineAggregateNode):
     '''
     The minimum recorded Fuel Flow across all engines.
     
@@ -2225,8 +2219,7 @@ class Eng_FuelFlowMin(DerivedParameterNode):
                eng3=P('Eng (3) Fuel Flow'),
                eng4=P('Eng (4) Fuel Flow')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.min(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).min
 
         
 ###############################################################################
@@ -2297,7 +2290,7 @@ class Eng_4_FuelBurn(DerivedParameterNode):
         self.array = np.ma.array(integrate(flow / 3600.0, ff.frequency))
 
 
-class Eng_FuelBurn(DerivedParameterNode):
+class Eng_FuelBurn(EngineAggregateNode):
     '''
     '''
 
@@ -2316,8 +2309,7 @@ class Eng_FuelBurn(DerivedParameterNode):
                eng3=P('Eng (3) Fuel Burn'),
                eng4=P('Eng (4) Fuel Burn')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.sum(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).sum
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
@@ -2325,7 +2317,7 @@ class Eng_FuelBurn(DerivedParameterNode):
 # Engine Gas Temperature
 
 
-class Eng_GasTempAvg(DerivedParameterNode):
+class Eng_GasTempAvg(EngineAggregateNode):
     '''
     '''
 
@@ -2344,12 +2336,11 @@ class Eng_GasTempAvg(DerivedParameterNode):
                eng3=P('Eng (3) Gas Temp'),
                eng4=P('Eng (4) Gas Temp')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.average(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).avg
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_GasTempMax(DerivedParameterNode):
+class Eng_GasTempMax(EngineAggregateNode):
     '''
     '''
 
@@ -2368,12 +2359,11 @@ class Eng_GasTempMax(DerivedParameterNode):
                eng3=P('Eng (3) Gas Temp'),
                eng4=P('Eng (4) Gas Temp')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_GasTempMin(DerivedParameterNode):
+class Eng_GasTempMin(EngineAggregateNode):
     '''
     '''
 
@@ -2392,8 +2382,7 @@ class Eng_GasTempMin(DerivedParameterNode):
                eng3=P('Eng (3) Gas Temp'),
                eng4=P('Eng (4) Gas Temp')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.min(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).min
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
@@ -2401,7 +2390,7 @@ class Eng_GasTempMin(DerivedParameterNode):
 # Engine N1
 
 
-class Eng_N1Avg(DerivedParameterNode):
+class Eng_N1Avg(EngineAggregateNode):
     '''
     This returns the avaerage N1 in any sample period for up to four engines.
 
@@ -2425,11 +2414,10 @@ class Eng_N1Avg(DerivedParameterNode):
                eng3=P('Eng (3) N1'),
                eng4=P('Eng (4) N1')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.average(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).avg
 
 
-class Eng_N1Max(DerivedParameterNode):
+class Eng_N1Max(EngineAggregateNode):
     '''
     This returns the highest N1 in any sample period for up to four engines.
 
@@ -2453,11 +2441,10 @@ class Eng_N1Max(DerivedParameterNode):
                eng3=P('Eng (3) N1'),
                eng4=P('Eng (4) N1')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
 
 
-class Eng_N1Min(DerivedParameterNode):
+class Eng_N1Min(EngineAggregateNode):
     '''
     This returns the lowest N1 in any sample period for up to four engines.
 
@@ -2481,8 +2468,7 @@ class Eng_N1Min(DerivedParameterNode):
                eng3=P('Eng (3) N1'),
                eng4=P('Eng (4) N1')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.min(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).min
 
 
 class Eng_N1MinFor5Sec(DerivedParameterNode):
@@ -2506,7 +2492,7 @@ class Eng_N1MinFor5Sec(DerivedParameterNode):
 # Engine N2
 
 
-class Eng_N2Avg(DerivedParameterNode):
+class Eng_N2Avg(EngineAggregateNode):
     '''
     This returns the avaerage N2 in any sample period for up to four engines.
 
@@ -2530,11 +2516,10 @@ class Eng_N2Avg(DerivedParameterNode):
                eng3=P('Eng (3) N2'),
                eng4=P('Eng (4) N2')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.average(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).avg
 
 
-class Eng_N2Max(DerivedParameterNode):
+class Eng_N2Max(EngineAggregateNode):
     '''
     This returns the highest N2 in any sample period for up to four engines.
 
@@ -2558,11 +2543,10 @@ class Eng_N2Max(DerivedParameterNode):
                eng3=P('Eng (3) N2'),
                eng4=P('Eng (4) N2')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
 
 
-class Eng_N2Min(DerivedParameterNode):
+class Eng_N2Min(EngineAggregateNode):
     '''
     This returns the lowest N2 in any sample period for up to four engines.
 
@@ -2586,15 +2570,14 @@ class Eng_N2Min(DerivedParameterNode):
                eng3=P('Eng (3) N2'),
                eng4=P('Eng (4) N2')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.min(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).min
 
 
 ################################################################################
 # Engine N3
 
 
-class Eng_N3Avg(DerivedParameterNode):
+class Eng_N3Avg(EngineAggregateNode):
     '''
     This returns the average N3 in any sample period for up to four engines.
 
@@ -2618,11 +2601,10 @@ class Eng_N3Avg(DerivedParameterNode):
                eng3=P('Eng (3) N3'),
                eng4=P('Eng (4) N3')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.average(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).avg
 
 
-class Eng_N3Max(DerivedParameterNode):
+class Eng_N3Max(EngineAggregateNode):
     '''
     This returns the highest N3 in any sample period for up to four engines.
 
@@ -2646,11 +2628,10 @@ class Eng_N3Max(DerivedParameterNode):
                eng3=P('Eng (3) N3'),
                eng4=P('Eng (4) N3')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
 
 
-class Eng_N3Min(DerivedParameterNode):
+class Eng_N3Min(EngineAggregateNode):
     '''
     This returns the lowest N3 in any sample period for up to four engines.
 
@@ -2674,15 +2655,14 @@ class Eng_N3Min(DerivedParameterNode):
                eng3=P('Eng (3) N3'),
                eng4=P('Eng (4) N3')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.min(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).min
 
 
 ################################################################################
 # Engine Np
 
 
-class Eng_NpAvg(DerivedParameterNode):
+class Eng_NpAvg(EngineAggregateNode):
     '''
     This returns the average Np in any sample period for up to four engines.
 
@@ -2706,11 +2686,10 @@ class Eng_NpAvg(DerivedParameterNode):
                eng3=P('Eng (3) Np'),
                eng4=P('Eng (4) Np')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.average(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).avg
 
 
-class Eng_NpMax(DerivedParameterNode):
+class Eng_NpMax(EngineAggregateNode):
     '''
     This returns the highest Np in any sample period for up to four engines.
 
@@ -2734,11 +2713,10 @@ class Eng_NpMax(DerivedParameterNode):
                eng3=P('Eng (3) Np'),
                eng4=P('Eng (4) Np')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
 
 
-class Eng_NpMin(DerivedParameterNode):
+class Eng_NpMin(EngineAggregateNode):
     '''
     This returns the lowest Np in any sample period for up to four engines.
 
@@ -2762,15 +2740,14 @@ class Eng_NpMin(DerivedParameterNode):
                eng3=P('Eng (3) Np'),
                eng4=P('Eng (4) Np')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.min(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).min
 
 
 ################################################################################
 # Engine Oil Pressure
 
 
-class Eng_OilPressAvg(DerivedParameterNode):
+class Eng_OilPressAvg(EngineAggregateNode):
     '''
     '''
 
@@ -2789,12 +2766,11 @@ class Eng_OilPressAvg(DerivedParameterNode):
                eng3=P('Eng (3) Oil Press'),
                eng4=P('Eng (4) Oil Press')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.average(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).avg
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_OilPressMax(DerivedParameterNode):
+class Eng_OilPressMax(EngineAggregateNode):
     '''
     '''
 
@@ -2813,12 +2789,11 @@ class Eng_OilPressMax(DerivedParameterNode):
                eng3=P('Eng (3) Oil Press'),
                eng4=P('Eng (4) Oil Press')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_OilPressMin(DerivedParameterNode):
+class Eng_OilPressMin(EngineAggregateNode):
     '''
     '''
 
@@ -2837,8 +2812,7 @@ class Eng_OilPressMin(DerivedParameterNode):
                eng3=P('Eng (3) Oil Press'),
                eng4=P('Eng (4) Oil Press')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.min(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).min
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
@@ -2846,7 +2820,7 @@ class Eng_OilPressMin(DerivedParameterNode):
 # Engine Oil Quantity
 
 
-class Eng_OilQtyAvg(DerivedParameterNode):
+class Eng_OilQtyAvg(EngineAggregateNode):
     '''
     '''
 
@@ -2865,12 +2839,11 @@ class Eng_OilQtyAvg(DerivedParameterNode):
                eng3=P('Eng (3) Oil Qty'),
                eng4=P('Eng (4) Oil Qty')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.average(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).avg
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_OilQtyMax(DerivedParameterNode):
+class Eng_OilQtyMax(EngineAggregateNode):
     '''
     '''
 
@@ -2889,12 +2862,11 @@ class Eng_OilQtyMax(DerivedParameterNode):
                eng3=P('Eng (3) Oil Qty'),
                eng4=P('Eng (4) Oil Qty')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_OilQtyMin(DerivedParameterNode):
+class Eng_OilQtyMin(EngineAggregateNode):
     '''
     '''
 
@@ -2913,8 +2885,7 @@ class Eng_OilQtyMin(DerivedParameterNode):
                eng3=P('Eng (3) Oil Qty'),
                eng4=P('Eng (4) Oil Qty')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.min(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).min
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
@@ -2922,7 +2893,7 @@ class Eng_OilQtyMin(DerivedParameterNode):
 # Engine Oil Temperature
 
 
-class Eng_OilTempAvg(DerivedParameterNode):
+class Eng_OilTempAvg(EngineAggregateNode):
     '''
     '''
 
@@ -2941,8 +2912,7 @@ class Eng_OilTempAvg(DerivedParameterNode):
                eng3=P('Eng (3) Oil Temp'),
                eng4=P('Eng (4) Oil Temp')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        avg_array = np.ma.average(engines, axis=0)
+        avg_array = self.engine_aggregates(eng1, eng2, eng3, eng4).avg
         if np.ma.count(avg_array) != 0:
             self.array = avg_array
             self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
@@ -2952,7 +2922,7 @@ class Eng_OilTempAvg(DerivedParameterNode):
             self.array = np_ma_masked_zeros_like(avg_array)
 
 
-class Eng_OilTempMax(DerivedParameterNode):
+class Eng_OilTempMax(EngineAggregateNode):
     '''
     '''
 
@@ -2971,8 +2941,7 @@ class Eng_OilTempMax(DerivedParameterNode):
                eng3=P('Eng (3) Oil Temp'),
                eng4=P('Eng (4) Oil Temp')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        max_array = np.ma.max(engines, axis=0)
+        max_array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
         if np.ma.count(max_array) != 0:
             self.array = max_array
             self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
@@ -2982,7 +2951,7 @@ class Eng_OilTempMax(DerivedParameterNode):
             self.array = np_ma_masked_zeros_like(max_array)
 
 
-class Eng_OilTempMin(DerivedParameterNode):
+class Eng_OilTempMin(EngineAggregateNode):
     '''
     '''
 
@@ -3001,8 +2970,7 @@ class Eng_OilTempMin(DerivedParameterNode):
                eng3=P('Eng (3) Oil Temp'),
                eng4=P('Eng (4) Oil Temp')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        min_array = np.ma.min(engines, axis=0)
+        min_array = self.engine_aggregates(eng1, eng2, eng3, eng4).min
         if np.ma.count(min_array) != 0:
             self.array = min_array
             self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
@@ -3016,7 +2984,7 @@ class Eng_OilTempMin(DerivedParameterNode):
 # Engine Torque
 
 
-class Eng_TorqueAvg(DerivedParameterNode):
+class Eng_TorqueAvg(EngineAggregateNode):
     '''
     '''
 
@@ -3035,12 +3003,11 @@ class Eng_TorqueAvg(DerivedParameterNode):
                eng3=P('Eng (3) Torque'),
                eng4=P('Eng (4) Torque')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.average(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).avg
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_TorqueMax(DerivedParameterNode):
+class Eng_TorqueMax(EngineAggregateNode):
     '''
     '''
 
@@ -3059,12 +3026,11 @@ class Eng_TorqueMax(DerivedParameterNode):
                eng3=P('Eng (3) Torque'),
                eng4=P('Eng (4) Torque')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_TorqueMin(DerivedParameterNode):
+class Eng_TorqueMin(EngineAggregateNode):
     '''
     '''
 
@@ -3083,12 +3049,11 @@ class Eng_TorqueMin(DerivedParameterNode):
                eng3=P('Eng (3) Torque'),
                eng4=P('Eng (4) Torque')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.min(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).min
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_TorquePercentAvg(DerivedParameterNode):
+class Eng_TorquePercentAvg(EngineAggregateNode):
     '''
     '''
 
@@ -3107,12 +3072,11 @@ class Eng_TorquePercentAvg(DerivedParameterNode):
                eng3=P('Eng (3) Torque [%]'),
                eng4=P('Eng (4) Torque [%]')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.average(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).avg
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_TorquePercentMax(DerivedParameterNode):
+class Eng_TorquePercentMax(EngineAggregateNode):
     '''
     '''
 
@@ -3131,12 +3095,11 @@ class Eng_TorquePercentMax(DerivedParameterNode):
                eng3=P('Eng (3) Torque [%]'),
                eng4=P('Eng (4) Torque [%]')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
-class Eng_TorquePercentMin(DerivedParameterNode):
+class Eng_TorquePercentMin(EngineAggregateNode):
     '''
     '''
 
@@ -3155,8 +3118,7 @@ class Eng_TorquePercentMin(DerivedParameterNode):
                eng3=P('Eng (3) Torque [%]'),
                eng4=P('Eng (4) Torque [%]')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.min(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).min
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
@@ -3164,7 +3126,7 @@ class Eng_TorquePercentMin(DerivedParameterNode):
 # Engine Vibration (N1)
 
 
-class Eng_VibN1Max(DerivedParameterNode):
+class Eng_VibN1Max(EngineAggregateNode):
     '''
     This derived parameter condenses all the available first shaft order
     vibration measurements into a single consolidated value.
@@ -3189,8 +3151,7 @@ class Eng_VibN1Max(DerivedParameterNode):
                lpt1=P('Eng (1) Vib N1 Turbine'),
                lpt2=P('Eng (2) Vib N1 Turbine')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4, fan1, fan2, lpt1, lpt2)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4, fan1, fan2, lpt1, lpt2).max
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4, fan1, fan2, lpt1, lpt2])
 
 
@@ -3198,7 +3159,7 @@ class Eng_VibN1Max(DerivedParameterNode):
 # Engine Vibration (N2)
 
 
-class Eng_VibN2Max(DerivedParameterNode):
+class Eng_VibN2Max(EngineAggregateNode):
     '''
     This derived parameter condenses all the available second shaft order
     vibration measurements into a single consolidated value.
@@ -3223,8 +3184,7 @@ class Eng_VibN2Max(DerivedParameterNode):
                hpt1=P('Eng (1) Vib N2 Turbine'),
                hpt2=P('Eng (2) Vib N2 Turbine')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4, hpc1, hpc2, hpt1, hpt2)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4, hpc1, hpc2, hpt1, hpt2).max
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4, hpc1, hpc2, hpt1, hpt2])
 
 
@@ -3232,7 +3192,7 @@ class Eng_VibN2Max(DerivedParameterNode):
 # Engine Vibration (N3)
 
 
-class Eng_VibN3Max(DerivedParameterNode):
+class Eng_VibN3Max(EngineAggregateNode):
     '''
     This derived parameter condenses all the available third shaft order
     vibration measurements into a single consolidated value.
@@ -3253,8 +3213,7 @@ class Eng_VibN3Max(DerivedParameterNode):
                eng3=P('Eng (3) Vib N3'),
                eng4=P('Eng (4) Vib N3')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
@@ -3262,7 +3221,7 @@ class Eng_VibN3Max(DerivedParameterNode):
 # Engine Vibration (Broadband)
 
 
-class Eng_VibBroadbandMax(DerivedParameterNode):
+class Eng_VibBroadbandMax(EngineAggregateNode):
     '''
     This derived parameter condenses all the available third shaft order
     vibration measurements into a single consolidated value.
@@ -3295,8 +3254,7 @@ class Eng_VibBroadbandMax(DerivedParameterNode):
                   eng1_accel_a, eng2_accel_a, eng3_accel_a, eng4_accel_a,
                   eng1_accel_b, eng2_accel_b, eng3_accel_b, eng4_accel_b)
 
-        engines = vstack_params(*params)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(*params).max
         self.offset = offset_select('mean', params)
 
 
@@ -3304,7 +3262,7 @@ class Eng_VibBroadbandMax(DerivedParameterNode):
 # Engine Vibration (A)
 
 
-class Eng_VibAMax(DerivedParameterNode):
+class Eng_VibAMax(EngineAggregateNode):
     '''
     This derived parameter condenses all the available first shaft order
     vibration measurements into a single consolidated value.
@@ -3325,8 +3283,7 @@ class Eng_VibAMax(DerivedParameterNode):
                eng3=P('Eng (3) Vib (A)'),
                eng4=P('Eng (4) Vib (A)')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
@@ -3334,7 +3291,7 @@ class Eng_VibAMax(DerivedParameterNode):
 # Engine Vibration (B)
 
 
-class Eng_VibBMax(DerivedParameterNode):
+class Eng_VibBMax(EngineAggregateNode):
     '''
     This derived parameter condenses all the available second shaft order
     vibration measurements into a single consolidated value.
@@ -3355,8 +3312,7 @@ class Eng_VibBMax(DerivedParameterNode):
                eng3=P('Eng (3) Vib (B)'),
                eng4=P('Eng (4) Vib (B)')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
@@ -3364,7 +3320,7 @@ class Eng_VibBMax(DerivedParameterNode):
 # Engine Vibration (C)
 
 
-class Eng_VibCMax(DerivedParameterNode):
+class Eng_VibCMax(EngineAggregateNode):
     '''
     This derived parameter condenses all the available third shaft order
     vibration measurements into a single consolidated value.
@@ -3385,8 +3341,7 @@ class Eng_VibCMax(DerivedParameterNode):
                eng3=P('Eng (3) Vib (C)'),
                eng4=P('Eng (4) Vib (C)')):
 
-        engines = vstack_params(eng1, eng2, eng3, eng4)
-        self.array = np.ma.max(engines, axis=0)
+        self.array = self.engine_aggregates(eng1, eng2, eng3, eng4).max
         self.offset = offset_select('mean', [eng1, eng2, eng3, eng4])
 
 
@@ -3563,6 +3518,8 @@ class FlapAngle(DerivedParameterNode):
 
     align = False
     units = ut.DEGREE
+    # Flap angles do not need the precision of other angles in degrees.
+    storage_dtype = 'float32'
 
     @classmethod
     def can_operate(cls, available, family=A('Family')):
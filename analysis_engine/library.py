@@ -1,11 +1,12 @@
 import logging
 import numpy as np
 
-from collections import OrderedDict, namedtuple
+from collections import namedtuple
 from datetime import datetime, timedelta
 from hashlib import sha256
 from itertools import izip, izip_longest
 from math import asin, atan2, ceil, cos, degrees, floor, radians, sin, sqrt
+from operator import gt, lt
 from scipy import interpolate as scipy_interpolate, optimize
 
 from hdfaccess.parameter import MappedArray
@@ -27,6 +28,7 @@ deg2rad = radians(1.0)
 logger = logging.getLogger(name=__name__)
 
 Value = namedtuple('Value', 'index value')
+EngineAggregates = namedtuple('EngineAggregates', 'avg max min sum')
 
 
 class InvalidDatetime(ValueError):
@@ -542,6 +544,25 @@ def bearings_and_distances(latitudes, longitudes, reference):
     lat_ref = radians(reference['latitude'])
     lon_ref = radians(reference['longitude'])
 
+    brgs, dists = _bearings_and_distances(lat_array, lon_array,
+                                          lat_ref, lon_ref)
+
+    joined_mask = np.logical_or(latitudes.mask, longitudes.mask)
+    brg_array = np.ma.array(data=np.rad2deg(brgs) % 360,
+                            mask=joined_mask)
+    dist_array = np.ma.array(data=dists,
+                             mask=joined_mask)
+
+    return brg_array, dist_array
+
+
+def _bearings_and_distances(lat_array, lon_array, lat_ref, lon_ref):
+    """
+    Haversine distances and initial bearings of points from reference points.
+    The arguments are in radians and are broadcast against each other.
+
+    :returns brgs, dists: Bearings in radians (-pi to pi), Distances in metres.
+    """
     dlat = lat_array - lat_ref
     dlon = lon_array - lon_ref
 
@@ -555,13 +576,59 @@ def bearings_and_distances(latitudes, longitudes, reference):
     x = np.ma.cos(lat_ref) * np.ma.sin(lat_array) \
         - np.ma.sin(lat_ref) * np.ma.cos(lat_array) * np.ma.cos(dlon)
     brgs = np.ma.arctan2(y,x)
+    return brgs, dists
 
-    joined_mask = np.logical_or(latitudes.mask, longitudes.mask)
-    brg_array = np.ma.array(data=np.rad2deg(brgs) % 360,
-                            mask=joined_mask)
-    dist_array = np.ma.array(data=dists,
-                             mask=joined_mask)
 
+def bearings_and_distances_matrix(latitudes, longitudes, ref_latitudes,
+                                  ref_longitudes, chunk_size=2**20):
+    """
+    Returns the bearings and distances of every point of a track with respect
+    to each of a number of fixed points, e.g. a flight path against all
+    known airports.
+
+    Usage:
+    brg[][], dist[][] = bearings_and_distances_matrix(lat[], lon[], ref_lat[], ref_lon[])
+
+    brg[i][j] and dist[i][j] are equal to the results of
+    bearings_and_distances(lat[i], lon[i], {'latitude': ref_lat[j], 'longitude': ref_lon[j]}).
+
+    :param latitudes: The latitudes of the track (N points).
+    :type latitudes: Numpy masked array.
+    :param longitudes: The longitudes of the track (N points).
+    :type longitudes: Numpy masked array.
+    :param ref_latitudes: The latitudes of the fixed points (M points).
+    :type ref_latitudes: Sequence of floats in degrees.
+    :param ref_longitudes: The longitudes of the fixed points (M points).
+    :type ref_longitudes: Sequence of floats in degrees.
+    :param chunk_size: Approximate number of point pairs to compute at a time to bound the memory used.
+    :type chunk_size: int
+
+    :returns bearings, distances: Bearings in degrees, Distances in metres.
+    :type distances: Two Numpy masked arrays of shape (N, M), masked where the track is masked.
+    """
+    latitudes = np.ma.asarray(latitudes, dtype=float).ravel()
+    longitudes = np.ma.asarray(longitudes, dtype=float).ravel()
+    lat_refs = np.asarray(ref_latitudes, dtype=float).ravel() * deg2rad
+    lon_refs = np.asarray(ref_longitudes, dtype=float).ravel() * deg2rad
+    rows, cols = len(latitudes), len(lat_refs)
+
+    lat_array = latitudes * deg2rad
+    lon_array = longitudes * deg2rad
+    brg_array = np.ma.zeros((rows, cols))
+    dist_array = np.ma.zeros((rows, cols))
+    step = max(1, chunk_size // max(cols, 1))
+    for start in xrange(0, rows, step):
+        stop = start + step
+        brgs, dists = _bearings_and_distances(
+            lat_array[start:stop, np.newaxis],
+            lon_array[start:stop, np.newaxis], lat_refs, lon_refs)
+        brg_array[start:stop] = np.rad2deg(brgs) % 360
+        dist_array[start:stop] = dists
+
+    joined_mask = np.ma.getmaskarray(latitudes) | \
+        np.ma.getmaskarray(longitudes)
+    brg_array[joined_mask] = np.ma.masked
+    dist_array[joined_mask] = np.ma.masked
     return brg_array, dist_array
 
 """
@@ -617,8 +684,7 @@ def calculate_timebase(years, months, days, hours, mins, secs):
     WARNING: If at all times, one or more of the parameters are masked, you
     willnot get a valid timestamp and an exception will be raised.
 
-    Note: if uneven arrays are passed in, they are assumed by izip that the
-    start is valid and the uneven ends are invalid and skipped over.
+    Arrays of uneven length raise a ValueError.
 
     Supports years as a 2 digits - e.g. "11" is "2011"
 
@@ -628,54 +694,77 @@ def calculate_timebase(years, months, days, hours, mins, secs):
     :rtype: datetime
     :raises: InvalidDatetime if no valid timestamps provided
     """
-    base_dt = None
-    # Calculate current year here and pass into
-    # convert_two_digit_to_four_digit_year to save calculating year for every
-    # second of flight
-    current_year = str(datetime.now().year)
-    # OrderedDict so if all values are the same, max will consistently take the
-    # first val on repeated runs
-    clock_variation = OrderedDict()
-
     if not len(years) == len(months) == len(days) == \
        len(hours) == len(mins) == len(secs):
         raise ValueError("Arrays must be of same length")
 
-    for step, (yr, mth, day, hr, mn, sc) in enumerate(izip(years, months, days, hours, mins, secs)):
-        #TODO: Try using numpy datetime functions for speedup?
-        #try:
-            #date = np.datetime64('%d-%d-%d' % (yr, mth, day), 'D')
-        #except np.core._mx_datetime_parser.RangeError  :
-            #continue
-        # same for time?
+    years, months, days, hours, mins, secs = \
+        [_timebase_component(a) for a in (years, months, days, hours, mins,
+                                          secs)]
+    # Years with 2 digits are converted to 4 digits before truncation.
+    # (see convert_two_digit_to_four_digit_year).
+    current_year = str(datetime.now().year)
+    century = int(current_year[:2]) * 100
+    with np.errstate(invalid='ignore'):
+        two_digit = years < 100
+        years[two_digit] += np.where(years[two_digit] > int(current_year[2:]),
+                                     century - 100, century)
+        years, months, days, hours, mins, secs = \
+            [np.trunc(a) for a in (years, months, days, hours, mins, secs)]
+        # Samples which are masked or not valid datetimes are ignored. NaN
+        # values are never within range.
+        valid = ((years >= 1) & (years <= 9999) & (months >= 1) &
+                 (months <= 12) & (days >= 1) & (hours >= 0) &
+                 (hours <= 23) & (mins >= 0) & (mins <= 59) & (secs >= 0) &
+                 (secs <= 59))
+    steps = np.flatnonzero(valid)
+    month_starts = ((years[steps].astype(np.int64) - 1970) * 12 +
+                    months[steps].astype(np.int64) - 1).astype('datetime64[M]')
+    month_days = ((month_starts + 1).astype('datetime64[D]') -
+                  month_starts.astype('datetime64[D]')).astype(np.int64)
+    in_month = days[steps] <= month_days
+    steps = steps[in_month]
+    if not len(steps):
+        # No valid datestamps found
+        raise InvalidDatetime("No valid datestamps found")
+    timestamps = (month_starts[in_month].astype('datetime64[D]') -
+                  np.datetime64('1970-01-01', 'D')).astype(np.int64) * 86400
+    timestamps += (days[steps].astype(np.int64) - 1) * 86400 + \
+        hours[steps].astype(np.int64) * 3600 + \
+        mins[steps].astype(np.int64) * 60 + secs[steps].astype(np.int64)
+
+    # The start of data according to each sample. The most common start is
+    # used with ties going to the start which occurs first.
+    starts, first_index, inverse = np.unique(
+        timestamps - steps, return_index=True, return_inverse=True)
+    counts = np.bincount(inverse)
+    most_common = counts == counts.max()
+    start = starts[most_common][np.argmin(first_index[most_common])]
+    return datetime(1970, 1, 1) + timedelta(seconds=int(start))
+
+
+def _timebase_component(values):
+    """
+    Converts time elements into a float array for calculate_timebase with
+    masked or missing (None) values as NaN.
 
-        if yr is not None and yr is not np.ma.masked and yr < 100:
-            yr = convert_two_digit_to_four_digit_year(yr, current_year)
+    :type values: iterable of numeric type
+    :rtype: np.array(dtype=float)
+    """
+    if isinstance(values, np.ndarray) and values.dtype.kind in 'biuf':
+        array = np.ma.getdata(values).astype(np.float64)
+        array[np.ma.getmaskarray(values)] = np.nan
+        return array
 
+    def to_float(value):
+        if value is np.ma.masked:
+            return np.nan
         try:
-            dt = datetime(int(yr), int(mth), int(day), int(hr), int(mn), int(sc))
+            return float(value)
         except (ValueError, TypeError, np.ma.core.MaskError):
-            # ValueError is raised if values are out of range, e.g. 0..59.
-            # Q: Should we validate these parameters and switch to fallback_dt
-            #    if it fails?
-            continue
-        if not base_dt:
-            base_dt = dt # store reference datetime
-        # calc diff from base
-        diff = dt - base_dt - timedelta(seconds=step)
-        ##print "%02d - %s %s" % (step, dt, diff)
-        try:
-            clock_variation[diff] += 1
-        except KeyError:
-            # new difference
-            clock_variation[diff] = 1
-    if base_dt:
-        # return most regular difference
-        clock_delta = max(clock_variation, key=clock_variation.get)
-        return base_dt + clock_delta
-    else:
-        # No valid datestamps found
-        raise InvalidDatetime("No valid datestamps found")
+            return np.nan
+
+    return np.array([to_float(v) for v in values], dtype=np.float64)
 
 
 def convert_two_digit_to_four_digit_year(yr, current_year):
@@ -1445,6 +1534,60 @@ def compress_iter_repr(iterable, cast=None, join='+'):
     return join.join(entries)
 
 
+def engine_aggregates(*params):
+    '''
+    Calculate the average, maximum, minimum and sum across engines at each
+    sample in a single pass over the parameters' arrays without stacking
+    them into a new multi-dimensional array.
+
+    Equivalent to np.ma.average, np.ma.max, np.ma.min and np.ma.sum of
+    vstack_params(*params) along axis 0. Samples are masked where every
+    parameter is masked.
+
+    :param params: Parameter arguments as required. Allows some None values.
+    :type params: np.ma.array or Parameter object or None
+    :returns: Average, maximum, minimum and sum arrays.
+    :rtype: EngineAggregates
+    :raises ValueError: If all params are None or the arrays differ in length.
+    '''
+    arrays = [getattr(p, 'array', p) for p in params if p is not None]
+    if not arrays:
+        raise ValueError('need at least one array to aggregate')
+    shape = np.shape(arrays[0])
+    dtype = np.result_type(*arrays)
+    # Masked samples are ignored by filling with values which do not change
+    # the result, as numpy's masked reductions do.
+    max_fill = np.ma.maximum_fill_value(np.empty(0, dtype=dtype))
+    min_fill = np.ma.minimum_fill_value(np.empty(0, dtype=dtype))
+    total = np.zeros(shape, dtype=dtype)
+    count = np.zeros(shape, dtype=int)
+    maximum = np.empty(shape, dtype=dtype)
+    maximum.fill(max_fill)
+    minimum = np.empty(shape, dtype=dtype)
+    minimum.fill(min_fill)
+    for array in arrays:
+        if np.shape(array) != shape:
+            raise ValueError('all the input array dimensions must match '
+                             'exactly')
+        data = np.ma.getdata(array)
+        valid = ~np.ma.getmaskarray(array)
+        total += np.where(valid, data, 0)
+        count += valid
+        np.maximum(maximum, np.where(valid, data, max_fill), out=maximum)
+        np.minimum(minimum, np.where(valid, data, min_fill), out=minimum)
+    mask = count == 0
+    maximum[mask] = 0
+    minimum[mask] = 0
+    average = total * 1. / np.maximum(count, 1)
+    return EngineAggregates(
+        # Masked division also masks invalid results, e.g. NaN.
+        avg=np.ma.array(average, mask=mask | ~np.isfinite(average)),
+        max=np.ma.array(maximum, mask=mask),
+        min=np.ma.array(minimum, mask=mask.copy()),
+        sum=np.ma.array(total, mask=mask.copy()),
+    )
+
+
 def filter_vor_ils_frequencies(array, navaid):
     '''
     This function passes valid ils or vor frequency data and masks all other data.
@@ -2550,11 +2693,15 @@ def ground_track_precise(lat, lon, speed, hdg, frequency, mode):
     return lat_return, lon_return, wt
 
 
-def hash_array(array, sections, min_samples):
+def hash_array(array, sections, min_samples, checksum=None):
     '''
     Creates a sha256 hash from the array's tostring() method .
+
+    :param checksum: sha256 object to update, e.g. to hash consecutive windows of data. A new checksum is created if None.
+    :type checksum: hashlib.sha256 or None
     '''
-    checksum = sha256()
+    if checksum is None:
+        checksum = sha256()
     for section in sections:
         if section.stop - section.start < min_samples:
             continue
@@ -3108,6 +3255,130 @@ def is_slice_within_slice(inner_slice, outer_slice, within_use='slice'):
         return slices_overlap(inner_slice, outer_slice)
 
 
+def _is_sample_index(value):
+    '''
+    :returns: Whether value is a non-negative integer sample index.
+    :rtype: bool
+    '''
+    return isinstance(value, (int, long, np.integer)) and value >= 0
+
+
+def _slices_to_intervals(slice_list):
+    '''
+    Converts a list of slices into the sorted interval representation used by
+    the slices_* functions: arrays of the starts and stops of disjoint,
+    non-adjacent and non-empty intervals sorted by start.
+
+    :param slice_list: Slices to convert.
+    :type slice_list: list of slices
+    :returns: Interval starts and stops or None if a slice does not have non-negative integer start and stop and a step of None or 1.
+    :rtype: (np.array, np.array) or None
+    '''
+    for _slice in slice_list:
+        if not (_is_sample_index(_slice.start) and
+                _is_sample_index(_slice.stop) and _slice.step in (None, 1)):
+            return None
+    starts = np.array([s.start for s in slice_list], dtype=np.int64)
+    stops = np.array([s.stop for s in slice_list], dtype=np.int64)
+    return _intervals_union(starts, stops)
+
+
+def _intervals_union(starts, stops):
+    '''
+    Merges overlapping and adjacent intervals.
+
+    :param starts: Interval starts in any order.
+    :type starts: np.array
+    :param stops: Interval stops.
+    :type stops: np.array
+    :returns: Sorted, disjoint interval starts and stops.
+    :rtype: (np.array, np.array)
+    '''
+    non_empty = stops > starts
+    starts = starts[non_empty]
+    stops = stops[non_empty]
+    if not len(starts):
+        return starts, stops
+    order = np.argsort(starts, kind='mergesort')
+    starts = starts[order]
+    stops = np.maximum.accumulate(stops[order])
+    # A new interval begins wherever there is a gap after all previous stops.
+    begins = np.concatenate(([True], starts[1:] > stops[:-1]))
+    ends = np.concatenate((begins[1:], [True]))
+    return starts[begins], stops[ends]
+
+
+def _intervals_and(first, second):
+    '''
+    Intersection of two sets of sorted, disjoint intervals.
+
+    :type first: (np.array, np.array)
+    :type second: (np.array, np.array)
+    :returns: Sorted, disjoint interval starts and stops within both.
+    :rtype: (np.array, np.array)
+    '''
+    first_starts, first_stops = first
+    second_starts, second_stops = second
+    first_index, second_index = _intervals_overlapping(
+        first_starts, first_stops, second_starts, second_stops)
+    starts = np.maximum(first_starts[first_index],
+                        second_starts[second_index])
+    stops = np.minimum(first_stops[first_index], second_stops[second_index])
+    return starts[stops > starts], stops[stops > starts]
+
+
+def _intervals_overlapping(first_starts, first_stops, second_starts,
+                           second_stops):
+    '''
+    Finds the pairs of overlapping intervals by bisection. The second
+    intervals must be sorted and disjoint while the first may be in any
+    order. Intervals overlap if each starts before the other stops.
+
+    :returns: Positions of each overlapping pair within the first and second intervals ordered by first and then second position.
+    :rtype: (np.array(dtype=int), np.array(dtype=int))
+    '''
+    # Range of second intervals which overlap each first interval.
+    lower = np.searchsorted(second_stops, first_starts, side='right')
+    upper = np.searchsorted(second_starts, first_stops, side='left')
+    counts = np.maximum(upper - lower, 0)
+    first_index = np.repeat(np.arange(len(first_starts)), counts)
+    second_index = np.arange(counts.sum()) - \
+        np.repeat(np.cumsum(counts) - counts, counts) + \
+        np.repeat(lower, counts)
+    return first_index, second_index
+
+
+def _intervals_not(intervals, begin, end):
+    '''
+    Complement of sorted, disjoint intervals within begin and end.
+
+    :type intervals: (np.array, np.array)
+    :type begin: int
+    :type end: int
+    :returns: Sorted, disjoint interval starts and stops between begin and end not within intervals.
+    :rtype: (np.array, np.array)
+    '''
+    starts, stops = intervals
+    gap_starts = np.concatenate(([begin], stops))
+    gap_stops = np.concatenate((starts, [end]))
+    return _intervals_and((gap_starts[gap_stops > gap_starts],
+                           gap_stops[gap_stops > gap_starts]),
+                          (np.array([begin]), np.array([end])))
+
+
+def _intervals_to_slices(intervals):
+    '''
+    The bounds are np.int64 as within the slices which np.ma.clump_unmasked
+    returns.
+
+    :type intervals: (np.array, np.array)
+    :rtype: list of slices
+    '''
+    starts, stops = intervals
+    return [slice(start, stop) for start, stop in
+            izip(starts.astype(np.int64), stops.astype(np.int64))]
+
+
 def slices_overlap(first_slice, second_slice):
     '''
     Logical check for an overlap existing between two slices.
@@ -3128,6 +3399,44 @@ def slices_overlap(first_slice, second_slice):
            ((second_slice.start < first_slice.stop) or
             (first_slice.stop is None))
 
+def _slices_and_pairs(first_list, second_list):
+    '''
+    Finds the pairs of overlapping slices between two lists of forward slices
+    in the order which slices_and compares them. Requires the second list to
+    be sorted and disjoint so that the slices overlapping each slice within
+    the first list are found by bisection.
+
+    :type first_list: list of slices
+    :type second_list: list of slices
+    :returns: Positions of overlapping slices within first and second list or None if the lists cannot be bisected.
+    :rtype: [(int, int)] or None
+    '''
+    def bounded(_slice):
+        return (_slice.start is not None and _slice.stop is not None and
+                (_slice.step is None or _slice.step >= 1))
+
+    if not all(bounded(s) for s in first_list) or \
+       not all(bounded(s) for s in second_list):
+        return None
+    try:
+        first_starts = np.array([s.start for s in first_list],
+                                dtype=np.float64)
+        first_stops = np.array([s.stop for s in first_list],
+                               dtype=np.float64)
+        second_starts = np.array([s.start for s in second_list],
+                                 dtype=np.float64)
+        second_stops = np.array([s.stop for s in second_list],
+                                dtype=np.float64)
+    except (TypeError, ValueError):
+        return None
+    if np.any(second_stops <= second_starts) or \
+       np.any(second_starts[1:] < second_stops[:-1]):
+        return None
+    first_index, second_index = _intervals_overlapping(
+        first_starts, first_stops, second_starts, second_stops)
+    return izip(first_index.tolist(), second_index.tolist())
+
+
 def slices_and(first_list, second_list):
     '''
     This is a simple AND function to allow two slice lists to be merged. This
@@ -3147,11 +3456,19 @@ def slices_and(first_list, second_list):
         else:  
             return _slice
         
+    if not first_list or not second_list:
+        return []
+    first_list = [fwd(s) for s in first_list]
+    second_list = [fwd(s) for s in second_list]
+    pairs = _slices_and_pairs(first_list, second_list)
+    if pairs is not None:
+        return [slice(max(first_list[i].start, second_list[j].start),
+                      min(first_list[i].stop, second_list[j].stop))
+                for i, j in pairs]
+
     result_list = []
-    for first_slice in first_list:
-        for second_slice in second_list:
-            slice_1 = fwd(first_slice)
-            slice_2 = fwd(second_slice)
+    for slice_1 in first_list:
+        for slice_2 in second_list:
             
             if slices_overlap(slice_1, slice_2):
                 slice_start = max(slice_1.start, slice_2.start)
@@ -3218,6 +3535,12 @@ def slices_not(slice_list, begin_at=None, end_at=None):
     if end_at is not None and end_at > endpoint:
         endpoint = end_at
 
+    intervals = _slices_to_intervals(slice_list)
+    if intervals is not None and _is_sample_index(startpoint) and \
+       _is_sample_index(endpoint) and startpoint < endpoint:
+        return _intervals_to_slices(
+            _intervals_not(intervals, startpoint, endpoint))
+
     workspace = np.ma.zeros(endpoint)
     for each_slice in slice_list:
         workspace[each_slice] = 1
@@ -3272,6 +3595,15 @@ def slices_or(*slice_lists, **kwargs):
         endpoint = b
 
     if startpoint>=0 and endpoint>0:
+        intervals = _slices_to_intervals(
+            [s for slice_list in slice_lists for s in slice_list])
+        if intervals is not None and b is not None and \
+           _is_sample_index(startpoint) and _is_sample_index(endpoint) and \
+           startpoint < min(endpoint, b):
+            # The workspace only extends to the last stop.
+            return _intervals_to_slices(_intervals_and(
+                intervals,
+                (np.array([startpoint]), np.array([min(endpoint, b)]))))
         workspace = np.ma.zeros(b)
         for slice_list in slice_lists:
             for each_slice in slice_list:
@@ -3522,19 +3854,40 @@ def max_abs_value(array, _slice=slice(None), start_edge=None, stop_edge=None):
     """
     index, value = max_value(np.ma.abs(array), _slice)
     # If start or stop edges are given, check these extreme (interpolated) values.
-    if start_edge:
-        edge_value = abs(value_at_index(array, start_edge) or 0)
-        if edge_value and edge_value > value:
-            index = start_edge
-            value = edge_value
-    if stop_edge:
-        edge_value = abs(value_at_index(array, stop_edge) or 0)
-        if edge_value and edge_value > value:
-            index = stop_edge
-            value = edge_value
+    index, value = _edge_value(array, index, value, start_edge, stop_edge, gt,
+                               _abs_value_at_index)
     return Value(index, array[index]) # Recover sign of the value.
 
 
+def max_abs_values(array, starts, stops, start_edges=None, stop_edges=None):
+    """
+    Get the value of the maximum absolute value within each of many slices of
+    the array, as max_abs_value, finding all of the maximums at once.
+
+    :param array: masked array
+    :type array: np.ma.array
+    :param starts: Start index of each slice, None for the start of the array.
+    :type starts: [int or float or None]
+    :param stops: Stop index of each slice, None for the end of the array.
+    :type stops: [int or float or None]
+    :param start_edges: Index for precise start timing of each slice.
+    :type start_edges: [float or None] or None
+    :param stop_edges: Index for precise end timing of each slice.
+    :type stop_edges: [float or None] or None
+    :raises ValueError: If a start or stop is negative.
+    :returns: Value named tuple of index and value for each slice.
+    :rtype: [Value]
+    """
+    values = _segment_values(np.ma.abs(array), starts, stops, np.maximum)
+    results = []
+    for (index, value), start_edge, stop_edge in \
+            izip(values, *_edges(len(values), start_edges, stop_edges)):
+        index, value = _edge_value(array, index, value, start_edge, stop_edge,
+                                   gt, _abs_value_at_index)
+        results.append(Value(index, array[index])) # Recover sign of the value.
+    return results
+
+
 def max_value(array, _slice=slice(None), start_edge=None, stop_edge=None):
     """
     Get the maximum value in the array and its index relative to the array and
@@ -3553,17 +3906,32 @@ def max_value(array, _slice=slice(None), start_edge=None, stop_edge=None):
     """
     index, value = _value(array, _slice, np.ma.argmax)
     # If start or stop edges are given, check these extreme (interpolated) values.
-    if start_edge:
-        edge_value = value_at_index(array, start_edge)
-        if edge_value and edge_value > value:
-            index = start_edge
-            value = edge_value
-    if stop_edge:
-        edge_value = value_at_index(array, stop_edge)
-        if edge_value and edge_value > value:
-            index = stop_edge
-            value = edge_value
-    return Value(index, value)
+    return _edge_value(array, index, value, start_edge, stop_edge, gt)
+
+
+def max_values(array, starts, stops, start_edges=None, stop_edges=None):
+    """
+    Get the maximum value and its index within each of many slices of the
+    array, as max_value, finding all of the maximums at once.
+
+    :param array: masked array
+    :type array: np.ma.array
+    :param starts: Start index of each slice, None for the start of the array.
+    :type starts: [int or float or None]
+    :param stops: Stop index of each slice, None for the end of the array.
+    :type stops: [int or float or None]
+    :param start_edges: Index for precise start timing of each slice.
+    :type start_edges: [float or None] or None
+    :param stop_edges: Index for precise end timing of each slice.
+    :type stop_edges: [float or None] or None
+    :raises ValueError: If a start or stop is negative.
+    :returns: Value named tuple of index and value for each slice.
+    :rtype: [Value]
+    """
+    values = _segment_values(array, starts, stops, np.maximum)
+    return [_edge_value(array, index, value, start_edge, stop_edge, gt)
+            for (index, value), start_edge, stop_edge in
+            izip(values, *_edges(len(values), start_edges, stop_edges))]
 
 
 def merge_masks(masks, min_unmasked=1):
@@ -3597,17 +3965,32 @@ def min_value(array, _slice=slice(None), start_edge=None, stop_edge=None):
     """
     index, value = _value(array, _slice, np.ma.argmin)
     # If start or stop edges are given, check these extreme (interpolated) values.
-    if start_edge:
-        edge_value = value_at_index(array, start_edge)
-        if edge_value and edge_value < value:
-            index = start_edge
-            value = edge_value
-    if stop_edge:
-        edge_value = value_at_index(array, stop_edge)
-        if edge_value and edge_value < value:
-            index = stop_edge
-            value = edge_value
-    return Value(index, value)
+    return _edge_value(array, index, value, start_edge, stop_edge, lt)
+
+
+def min_values(array, starts, stops, start_edges=None, stop_edges=None):
+    """
+    Get the minimum value and its index within each of many slices of the
+    array, as min_value, finding all of the minimums at once.
+
+    :param array: masked array
+    :type array: np.ma.array
+    :param starts: Start index of each slice, None for the start of the array.
+    :type starts: [int or float or None]
+    :param stops: Stop index of each slice, None for the end of the array.
+    :type stops: [int or float or None]
+    :param start_edges: Index for precise start timing of each slice.
+    :type start_edges: [float or None] or None
+    :param stop_edges: Index for precise end timing of each slice.
+    :type stop_edges: [float or None] or None
+    :raises ValueError: If a start or stop is negative.
+    :returns: Value named tuple of index and value for each slice.
+    :rtype: [Value]
+    """
+    values = _segment_values(array, starts, stops, np.minimum)
+    return [_edge_value(array, index, value, start_edge, stop_edge, lt)
+            for (index, value), start_edge, stop_edge in
+            izip(values, *_edges(len(values), start_edges, stop_edges))]
 
 
 def average_value(array, _slice=None):
@@ -3630,6 +4013,50 @@ def average_value(array, _slice=None):
     return Value(midpoint, np.ma.mean(array))
 
 
+def average_values(array, starts, stops):
+    '''
+    Calculate the average value within each of many slices of the array at
+    once and return both the midpoint index and the average of each, as
+    average_value. Averages are calculated from sums of each slice so may
+    differ from np.ma.mean in the least significant digits.
+
+    :param array: Data to calculate the average values of.
+    :type array: np.ma.masked_array
+    :param starts: Start index of each slice, None for the start of the array.
+    :type starts: [int or float or None]
+    :param stops: Stop index of each slice, None for the end of the array.
+    :type stops: [int or float or None]
+    :raises ValueError: If a start or stop is negative.
+    :returns: The midpoint index and the average value of each slice.
+    :rtype: [Value]
+    '''
+    bounds = _segment_bounds(len(array), starts, stops)
+    nonempty = np.flatnonzero(bounds[1] > bounds[0])
+    averages = {}
+    if len(nonempty):
+        data = np.ma.getdata(array)
+        mask = np.ma.getmaskarray(array)
+        segments = _interleave(bounds[0][nonempty], bounds[1][nonempty])
+        # Pad so that a stop at the end of the array is a valid index.
+        sums = np.add.reduceat(
+            np.append(np.where(mask, 0, data), 0), segments)[::2]
+        counts = np.add.reduceat(np.append(~mask, 0), segments)[::2]
+        for index, total, count in izip(nonempty, sums, counts):
+            averages[index] = \
+                np.ma.masked if count == 0 else total * 1. / count
+    results = []
+    for index, (start, stop) in enumerate(izip(starts, stops)):
+        if index in averages:
+            average = averages[index]
+        else:
+            # The average of an empty slice.
+            average = np.ma.mean(array[bounds[0][index]:bounds[1][index]])
+        start = start or 0
+        stop = stop or len(array)
+        results.append(Value(start + ((stop - start) / 2), average))
+    return results
+
+
 def minimum_unmasked(array1, array2):
     """
     Get the minimum value between two arrays. Differs from the Numpy minimum
@@ -4792,20 +5219,66 @@ def rate_of_change(diff_param, width, method='two_points'):
 
 def repair_mask(array, frequency=1, repair_duration=REPAIR_DURATION,
                 raise_duration_exceedance=False, copy=False, extrapolate=False,
-                zero_if_masked=False, repair_above=None):
+                zero_if_masked=False, repair_above=None, state=None,
+                return_state=False):
     '''
     This repairs short sections of data ready for use by flight phase algorithms
     It is not intended to be used for key point computations, where invalid data
     should remain masked.
 
+    Consecutive windows of data are repaired as the whole of the data would
+    be by passing the state returned along with each window when repairing
+    the next. Masked samples at the end of a window which may be repaired
+    once the next unmasked sample is known are held back within the state
+    and returned at the start of the next window's result, so each result
+    continues from the end of the previous one.
+
     :param copy: If True, returns modified copy of array, otherwise modifies the array in-place.
     :param zero_if_masked: If True, returns a fully masked zero-filled array if all incoming data is masked.
     :param repair_duration: If None, any length of masked data will be repaired.
     :param raise_duration_exceedance: If False, no warning is raised if there are masked sections longer than repair_duration. They will remain unrepaired.
     :param extrapolate: If True, data is extrapolated at the start and end of the array.
     :param repair_above: If value provided only masked ranges where first and last unmasked values are this value will be repaired.
+    :param state: State returned along with the previous window of data or None for the first window.
+    :type state: np.ma.MaskedArray or None
+    :param return_state: Return the state to repair the next window from along with the repaired data. Entirely masked windows do not raise ValueError and cannot be extrapolated.
+    :type return_state: bool
     :raises ValueError: If the entire array is masked.
     '''
+    if repair_duration:
+        repair_samples = repair_duration * frequency
+    else:
+        repair_samples = None
+
+    if return_state:
+        if extrapolate:
+            raise ValueError("Data cannot be extrapolated when repairing "
+                             "consecutive windows.")
+        # The state is the last unmasked sample of the previous window
+        # followed by the masked samples held back after it.
+        if state is not None:
+            array = np.ma.concatenate([state, array])
+        elif copy:
+            array = array.copy()
+        skip = 0 if state is None else 1
+        unmasked = np.flatnonzero(~np.ma.getmaskarray(array))
+        if not len(unmasked):
+            # Nothing to repair from.
+            return array, None
+        array = repair_mask(array, frequency=frequency,
+                            repair_duration=repair_duration,
+                            raise_duration_exceedance=raise_duration_exceedance,
+                            repair_above=repair_above)
+        end = unmasked[-1] + 1
+        held = len(array) - end
+        if not held:
+            return array[skip:], array[-1:]
+        if (repair_samples and held > repair_samples) or \
+           (repair_above is not None and array.data[end - 1] <= repair_above):
+            # The masked samples will never be repaired.
+            return array[skip:], None
+        return array[skip:end], array[end - 1:]
+
     if not np.ma.count(array):
         if zero_if_masked:
             return np_ma_zeros_like(array, mask=True)
@@ -4813,10 +5286,6 @@ def repair_mask(array, frequency=1, repair_duration=REPAIR_DURATION,
             raise ValueError("Array cannot be repaired as it is entirely masked")
     if copy:
         array = array.copy()
-    if repair_duration:
-        repair_samples = repair_duration * frequency
-    else:
-        repair_samples = None
 
     masked_sections = np.ma.clump_masked(array)
     for section in masked_sections:
@@ -5906,33 +6375,61 @@ def match_altitudes(fine, coarse):
         result[chunk] = fine[chunk]-correction
     return result
     
-def straighten_headings(heading_array, copy=True):
+def straighten_headings(heading_array, copy=True, state=None,
+                        return_state=False):
     '''
     We always straighten heading data before checking for spikes.
     It's easier to process heading data in this format.
 
     :param heading_array: array/list of numeric heading values
     :type heading_array: iterable
+    :param state: State returned along with the previous window of heading data (see straighten).
+    :type state: tuple or None
+    :param return_state: Return the state to straighten the next window of heading data from.
+    :type return_state: bool
     :returns: Straightened headings
     :rtype: Generator of type Float
     '''
-    return straighten(heading_array, None, 360.0, copy)
+    return straighten(heading_array, None, 360.0, copy, state=state,
+                      return_state=return_state)
 
-def straighten(array, estimate, limit, copy):
+def straighten(array, estimate, limit, copy, state=None, return_state=False):
     '''
     Basic straightening routine, used by both heading and altitude signals.
+
+    Consecutive windows of data are straightened as the whole of the data
+    would be by passing the state returned along with each window when
+    straightening the next.
     
     :param array: array of numeric of overflowing values
     :type array: numpy masked array
     :param limit: limit value for overflow.
     :type limit: float
-    :returns: Straightened parameter
-    :rtype: numpy masked array
+    :param state: State returned along with the previous window of data or None for the first window.
+    :type state: tuple or None
+    :param return_state: Return the state to straighten the next window from along with the straightened array.
+    :type return_state: bool
+    :returns: Straightened parameter, along with the state if return_state.
+    :rtype: numpy masked array or (numpy masked array, tuple)
     '''
     if copy:
         array = array.copy()
-    last_value = None
+    # The last straightened value, the last value before straightening if
+    # the previous window ended unmasked, and the starting value and change
+    # in value of the section the previous window ended within.
+    last_value, last_raw, starting_value, total = state or (None,) * 4
     for clump in np.ma.clump_unmasked(array):
+        if clump.start == 0 and last_raw is not None:
+            # Continue the section which the previous window ended within.
+            diff = np.ediff1d(array.data[clump],
+                              to_begin=array.data[0] - last_raw)
+            diff = diff - limit * np.trunc(diff * 2.0 / limit)
+            last_raw = array.data[clump.stop - 1]
+            total = np.cumsum(np.append(total, diff))[1:]
+            array[clump] = total + starting_value
+            total = total[-1]
+            last_value = array[clump][-1]
+            continue
         starting_value = array[clump.start]
         if estimate is not None and estimate[clump.start]:
             # Make sure we are close to the estimate at the start of each block.
@@ -5955,10 +6452,17 @@ def straighten(array, estimate, limit, copy):
 
         diff = np.ediff1d(array[clump])
         diff = diff - limit * np.trunc(diff * 2.0 / limit)
+        last_raw = array.data[clump.stop - 1]
+        total = np.cumsum(diff)
         array[clump][0] = starting_value
-        array[clump][1:] = np.cumsum(diff) + starting_value
+        array[clump][1:] = total + starting_value
+        total = total[-1] if len(total) else 0.0
         last_value = array[clump][-1]
-    return array
+    if not return_state:
+        return array
+    if len(array) and np.ma.getmaskarray(array)[-1]:
+        last_raw = None
+    return array, (last_value, last_raw, starting_value, total)
 
 def subslice(orig, new):
     """
@@ -6156,6 +6660,101 @@ def _value(array, _slice, operator):
         return Value(None, None)
 
 
+def _abs_value_at_index(array, index):
+    return abs(value_at_index(array, index) or 0)
+
+
+def _edge_value(array, index, value, start_edge, stop_edge, comparison,
+                edge_value_at_index=None):
+    """
+    Applies logic of min_value and max_value to the (interpolated) values at
+    the start and stop edges, returning whichever of the edges' values and
+    value is the most extreme by the comparison.
+    """
+    edge_value_at_index = edge_value_at_index or value_at_index
+    for edge in (start_edge, stop_edge):
+        if edge:
+            edge_value = edge_value_at_index(array, edge)
+            if edge_value and comparison(edge_value, value):
+                index = edge
+                value = edge_value
+    return Value(index, value)
+
+
+def _edges(count, start_edges, stop_edges):
+    """
+    :returns: start_edges and stop_edges of count slices, defaulting to None.
+    """
+    return (start_edges or [None] * count, stop_edges or [None] * count)
+
+
+def _interleave(starts, stops):
+    """
+    :returns: Indices of segments for ufunc.reduceat, the reduction of each
+        segment being every other result.
+    """
+    segments = np.empty(len(starts) * 2, dtype=int)
+    segments[::2] = starts
+    segments[1::2] = stops
+    return segments
+
+
+def _segment_bounds(length, starts, stops):
+    """
+    :returns: Integer starts and stops within an array of length, as they
+        are applied when slicing the array.
+    :raises ValueError: If a start or stop is negative.
+    """
+    bounds = np.array([[0 if start is None else start for start in starts],
+                       [length if stop is None else stop for stop in stops]],
+                      dtype=float).reshape(2, -1)
+    if (bounds < 0).any():
+        raise ValueError("Negative slice start or stop not supported")
+    bounds = np.minimum(bounds, length).astype(int)
+    bounds[1] = np.maximum(bounds[0], bounds[1])
+    return bounds
+
+
+def _segment_values(array, starts, stops, ufunc):
+    """
+    Applies logic of min_value and max_value (ufunc np.minimum or np.maximum)
+    across many slices of the array at once with segmented reductions.
+    """
+    starts, stops = _segment_bounds(len(array), starts, stops)
+    results = [Value(None, None)] * len(starts)
+    data = np.ma.getdata(array)
+    mask = np.ma.getmaskarray(array)
+    counts = np.concatenate(([0], np.cumsum(~mask)))
+    nonempty = np.flatnonzero(counts[stops] > counts[starts])
+    if not len(nonempty):
+        return results
+    starts = starts[nonempty]
+    lengths = stops[nonempty] - starts
+    # Fill masked values as np.ma.argmax and np.ma.argmin do, padding so that
+    # a stop at the end of the array is a valid index.
+    if ufunc is np.maximum:
+        fill_value = np.ma.maximum_fill_value(data)
+    else:
+        fill_value = np.ma.minimum_fill_value(data)
+    filled = np.append(data, data[:1])
+    filled[:-1][mask] = fill_value
+    filled[-1] = fill_value
+    extremes = ufunc.reduceat(filled, _interleave(starts, stops[nonempty]))
+    extremes = np.repeat(extremes[::2], lengths)
+    # Find the first index of each segment's extreme (or NaN) value.
+    offsets = np.cumsum(lengths) - lengths
+    positions = np.arange(lengths.sum()) - np.repeat(offsets - starts, lengths)
+    values = filled[positions]
+    matches = (values == extremes) | ((values != values) &
+                                      (extremes != extremes))
+    indices = np.minimum.reduceat(
+        np.where(matches, positions, len(filled)), offsets)
+    for result_index, index in izip(nonempty, indices):
+        # Indices are floats as when flooring the slice start in _value.
+        results[result_index] = Value(np.float64(index), array[index])
+    return results
+
+
 def value_at_time(array, hz, offset, time_index):
     '''
     Finds the value of the data in array at the time given by the time_index.
@@ -6238,7 +6837,7 @@ def value_at_index(array, index, interpolate=True):
         low_value = array.data[low]
         high_value = array.data[high]
         # Crude handling of masked values. TODO: Must be a better way !
-        if array.mask.any(): # An element is masked
+        if np.ma.getmask(array) is not np.ma.nomask: # Elements may be masked
             if array.mask[low] == True:
                 if array.mask[high] == True:
                     return None
@@ -6254,6 +6853,102 @@ def value_at_index(array, index, interpolate=True):
         return r*high_value + (1-r) * low_value
 
 
+def values_at_indices(array, indices, interpolate=True):
+    '''
+    Finds the values of the data in array at many indices. Vectorised
+    equivalent of value_at_index.
+
+    Samples outside the array boundaries are permitted, as we need this to
+    allow for offsets within the data frame.
+
+    :param array: input data
+    :type array: masked array
+    :param indices: indices into the array where we want to find the array values.
+    :type indices: np.array or list of floats
+    :param interpolate: whether to interpolate the values if indices are floats.
+    :type interpolate: boolean
+    :returns: interpolated values from the array, masked where value_at_index would return None or a masked value (and where the index is NaN).
+    :rtype: np.ma.masked_array
+    '''
+    indices = np.asarray(indices, dtype=np.float64)
+    data = np.ma.getdata(array)
+    mask = np.ma.getmaskarray(array)
+    last = len(array) - 1
+    values = np.zeros(indices.shape,
+                      dtype=np.result_type(data.dtype, np.float64))
+    values_mask = np.zeros(indices.shape, dtype=np.bool_)
+
+    # Samples outside of the array take the first or last value.
+    for outside, position in ((indices < 0.0, 0), (indices > last, -1)):
+        if outside.any():
+            values[outside] = data[position]
+            values_mask[outside] = mask[position]
+
+    within = (indices >= 0.0) & (indices <= last)
+    values_mask[np.isnan(indices)] = True
+    low = np.zeros(indices.shape, dtype=np.int_)
+    low[within] = indices[within].astype(np.int_)
+
+    # Indices which arrive exactly on a sample.
+    exact = within & (low == indices)
+    values[exact] = data[low[exact]]
+    values_mask[exact] = mask[low[exact]]
+
+    between = within & ~exact
+    low = low[between]
+    high = low + 1
+    low_mask = mask[low]
+    high_mask = mask[high]
+    low_value = data[low]
+    high_value = data[high]
+    if interpolate:
+        r = indices[between] - low
+        between_values = r * high_value + (1 - r) * low_value
+    else:
+        between_values = data[(indices[between] + 0.5).astype(np.int_)]
+    # Crude handling of masked values matches value_at_index.
+    between_values = np.where(low_mask, high_value,
+                              np.where(high_mask, low_value, between_values))
+    values[between] = between_values
+    values_mask[between] = low_mask & high_mask
+    return np.ma.masked_array(values, mask=values_mask)
+
+
+def values_at_indices_list(array, indices, interpolate=True):
+    '''
+    Finds the values of the data in array at many indices as a list of the
+    same values and types which value_at_index returns for each index.
+    values_at_indices returns every value as a float, whereas values
+    sampled from the array rather than interpolated keep the array's dtype,
+    e.g. int or bool.
+
+    :param array: input data
+    :type array: masked array
+    :param indices: indices into the array where we want to find the array values.
+    :type indices: np.array or list of floats
+    :param interpolate: whether to interpolate the values if indices are floats.
+    :type interpolate: boolean
+    :returns: values from the array, None where value_at_index would return None or a masked value (and where the index is NaN).
+    :rtype: list
+    '''
+    values = values_at_indices(array, indices,
+                               interpolate=interpolate).tolist()
+    indices = np.asarray(indices, dtype=np.float64)
+    if interpolate:
+        # Values are only interpolated between two unmasked samples.
+        mask = np.ma.getmaskarray(array)
+        between = (indices > 0.0) & (indices < len(array) - 1) & \
+            (indices != np.floor(indices))
+        low = indices[between].astype(np.int_)
+        between[between] = ~(mask[low] | mask[low + 1])
+        sampled = ~between
+    else:
+        sampled = np.ones(indices.shape, dtype=np.bool_)
+    dtype = np.ma.getdata(array).dtype.type
+    return [dtype(value) if is_sampled and value is not None else value
+            for value, is_sampled in izip(values, sampled.tolist())]
+
+
 def vspeed_lookup(vspeed, aircraft, engine, flap, gw):
     '''
     Single point lookup for the vspeed tables.
@@ -11,16 +11,23 @@ import pprint
 from abc import ABCMeta
 from collections import namedtuple, Iterable
 from functools import total_ordering
-from itertools import product
-from operator import attrgetter
+from itertools import izip, product
+from operator import attrgetter, gt, lt
 
 from analysis_engine.library import (
     align,
     align_slices,
+    engine_aggregates,
     find_edges,
     is_index_within_slice,
     is_index_within_slices,
     is_slice_within_slice,
+    max_abs_value,
+    max_abs_values,
+    max_value,
+    max_values,
+    min_value,
+    min_values,
     repair_mask,
     runs_of_ones,
     slice_duration,
@@ -32,8 +39,10 @@ from analysis_engine.library import (
     slices_from_to,
     value_at_index,
     value_at_time,
+    values_at_indices_list,
 )
 from analysis_engine.recordtype import recordtype
+from analysis_engine import settings
 
 # FIXME: a better place for this class
 from hdfaccess.parameter import MappedArray
@@ -53,6 +62,25 @@ KeyTimeInstance = recordtype('KeyTimeInstance',
                              'index name datetime latitude longitude',
                              default=None)
 Section = namedtuple('Section', 'name slice start_edge stop_edge') #Q: rename mask -> slice/section
+# Functions which find a value within a slice of an array mapped to variants
+# which find values within many slices at once.
+SEGMENTED_FUNCTIONS = {
+    max_abs_value: max_abs_values,
+    max_value: max_values,
+    min_value: min_values,
+}
+# Names of a FormattedNameNode class, built once per class.
+NameCache = namedtuple('NameCache', 'name_format name_values signature keys '
+                                    'names valid_names lookup')
+# Columnar representation of the items within a FormattedNameNode. value is
+# None for items without a value (KTIs) and names maps name to name_id.
+Columns = namedtuple('Columns', 'index value name_id names')
+# Sorted interval index of the sections within a SectionNode. Slice starts
+# and stops of None are -inf within starts and stops to match the ordering of
+# None in Python 2, while stops_inf has stops of None as inf for containment.
+# order is the stable ordering of the sections by start.
+SectionIndex = namedtuple('SectionIndex', 'names starts stops stops_inf '
+                                          'order sorted_starts')
 
 
 # Ref: django/db/models/options.py:20
@@ -307,6 +335,34 @@ def can_operate(cls, available):
         :returns: self after having aligned dependencies and called derive.
         :rtype: self
         """
+        args = self._align_dependencies(args)
+
+        try:
+            res = self.derive(*args)
+        except Exception as err:
+            self.exception('Failed to derive node `%s`.\n'
+                           'Nodes used to derive:\n  %s',
+                           self.name, '\n  '.join(repr(n) for n in args))
+            raise
+
+        if res is NotImplemented:
+            raise NotImplementedError("Class '%s' derive method is not implemented." % \
+                                      self.__class__.__name__)
+        elif res:
+            raise UserWarning("Class '%s' should not have returned anything. Got: %s" % (
+                self.__class__.__name__, res))
+        return self
+
+    def _align_dependencies(self, args):
+        """
+        Set the frequency and offset of self and align the dependencies to
+        them.
+
+        :param args: List of available Parameter objects
+        :type args: list
+        :returns: Dependencies to pass to derive.
+        :rtype: list
+        """
         dependencies_to_align = \
             [d for d in args if d is not None and d.frequency]
         if dependencies_to_align and self.align:
@@ -349,21 +405,7 @@ def can_operate(cls, available):
             self.frequency = dependencies_to_align[0].frequency
             self.offset = dependencies_to_align[0].offset
 
-        try:
-            res = self.derive(*args)
-        except Exception as err:
-            self.exception('Failed to derive node `%s`.\n'
-                           'Nodes used to derive:\n  %s',
-                           self.name, '\n  '.join(repr(n) for n in args))
-            raise
-
-        if res is NotImplemented:
-            raise NotImplementedError("Class '%s' derive method is not implemented." % \
-                                      self.__class__.__name__)
-        elif res:
-            raise UserWarning("Class '%s' should not have returned anything. Got: %s" % (
-                self.__class__.__name__, res))
-        return self
+        return args
 
     def derive(self, **kwargs):
         """
@@ -508,6 +550,10 @@ class DerivedParameterNode(Node):
     units = None
     data_type = 'Derived'
     lfl = False
+    # Compact dtype to store the array with, e.g. 'float32', if
+    # COMPACT_DERIVED_PARAMETERS is enabled. None to use the dtype for the
+    # units within DERIVED_PARAMETER_STORAGE_DTYPES.
+    storage_dtype = None
 
     def __init__(self, name='', array=np.ma.array([], dtype=float), frequency=1, offset=0,
                  data_type=None, *args, **kwargs):
@@ -549,6 +595,59 @@ class DerivedParameterNode(Node):
             secs = float(secs)
         return value_at_time(self.array, self.frequency, self.offset, secs)
 
+    def get_storage_dtype(self):
+        '''
+        :returns: Compact dtype to store the array with, or None to store the array as derived.
+        :rtype: np.dtype or None
+        '''
+        # Read at call time so that the setting may be overridden.
+        dtype = self.storage_dtype or \
+            settings.DERIVED_PARAMETER_STORAGE_DTYPES.get(self.units)
+        return np.dtype(dtype) if dtype else None
+
+    def compact(self):
+        '''
+        Convert the array to the storage dtype if it is smaller than, and of
+        the same kind as, the array's dtype.
+        '''
+        dtype = self.get_storage_dtype()
+        if dtype is not None and dtype.kind == self.array.dtype.kind and \
+           dtype.itemsize < self.array.dtype.itemsize:
+            self.array = self.array.astype(dtype)
+
+    def widen(self):
+        '''
+        Convert a compact array back to the dtype it was derived with for
+        derivation: float64 for floating point arrays and int for integer
+        (multistate) arrays, so that arithmetic within derive methods does
+        not overflow the compact dtype.
+        '''
+        dtype = self.array.dtype
+        if dtype.kind == 'f' and dtype.itemsize < 8:
+            self.array = self.array.astype(np.float64)
+        elif dtype.kind == 'i' and dtype.itemsize < np.dtype(int).itemsize:
+            self.array = self.array.astype(int)
+
+    def at_many(self, secs):
+        '''
+        Gets the values within the array at many times. Vectorised equivalent
+        of at which interpolates all of the values at once.
+
+        :param secs: time deltas from start of data in seconds
+        :type secs: iterable of float or None
+        :returns: The interpolated values of the array at each time, of the same types as at returns, or None where at would return None or a masked value.
+        :rtype: list
+        '''
+        secs = np.array([np.nan if s is None else s for s in secs],
+                        dtype=np.float64)
+        # Matches the conversion of time to index within value_at_time.
+        location_in_array = \
+            (secs - round(self.offset - 0.0000005, 6)) * self.frequency
+        location_in_array[location_in_array < 0] = 0
+        location_in_array[location_in_array - len(self.array) > 0] = \
+            len(self.array) - 1
+        return values_at_indices_list(self.array, location_in_array)
+
     def get_aligned(self, param):
         '''
         :param param: Node to align copy to.
@@ -655,6 +754,87 @@ class DerivedParameterNode(Node):
 
 P = Parameter = DerivedParameterNode # shorthand
 
+
+class EngineAggregateNode(DerivedParameterNode):
+    '''
+    Base class for DerivedParameters which reduce a quantity across engines,
+    e.g. 'Eng (*) N1 Max' from 'Eng (1) N1' to 'Eng (4) N1'.
+
+    The derive method should reduce its dependencies with
+    self.engine_aggregates() and not otherwise use their arrays. When
+    engine_cache is set (process_flight shares one dictionary between all
+    nodes of a flight), nodes reducing the same dependencies, such as the
+    Avg, Max and Min of a quantity, align and reduce them only once.
+    '''
+    # Aggregates keyed by dependencies and alignment, shared within a flight.
+    engine_cache = None
+    _aggregates = None
+    _shared_aggregates = None
+
+    @classmethod
+    def engine_cache_group(cls):
+        '''
+        :returns: Alignment and dependency names which are shared by the nodes using the same engine_cache entries.
+        :rtype: tuple
+        '''
+        return (cls.align, cls.align_frequency, cls.align_offset,
+                tuple(cls.get_dependency_names()))
+
+    def _engine_cache_key(self, args):
+        return (self.align, self.align_frequency, self.align_offset) + tuple(
+            (a.name, a.frequency, a.offset) if a is not None else None
+            for a in args)
+
+    def engine_aggregates(self, *params):
+        '''
+        :param params: Parameter arguments as required. Allows some None values.
+        :type params: Parameter or None
+        :returns: Average, maximum, minimum and sum of the engine parameters.
+        :rtype: EngineAggregates
+        '''
+        if self._shared_aggregates is not None:
+            return self._shared_aggregates
+        self._aggregates = engine_aggregates(*params)
+        return self._aggregates
+
+    def _align_dependencies(self, args):
+        if self._shared_aggregates is not None:
+            # The shared aggregates are already aligned.
+            return args
+        return super(EngineAggregateNode, self)._align_dependencies(args)
+
+    def get_derived(self, args):
+        if self.engine_cache is None:
+            return super(EngineAggregateNode, self).get_derived(args)
+        key = self._engine_cache_key(args)
+        if key in self.engine_cache:
+            self._shared_aggregates, self.frequency, self.offset = \
+                self.engine_cache[key]
+            try:
+                return super(EngineAggregateNode, self).get_derived(args)
+            finally:
+                self._shared_aggregates = None
+        super(EngineAggregateNode, self).get_derived(args)
+        if self._aggregates is not None:
+            self.engine_cache[key] = (self._aggregates, self.frequency,
+                                      self.offset)
+            # Only engine_cache keeps the aggregates so that they can be
+            # released with release_engine_aggregates.
+            self._aggregates = None
+        return self
+
+    def release_engine_aggregates(self, args):
+        '''
+        Remove the aggregates of the dependencies from engine_cache once no
+        other node will use them.
+
+        :param args: Dependencies which get_derived was called with.
+        :type args: list
+        '''
+        if self.engine_cache is not None:
+            self.engine_cache.pop(self._engine_cache_key(args), None)
+
+
 def multistate_string_to_integer(string_array, mapping):
     """
     Converts (['one', 'two'], {1:'one', 2:'two'}) to [1, 2]
@@ -676,21 +856,50 @@ def multistate_string_to_integer(string_array, mapping):
     if not len(string_array):
         return string_array
 
-    output_array = string_array.copy()
-    # values need converting using mapping
-    for int_value, str_value in mapping.iteritems():
-        output_array.data[string_array.data == str_value] = int_value
-    output_array.fill_value = 999999  #NB: only 999 will be stored by dtype
+    reversed_mapping = {v: k for k, v in mapping.iteritems()}
+
+    def to_integer(value):
+        if value in reversed_mapping:
+            return reversed_mapping[value]
+        try:
+            return int(value)
+        except ValueError:
+            raise ValueError("No value in values_mapping found for %s" % value)
+
+    data = np.ma.getdata(string_array)
+    mask = np.ma.getmaskarray(string_array)
+    #NB: only 999 of 999999 will be stored by a string dtype of length 3.
+    fill_value = int(np.array([999999]).astype(data.dtype)[0])
+    int_data = np.empty(len(data), dtype=int)
     # apply fill_value to all masked values
-    output_array.data[np.ma.where(output_array.mask)] = output_array.fill_value
-    try:
-        int_array = output_array.astype(int)
-    except ValueError as err:
-        msg = "No value in values_mapping found for %s" % str(err).split("'")[-2]
-        raise ValueError(msg)
+    int_data[mask] = fill_value
+    # Convert each distinct value once rather than comparing every value
+    # with every state.
+    int_data[~mask] = _map_unique(data[~mask], to_integer)
+    int_array = np.ma.array(int_data, mask=np.ma.getmask(string_array),
+                            fill_value=fill_value)
+    # Do not share the mask with the string array.
+    int_array.unshare_mask()
     return int_array
 
 
+def _map_unique(array, function):
+    """
+    Apply function to each distinct value of the array rather than every
+    value.
+
+    :param array: Array of values to convert.
+    :type array: np.array
+    :param function: Function converting a value to an integer.
+    :type function: callable
+    :returns: Converted values.
+    :rtype: np.array(dtype=int)
+    """
+    uniques, inverse = np.unique(array, return_inverse=True)
+    return np.array([function(value) for value in uniques],
+                    dtype=int)[inverse]
+
+
 class MultistateDerivedParameterNode(DerivedParameterNode):
     '''
     MappedArray stored as array will be of integer dtype.
@@ -732,6 +941,25 @@ class MultistateDerivedParameterNode(DerivedParameterNode):
                 name, array, frequency, offset, data_type, *args,
                 **kwargs)
     
+    def get_storage_dtype(self):
+        '''
+        :returns: The smallest integer dtype which holds the unmasked raw values of the array, unless storage_dtype is set.
+        :rtype: np.dtype or None
+        '''
+        if self.storage_dtype:
+            return np.dtype(self.storage_dtype)
+        # Masked samples hold the fill value (see
+        # multistate_string_to_integer), which need not be stored.
+        data = np.ma.getdata(self.array)[~np.ma.getmaskarray(self.array)]
+        if not len(data):
+            return None
+        low, high = data.min(), data.max()
+        for dtype in (np.int8, np.int16):
+            info = np.iinfo(dtype)
+            if info.min <= low and high <= info.max:
+                return np.dtype(dtype)
+        return None
+
     def get_derived(self, *args, **kwargs):
         node = super(MultistateDerivedParameterNode, self).get_derived(*args,
                                                                        **kwargs)
@@ -762,14 +990,16 @@ class MultistateDerivedParameterNode(DerivedParameterNode):
                     __setattr__(name, value)
 
         if name == 'values_mapping':
-            if hasattr(self, 'array'):
+            if hasattr(self, 'array') and \
+               getattr(self.array, 'values_mapping', None) is not value:
                 self.array.values_mapping = value
             return object.__setattr__(self, name, value)
         # setting 'self.array'
         if isinstance(value, MappedArray):
             # see which values_mapping has been set
             if getattr(self, 'values_mapping', '') and getattr(value, 'values_mapping', ''):
-                if self.values_mapping == value.values_mapping:
+                if self.values_mapping is value.values_mapping or \
+                   self.values_mapping == value.values_mapping:
                     # two arrays are the same, nothing to do
                     pass
                 else:
@@ -802,7 +1032,12 @@ class MultistateDerivedParameterNode(DerivedParameterNode):
             # assume a list of mapped values
             reversed_mapping = {v: k for k, v in self.values_mapping.items()}
             #Q: change "int" to "float"
-            data = [int(reversed_mapping[v]) for v in value]
+            if len(value):
+                # Look up each distinct state once rather than every value.
+                data = _map_unique(np.asarray(value),
+                                   lambda v: int(reversed_mapping[v]))
+            else:
+                data = []
             value = MappedArray(data, values_mapping=self.values_mapping)
         else:
             raise ValueError('Invalid argument type assigned to array: %s'
@@ -859,15 +1094,55 @@ def derived_param_from_hdf(hdf_parameter):
         )
 
 
+def _clears_cache(method, attr):
+    '''
+    Wraps a list method so that calling it clears a cached attribute of the
+    node, e.g. the columns of a FormattedNameNode.
+
+    :param method: list method which modifies the contents of the list.
+    :type method: method_descriptor
+    :param attr: Name of the cached attribute.
+    :type attr: str
+    :rtype: function
+    '''
+    def wrapper(self, *args, **kwargs):
+        # __dict__ may not be restored yet when items are appended while
+        # unpickling.
+        self.__dict__.pop(attr, None)
+        return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+
 class SectionNode(Node, list):
     '''
     Derives from list to implement iteration and list methods.
 
     Is a list of Section namedtuples, each with attributes .name, .slice,
     .start_edge and .stop_edge
+
+    Queries by index (get_surrounding, get_next, get_previous and get with
+    name, containing_index or within_slice) use a sorted interval index of
+    the section slices (see SectionIndex) which is built when first required
+    and cleared whenever the list is modified.
     '''
     node_type_abbr = 'Phase'
-    
+
+    # Modifying the list clears the cached interval index.
+    append = _clears_cache(list.append, '_interval_index')
+    extend = _clears_cache(list.extend, '_interval_index')
+    insert = _clears_cache(list.insert, '_interval_index')
+    pop = _clears_cache(list.pop, '_interval_index')
+    remove = _clears_cache(list.remove, '_interval_index')
+    reverse = _clears_cache(list.reverse, '_interval_index')
+    sort = _clears_cache(list.sort, '_interval_index')
+    __delitem__ = _clears_cache(list.__delitem__, '_interval_index')
+    __delslice__ = _clears_cache(list.__delslice__, '_interval_index')
+    __iadd__ = _clears_cache(list.__iadd__, '_interval_index')
+    __setitem__ = _clears_cache(list.__setitem__, '_interval_index')
+    __setslice__ = _clears_cache(list.__setslice__, '_interval_index')
+
     def __init__(self, *args, **kwargs):
         '''
         List of slices where this phase is active. Has a frequency and offset.
@@ -880,6 +1155,99 @@ class SectionNode(Node, list):
             del kwargs['items']
         super(SectionNode, self).__init__(*args, **kwargs)
 
+    def __getstate__(self):
+        '''
+        Get the state of the object for pickling without the cached interval
+        index.
+
+        :rtype: dict
+        '''
+        state = self.__dict__.copy()
+        state.pop('_interval_index', None)
+        return state
+
+    def _get_interval_index(self):
+        '''
+        Build the interval index of this node's sections if it has not
+        already been built.
+
+        :returns: Interval index of the sections or None if the section slices are not numeric.
+        :rtype: SectionIndex or None
+        '''
+        interval_index = self.__dict__.get('_interval_index')
+        if interval_index is not None:
+            return interval_index
+        count = len(self)
+        none_as = lambda value, default: default if value is None else value
+        try:
+            starts = np.fromiter((none_as(s.slice.start, -np.inf)
+                                  for s in self), dtype=np.float64,
+                                 count=count)
+            stops = np.fromiter((none_as(s.slice.stop, -np.inf)
+                                 for s in self), dtype=np.float64,
+                                count=count)
+            stops_inf = np.fromiter((none_as(s.slice.stop, np.inf)
+                                     for s in self), dtype=np.float64,
+                                    count=count)
+        except (AttributeError, TypeError, ValueError):
+            return None
+        names = np.empty(count, dtype=object)
+        names[:] = [s.name for s in self]
+        order = np.argsort(starts, kind='mergesort')
+        interval_index = SectionIndex(names, starts, stops, stops_inf, order,
+                                      starts[order])
+        self._interval_index = interval_index
+        return interval_index
+
+    def _get_mask(self, interval_index, name=None, containing_index=None,
+                  within_slice=None, within_use='slice', param=None):
+        '''
+        Interval index equivalent of _get_condition. Returns a boolean array
+        which is True for sections matching the arguments of _get_condition
+        (see docstring).
+
+        :param interval_index: Interval index of self.
+        :type interval_index: SectionIndex
+        :returns: Either a boolean array or None if the arguments cannot be evaluated using the interval index.
+        :rtype: np.array(dtype=bool) or None
+        '''
+        if param is not None or (within_slice and
+                                 within_use not in ('start', 'stop')):
+            return None
+        mask = np.ones(len(interval_index.starts), dtype=np.bool_)
+        if within_slice:
+            values = (interval_index.starts if within_use == 'start'
+                      else interval_index.stops)
+            if within_slice.start is not None:
+                mask &= values >= within_slice.start
+            if within_slice.stop is not None:
+                mask &= values < within_slice.stop
+        if name:
+            mask &= interval_index.names == name
+        if containing_index is not None:
+            mask &= interval_index.starts <= containing_index
+            mask &= containing_index < interval_index.stops_inf
+        return mask
+
+    def _get_ordered_positions(self, **kwargs):
+        '''
+        Positions of the sections matching the arguments of _get_condition
+        ordered by slice start.
+
+        :param kwargs: Passed into _get_condition (see docstring).
+        :returns: Interval index and positions or None if the interval index cannot be used.
+        :rtype: (SectionIndex, np.array(dtype=int)) or None
+        '''
+        interval_index = self._get_interval_index()
+        if interval_index is None:
+            return None
+        if not kwargs:
+            return interval_index, interval_index.order
+        mask = self._get_mask(interval_index, **kwargs)
+        if mask is None:
+            return None
+        return interval_index, interval_index.order[mask[interval_index.order]]
+
     def create_section(self, section_slice, name='', begin=None, end=None):
         """
         Create a slice of the data.
@@ -1008,8 +1376,15 @@ class SectionNode(Node, list):
         :returns: An object of the same type as self containing matching elements.
         :rtype: Section
         '''
-        condition = self._get_condition(**kwargs)
-        matching = [s for s in self if condition(s)]
+        interval_index = self._get_interval_index() if kwargs else None
+        mask = None
+        if interval_index is not None:
+            mask = self._get_mask(interval_index, **kwargs)
+        if mask is None:
+            condition = self._get_condition(**kwargs)
+            matching = [s for s in self if condition(s)]
+        else:
+            matching = [self[p] for p in np.flatnonzero(mask).tolist()]
         return self.__class__(name=self.name, frequency=self.frequency,
                               offset=self.offset, items=matching)
 
@@ -1072,6 +1447,20 @@ class SectionNode(Node, list):
         '''
         if frequency:
             index = index * (self.frequency / frequency)
+        ordered = None
+        if use in ('start', 'stop') and 'order_by' not in kwargs:
+            ordered = self._get_ordered_positions(**kwargs)
+        if ordered is not None:
+            interval_index, positions = ordered
+            if use == 'start' and not kwargs:
+                # Sections are ordered by start so bisect.
+                found = np.searchsorted(interval_index.sorted_starts, index,
+                                        side='right')
+                found = [found] if found < len(positions) else []
+            else:
+                values = getattr(interval_index, use + 's')[positions]
+                found = np.flatnonzero(values > index)
+            return self[positions[found[0]]] if len(found) else None
         ordered = self.get_ordered_by_index(**kwargs)
         for elem in ordered:
             if getattr(elem.slice, use) > index:
@@ -1095,6 +1484,20 @@ class SectionNode(Node, list):
         '''
         if frequency:
             index = index * (self.frequency / frequency)
+        ordered = None
+        if use in ('start', 'stop') and 'order_by' not in kwargs:
+            ordered = self._get_ordered_positions(**kwargs)
+        if ordered is not None:
+            interval_index, positions = ordered
+            if use == 'start' and not kwargs:
+                # Sections are ordered by start so bisect.
+                found = np.searchsorted(interval_index.sorted_starts, index,
+                                        side='left')
+                found = [found - 1] if found else []
+            else:
+                values = getattr(interval_index, use + 's')[positions]
+                found = np.flatnonzero(values < index)
+            return self[positions[found[-1]]] if len(found) else None
         ordered = self.get_ordered_by_index(**kwargs)
         for elem in reversed(ordered):
             if getattr(elem.slice, use) < index:
@@ -1137,6 +1540,18 @@ class SectionNode(Node, list):
         :returns: List of surrounding sections
         :rtype: List of sections
         '''
+        interval_index = None
+        if index is not None:
+            interval_index = self._get_interval_index()
+        if interval_index is not None:
+            # Only sections starting at or before index can surround it.
+            candidates = interval_index.order[:np.searchsorted(
+                interval_index.sorted_starts, index, side='right')]
+            candidates = np.sort(
+                candidates[interval_index.stops_inf[candidates] >= index])
+            return self.__class__(
+                name=self.name, frequency=self.frequency, offset=self.offset,
+                items=[self[p] for p in candidates.tolist()])
         surrounded = []
         for section in self:
             if section.slice.start <= index <= section.slice.stop or\
@@ -1197,16 +1612,201 @@ class FormattedNameNode(ListNode):
     NAME_VALUES example:
     {'phase'    : ['ascent', 'descent'],
      'altitude' : [1000,1500],}
+
+    Columnar storage
+    ----------------
+
+    Columnar storage is optional and disabled by default. Nodes opt in by
+    setting columnar = True on the class or passing columnar=True. The index,
+    value and name of the items are then also held within numpy arrays (see
+    Columns) which are built when first required and cleared whenever the
+    list is modified. get and the get_* helpers use these arrays instead of
+    filtering the items in Python. KPVs and KTIs are mutable, so only opt in
+    for nodes whose items are not modified in place, as the arrays would not
+    be updated. get_aligned always takes the index from the items.
+
+    Names are formatted once per class (see _get_name_cache). Reassign
+    NAME_VALUES, or one of its sequences, to change the names rather than
+    replacing the values of a sequence in place.
     '''
     NAME_FORMAT = ""
     NAME_VALUES = {}
+    columnar = False
 
     def __init__(self, *args, **kwargs):
         '''
         TODO: describe restrict_names
+
+        :param columnar: Optional keyword argument to enable or disable columnar storage.
+        :type columnar: bool
         '''
         super(FormattedNameNode, self).__init__(*args, **kwargs)
         self.restrict_names = kwargs.get('restrict_names', True)
+        if 'columnar' in kwargs:
+            self.columnar = kwargs['columnar']
+
+    # Modifying the list clears the cached columns.
+    append = _clears_cache(list.append, '_columns')
+    extend = _clears_cache(list.extend, '_columns')
+    insert = _clears_cache(list.insert, '_columns')
+    pop = _clears_cache(list.pop, '_columns')
+    remove = _clears_cache(list.remove, '_columns')
+    reverse = _clears_cache(list.reverse, '_columns')
+    sort = _clears_cache(list.sort, '_columns')
+    __delitem__ = _clears_cache(list.__delitem__, '_columns')
+    __delslice__ = _clears_cache(list.__delslice__, '_columns')
+    __iadd__ = _clears_cache(list.__iadd__, '_columns')
+    __setitem__ = _clears_cache(list.__setitem__, '_columns')
+    __setslice__ = _clears_cache(list.__setslice__, '_columns')
+
+    def __getstate__(self):
+        '''
+        Get the state of the object for pickling without the cached columns.
+
+        :rtype: dict
+        '''
+        state = self.__dict__.copy()
+        state.pop('_columns', None)
+        return state
+
+    def _get_columns(self):
+        '''
+        Build the columns of this node's items if they have not already been
+        built.
+
+        :returns: Columns of the items or None if columnar storage is disabled or the items cannot be represented as columns.
+        :rtype: Columns or None
+        '''
+        if not self.columnar:
+            return None
+        columns = self.__dict__.get('_columns')
+        if columns is not None:
+            return columns
+        count = len(self)
+        names = {}
+        try:
+            index = np.fromiter((e.index for e in self), dtype=np.float64,
+                                count=count)
+            name_id = np.fromiter((names.setdefault(e.name, len(names))
+                                   for e in self), dtype=np.int32,
+                                  count=count)
+        except (AttributeError, TypeError, ValueError):
+            # Items are not KPVs or KTIs or have an index of None.
+            return None
+        try:
+            value = np.fromiter((e.value for e in self), dtype=np.float64,
+                                count=count)
+        except (AttributeError, TypeError, ValueError):
+            value = None
+        columns = Columns(index, value, name_id, names)
+        self._columns = columns
+        return columns
+
+    def _from_columns(self, columns, positions, cls=None):
+        '''
+        Create a node of the same type containing the items at positions
+        with the matching columns already set.
+
+        :param columns: Columns of self.
+        :type columns: Columns
+        :param positions: Positions of the items within self.
+        :type positions: np.array(dtype=int)
+        :param cls: Class of the node to create, defaults to self.__class__.
+        :type cls: class
+        :rtype: FormattedNameNode
+        '''
+        node = (cls or self.__class__)(
+            name=self.name, frequency=self.frequency, offset=self.offset,
+            items=[self[p] for p in positions.tolist()])
+        node.columnar = self.columnar
+        node._columns = Columns(
+            columns.index[positions],
+            None if columns.value is None else columns.value[positions],
+            columns.name_id[positions], columns.names)
+        return node
+
+    def _get_aligned_columns(self, multiplier, offset, aligned_node):
+        '''
+        Extend aligned_node with copies of this node's items with the index
+        of each item aligned using the columns.
+
+        :param multiplier: Ratio of frequencies used to align the index.
+        :type multiplier: float
+        :param offset: Offset applied to the index after multiplication.
+        :type offset: float
+        :param aligned_node: Empty node to extend with aligned items.
+        :type aligned_node: FormattedNameNode
+        :returns: Whether the items could be aligned using the columns.
+        :rtype: bool
+        '''
+        columns = self._get_columns()
+        if columns is None:
+            return False
+        # Take the index from the items rather than the cached columns in
+        # case an item has been modified in place.
+        index = np.fromiter((e.index for e in self), dtype=np.float64,
+                            count=len(self))
+        index = (index * multiplier) + offset
+        aligned_items = []
+        for item, index_aligned in izip(self, index.tolist()):
+            aligned_item = copy.copy(item)
+            aligned_item.index = index_aligned
+            aligned_items.append(aligned_item)
+        aligned_node.extend(aligned_items)
+        aligned_node.columnar = True
+        aligned_node._columns = columns._replace(index=index)
+        return True
+
+    @classmethod
+    def _get_name_cache(cls):
+        '''
+        Builds the names for this class once and stores them on the class.
+        The cache is rebuilt if NAME_FORMAT or NAME_VALUES are reassigned or
+        if a NAME_VALUES key is added, removed, replaced or changes length
+        (e.g. when patched within tests). Values replaced within a sequence
+        in place are not detected since comparing the contents of every
+        sequence would cost more than formatting the name.
+
+        The cache contains the ordered names, a frozenset of the names for
+        validation and a lookup of NAME_VALUES combinations (ordered by
+        NAME_VALUES keys) to the formatted name. The lookup is keyed by each
+        value and its type, since equal values of different types, such as
+        1 and 1.0 or True, may be formatted differently.
+
+        :returns: The name cache for this class.
+        :rtype: NameCache
+        '''
+        signature = tuple((k, id(v), len(v)) for k, v in
+                          cls.NAME_VALUES.iteritems())
+        cache = cls.__dict__.get('_name_cache')
+        if cache and cache.name_format == cls.NAME_FORMAT \
+           and cache.signature == signature:
+            return cache
+
+        keys = tuple(cls.NAME_VALUES.keys())
+        names = []
+        lookup = {}
+        if not cls.NAME_FORMAT and not cls.NAME_VALUES:
+            names.append(cls.get_name())
+        else:
+            for values in product(*cls.NAME_VALUES.values()):
+                name = cls.NAME_FORMAT % dict(zip(keys, values))
+                names.append(name)
+                try:
+                    lookup.setdefault(
+                        tuple((value, type(value)) for value in values), name)
+                except TypeError:
+                    # Unhashable name value, names will be formatted instead.
+                    pass
+        # name_values keeps the value sequences referenced so that their ids
+        # within the signature cannot be reused.
+        cache = NameCache(cls.NAME_FORMAT, tuple(cls.NAME_VALUES.values()),
+                          signature, keys, tuple(names), frozenset(names),
+                          lookup)
+        # Stored within the class' own __dict__ so that subclasses do not
+        # share the cache.
+        cls._name_cache = cache
+        return cache
 
     @classmethod
     def names(cls):
@@ -1214,18 +1814,7 @@ class FormattedNameNode(ListNode):
         :returns: The product of all NAME_VALUES name combinations
         :rtype: list
         """
-        # XXX: cache option below disabled until required. Should we create this
-        # on init and remove the property instead?
-        ##if hasattr(cls, 'names'):
-            ##return cls.names
-        if not cls.NAME_FORMAT and not cls.NAME_VALUES:
-            return [cls.get_name()]
-        names = []
-        for a in product(*cls.NAME_VALUES.values()):
-            name = cls.NAME_FORMAT % dict(zip(cls.NAME_VALUES.keys(), a))
-            names.append(name)
-        ##cls.names = names  #cache
-        return names
+        return list(cls._get_name_cache().names)
 
     def _validate_name(self, name):
         """
@@ -1234,7 +1823,7 @@ class FormattedNameNode(ListNode):
         :type name: str
         :rtype: bool
         """
-        return name in self.names()
+        return name in self._get_name_cache().valid_names
 
     def format_name(self, replace_values={}, **kwargs):
         """
@@ -1254,6 +1843,13 @@ class FormattedNameNode(ListNode):
             return self.get_name()
         rvals = replace_values.copy()  # avoid re-using static type
         rvals.update(kwargs)
+        cache = self._get_name_cache()
+        try:
+            # Fast path: lookup the pre-formatted name for these values.
+            return cache.lookup[tuple((rvals[k], type(rvals[k]))
+                                      for k in cache.keys)]
+        except (KeyError, TypeError):
+            pass
         name = self.NAME_FORMAT % rvals  # common error is to use { inplace of (
         # validate name is allowed
         if not self._validate_name(name):
@@ -1288,14 +1884,60 @@ class FormattedNameNode(ListNode):
         elif within_slices:
             return within_slices_func
         elif name:
-            if self.restrict_names and name not in self.names():
-                raise ValueError("Attempted to filter by invalid name '%s' "
-                                 "within '%s'." % (name,
-                                                   self.__class__.__name__))
+            self._check_filter_name(name)
             return name_func
         else:
             return None
 
+    def _check_filter_name(self, name):
+        '''
+        :type name: str
+        :raises ValueError: If restrict_names is True and name is not valid.
+        '''
+        if self.restrict_names and not self._validate_name(name):
+            raise ValueError("Attempted to filter by invalid name '%s' "
+                             "within '%s'." % (name, self.__class__.__name__))
+
+    def _get_mask(self, columns, within_slice=None, within_slices=None,
+                  name=None):
+        '''
+        Columnar equivalent of _get_condition. Returns a boolean array which
+        is True for elements within a slice or with a specified name if they
+        are provided.
+
+        :param columns: Columns of self.
+        :type columns: Columns
+        :param within_slice: Only return elements within this slice.
+        :type within_slice: slice
+        :param within_slices: Only return elements within these slices.
+        :type within_slices: [slice]
+        :param name: Only return elements with this name.
+        :type name: str
+        :returns: Either a boolean array or None if all elements match.
+        :rtype: np.array(dtype=bool) or None
+        '''
+        if within_slice and within_slices:
+            within_slices.append(within_slice)
+        elif within_slice:
+            within_slices = [within_slice]
+
+        mask = None
+        if within_slices:
+            mask = np.zeros(len(columns.index), dtype=np.bool_)
+            for _slice in within_slices:
+                within = np.ones(len(columns.index), dtype=np.bool_)
+                if _slice.start is not None:
+                    within &= columns.index >= _slice.start
+                if _slice.stop is not None:
+                    within &= columns.index < _slice.stop
+                mask |= within
+        if name:
+            if not within_slices:
+                self._check_filter_name(name)
+            name_mask = columns.name_id == columns.names.get(name, -1)
+            mask = name_mask if mask is None else mask & name_mask
+        return mask
+
     def get(self, **kwargs):
         '''
         Gets elements either within_slice or with name.
@@ -1308,10 +1950,18 @@ class FormattedNameNode(ListNode):
         :returns: An object of the same type as self containing elements ordered by index.
         :rtype: self.__class__
         '''
-        condition = self._get_condition(**kwargs)
-        matching = filter(condition, self) if condition else self
-        return self.__class__(name=self.name, frequency=self.frequency,
-                              offset=self.offset, items=matching)
+        columns = self._get_columns()
+        if columns is None:
+            condition = self._get_condition(**kwargs)
+            matching = filter(condition, self) if condition else self
+            return self.__class__(name=self.name, frequency=self.frequency,
+                                  offset=self.offset, items=matching)
+        mask = self._get_mask(columns, **kwargs)
+        if mask is None:
+            positions = np.arange(len(self))
+        else:
+            positions = np.flatnonzero(mask)
+        return self._from_columns(columns, positions)
 
     def get_ordered_by_index(self, **kwargs):
         '''
@@ -1323,6 +1973,11 @@ class FormattedNameNode(ListNode):
         :rtype: self.__class__
         '''
         matching = self.get(**kwargs)
+        columns = matching._get_columns()
+        if columns is not None:
+            # A stable sort matches the ordering of sorted().
+            return matching._from_columns(
+                columns, np.argsort(columns.index, kind='mergesort'))
         ordered_by_index = sorted(matching, key=attrgetter('index'))
         return self.__class__(name=self.name, frequency=self.frequency,
                               offset=self.offset, items=ordered_by_index)
@@ -1337,10 +1992,12 @@ class FormattedNameNode(ListNode):
         :rtype: item within self or None
         '''
         matching = self.get(**kwargs)
-        if matching:
-            return min(matching, key=attrgetter('index')) if matching else None
-        else:
+        if not matching:
             return None
+        columns = matching._get_columns()
+        if columns is not None:
+            return matching[int(np.argmin(columns.index))]
+        return min(matching, key=attrgetter('index'))
 
     def get_last(self, **kwargs):
         '''
@@ -1352,10 +2009,12 @@ class FormattedNameNode(ListNode):
         :rtype: item within self or None
         '''
         matching = self.get(**kwargs)
-        if matching:
-            return max(matching, key=attrgetter('index')) if matching else None
-        else:
+        if not matching:
             return None
+        columns = matching._get_columns()
+        if columns is not None:
+            return matching[int(np.argmax(columns.index))]
+        return max(matching, key=attrgetter('index'))
 
     def get_next(self, index, frequency=None, **kwargs):
         '''
@@ -1581,6 +2240,8 @@ class KeyTimeInstanceNode(FormattedNameNode):
         offset = (self.offset - param.offset) * param.frequency
         aligned_node = self.__class__(self.name, param.frequency,
                                       param.offset)
+        if self._get_aligned_columns(multiplier, offset, aligned_node):
+            return aligned_node
         for kti in self:
             aligned_kti = copy.copy(kti)
             index_aligned = (kti.index * multiplier) + offset
@@ -1591,6 +2252,54 @@ class KeyTimeInstanceNode(FormattedNameNode):
         return aligned_node
 
 
+def _segmentable(slices):
+    '''
+    :returns: Whether values can be found within the slices by one of the SEGMENTED_FUNCTIONS.
+    :rtype: bool
+    '''
+    return all(s.step in (None, 1) and
+               (s.start is None or s.start >= 0) and
+               (s.stop is None or s.stop >= 0) for s in slices)
+
+
+def _joined_extreme_value(array, slices, values, function):
+    '''
+    Find the value function would return from the slices of the array
+    joined together, i.e. the first of the most extreme values within the
+    slices.
+
+    :param slices: Slices of the array.
+    :type slices: [slice]
+    :param values: Value within each slice, from SEGMENTED_FUNCTIONS[function].
+    :type values: [Value]
+    :param function: max_value, min_value or max_abs_value.
+    :type function: function
+    :returns: Index within the joined slices and value.
+    :rtype: (int or None, float or None)
+    '''
+    comparison = lt if function is min_value else gt
+    key = abs if function is max_abs_value else lambda value: value
+    result = (None, None)
+    offset = 0
+    for slice_, (index, value) in izip(slices, values):
+        start = min(int(slice_.start or 0), len(array))
+        stop = len(array) if slice_.stop is None else \
+            min(int(slice_.stop), len(array))
+        if index is not None:
+            if result[0] is None:
+                result = (offset + int(index) - start, value)
+            else:
+                previous = key(result[1])
+                if previous != previous:
+                    # The first NaN is the extreme, as with np.ma.argmax.
+                    break
+                current = key(value)
+                if current != current or comparison(current, previous):
+                    result = (offset + int(index) - start, value)
+        offset += max(stop - start, 0)
+    return result
+
+
 class KeyPointValueNode(FormattedNameNode):
     node_type_abbr = 'KPV'
     
@@ -1680,6 +2389,8 @@ class KeyPointValueNode(FormattedNameNode):
         multiplier = param.frequency / self.frequency
         offset = (self.offset - param.offset) * param.frequency
         aligned_node = self.__class__(self.name, param.frequency, param.offset)
+        if self._get_aligned_columns(multiplier, offset, aligned_node):
+            return aligned_node
         for kpv in self:
             aligned_kpv = copy.copy(kpv)
             aligned_kpv.index = (aligned_kpv.index * multiplier) + offset
@@ -1699,10 +2410,12 @@ class KeyPointValueNode(FormattedNameNode):
         :rtype: KeyPointValue
         '''
         matching = self.get(**kwargs)
-        if matching:
-            return max(matching, key=attrgetter('value')) if matching else None
-        else:
+        if not matching:
             return None
+        columns = matching._get_columns()
+        if columns is not None and columns.value is not None:
+            return matching[int(np.argmax(columns.value))]
+        return max(matching, key=attrgetter('value'))
 
     def get_min(self, **kwargs):
         '''
@@ -1713,10 +2426,12 @@ class KeyPointValueNode(FormattedNameNode):
         :rtype: KeyPointValue
         '''
         matching = self.get(**kwargs)
-        if matching:
-            return min(matching, key=attrgetter('value')) if matching else None
-        else:
+        if not matching:
             return None
+        columns = matching._get_columns()
+        if columns is not None and columns.value is not None:
+            return matching[int(np.argmin(columns.value))]
+        return min(matching, key=attrgetter('value'))
 
     def get_ordered_by_value(self, **kwargs):
         '''
@@ -1727,6 +2442,12 @@ class KeyPointValueNode(FormattedNameNode):
         :rtype: KeyPointValueNode
         '''
         matching = self.get(**kwargs)
+        columns = matching._get_columns()
+        if columns is not None and columns.value is not None:
+            # A stable sort matches the ordering of sorted().
+            return matching._from_columns(
+                columns, np.argsort(columns.value, kind='mergesort'),
+                cls=KeyPointValueNode)
         ordered_by_value = sorted(matching, key=attrgetter('value'))
         return KeyPointValueNode(name=self.name, frequency=self.frequency,
                                  offset=self.offset, items=ordered_by_value)
@@ -1748,10 +2469,24 @@ class KeyPointValueNode(FormattedNameNode):
         :returns None:
         :rtype: None
         '''
-        for kti in ktis:
-            value = value_at_index(array, kti.index, interpolate=interpolate)
+        indices = [kti.index for kti in ktis]
+        if isinstance(array, MappedArray) or None in indices:
+            # States and missing indices are sourced one at a time.
+            values = [value_at_index(array, index, interpolate=interpolate)
+                      for index in indices]
+        else:
+            # Interpolate the values at all indices at once.
+            values = values_at_indices_list(array, indices,
+                                            interpolate=interpolate)
+            for position, value in enumerate(values):
+                if value is None:
+                    # Masked values are either None or a masked sample at the
+                    # edge of the array from value_at_index.
+                    values[position] = value_at_index(
+                        array, indices[position], interpolate=interpolate)
+        for index, value in izip(indices, values):
             if not suppress_zeros or value:
-                self.create_kpv(kti.index, value)
+                self.create_kpv(index, value)
 
     create_kpvs_at_kpvs = create_kpvs_at_ktis # both will work the same!
 
@@ -1769,20 +2504,35 @@ class KeyPointValueNode(FormattedNameNode):
         :returns: None
         :rtype: None
         '''
+        slices_and_edges = []
         for slice_ in slices:
 
             if isinstance(slice_, Section):
-                index, value = function(array, slice_.slice,
-                                    start_edge=slice_.start_edge,
-                                    stop_edge=slice_.stop_edge)
+                slices_and_edges.append((slice_.slice, slice_.start_edge,
+                                         slice_.stop_edge))
             else:
                 # Where slice.stop is not a whole number, it is assumed that the
                 # value is an stop_edge rather than an inclusive pythonic end to a
                 # range (stop+1) as a slice should be.
                 stop = slice_.stop if slice_.stop%1 else None
-                index, value = function(array, slice_,
-                                    start_edge=slice_.start,
-                                    stop_edge=stop)
+                slices_and_edges.append((slice_, slice_.start, stop))
+
+        if not slices_and_edges:
+            return
+
+        segmented_function = SEGMENTED_FUNCTIONS.get(function)
+        _slices, start_edges, stop_edges = zip(*slices_and_edges)
+        if segmented_function and _segmentable(_slices):
+            # Find the values within all slices at once.
+            values = segmented_function(
+                array, [s.start for s in _slices], [s.stop for s in _slices],
+                start_edges=start_edges, stop_edges=stop_edges)
+        else:
+            values = [function(array, slice_, start_edge=start_edge,
+                               stop_edge=stop_edge)
+                      for slice_, start_edge, stop_edge in slices_and_edges]
+
+        for index, value in values:
             self.create_kpv(index, value, **kwargs)
 
     def create_kpv_from_slices(self, array, slices, function, **kwargs):
@@ -1803,12 +2553,21 @@ class KeyPointValueNode(FormattedNameNode):
         if not all(s.step in (1, None) for s in slices):
             raise ValueError('Slices must have a step of 1 in '
                              'create_kpv_from_slices.')
-        arrays = [array[s] for s in slices]
-        # Trap for empty arrays or no slices to scan.
-        if not arrays:
+        # Trap for no slices to scan.
+        if not slices:
             return
-        joined_array = np.ma.concatenate(arrays)
-        index, value = function(joined_array)
+        segmented_function = SEGMENTED_FUNCTIONS.get(function)
+        if segmented_function and _segmentable(slices):
+            # Find the value within each slice rather than joining copies of
+            # the slices, then the first of the most extreme values.
+            index, value = _joined_extreme_value(
+                array, slices,
+                segmented_function(array, [s.start for s in slices],
+                                   [s.stop for s in slices]),
+                function)
+        else:
+            joined_array = np.ma.concatenate([array[s] for s in slices])
+            index, value = function(joined_array)
         if index is None:
             return
         # Find where the joined_array index is in the original array.
@@ -2190,6 +2949,76 @@ class ApproachNode(ListNode):
 App = ApproachNode
 
 
+class IndexedList(list):
+    """
+    List which indexes its items within a set for fast membership tests, e.g.
+    of parameter names within a NodeManager's hdf_keys. The index is built
+    when first required.
+    """
+    def _get_index(self):
+        index = self.__dict__.get('_index')
+        if index is None:
+            index = self._index = set(self)
+        return index
+
+    def __contains__(self, item):
+        return item in self._get_index()
+
+    def append(self, item):
+        super(IndexedList, self).append(item)
+        self._get_index().add(item)
+
+    def extend(self, iterable):
+        items = list(iterable)
+        super(IndexedList, self).extend(items)
+        self._get_index().update(items)
+
+    def __iadd__(self, iterable):
+        self.extend(iterable)
+        return self
+
+    # Items which are removed may have duplicates, so clear the index.
+    __delitem__ = _clears_cache(list.__delitem__, '_index')
+    __delslice__ = _clears_cache(list.__delslice__, '_index')
+    __setitem__ = _clears_cache(list.__setitem__, '_index')
+    __setslice__ = _clears_cache(list.__setslice__, '_index')
+    insert = _clears_cache(list.insert, '_index')
+    pop = _clears_cache(list.pop, '_index')
+    remove = _clears_cache(list.remove, '_index')
+
+
+def can_operate_attribute_names(node):
+    """
+    The names are stored within the node class' own __dict__ with the
+    can_operate function they were read from, so that subclasses and
+    patched can_operate methods are inspected again.
+
+    :param node: Node class.
+    :type node: class
+    :raises TypeError: If can_operate has keyword arguments which are not Attributes.
+    :returns: Names of the Attributes can_operate expects after the available dependencies.
+    :rtype: tuple of str
+    """
+    can_operate = getattr(node.can_operate, '__func__', node.can_operate)
+    cached = getattr(node, '__dict__', {}).get('_can_operate_attributes')
+    if cached and cached[0] is can_operate:
+        return cached[1]
+    # NOTE: Raises "Unbound method" here due to can_operate being
+    # overridden without wrapping with @classmethod decorator
+    names = []
+    argspec = inspect.getargspec(node.can_operate)
+    if argspec.defaults:
+        for default in argspec.defaults:
+            if not isinstance(default, Attribute):
+                raise TypeError('Only Attributes may be keyword '
+                                'arguments in can_operate methods.')
+            names.append(default.name)
+    names = tuple(names)
+    if isinstance(node, type):
+        node._can_operate_attributes = (can_operate, names)
+    return names
+
+
 class NodeManager(object):
     def __repr__(self):
         return 'NodeManager: x%d nodes in total' % (
@@ -2222,13 +3051,25 @@ class NodeManager(object):
 
         self.start_datetime = start_datetime
         self.hdf_duration = hdf_duration  # secs
-        self.hdf_keys = hdf_keys
+        self.hdf_keys = IndexedList(hdf_keys)
         self.requested = requested
         self.required = required
         self.derived_nodes = derived_nodes
         # Attributes:
         self.aircraft_info = non_empty(aircraft_info)
         self.achieved_flight_record = non_empty(achieved_flight_record)
+        # Attributes keyed by name, built once.
+        self._attributes = {
+            'Start Datetime': Attribute('Start Datetime',
+                                        value=self.start_datetime),
+            'HDF Duration': Attribute('HDF Duration',
+                                      value=self.hdf_duration),  # secs
+        }
+        for info in (self.aircraft_info, self.achieved_flight_record):
+            for name, value in info.iteritems():
+                self._attributes.setdefault(name, Attribute(name, value=value))
+        # Results of operational keyed by name and available dependencies.
+        self._operational = {}
 
     def keys(self):
         """
@@ -2252,16 +3093,7 @@ class NodeManager(object):
         :returns: Attribute if available.
         :rtype: Attribute object or None
         """
-        if name == 'Start Datetime':
-            return Attribute(name, value=self.start_datetime)
-        elif name == 'HDF Duration':
-            return Attribute(name, value=self.hdf_duration)  # secs
-        elif name in self.aircraft_info:
-            return Attribute(name, value=self.aircraft_info[name])
-        elif name in self.achieved_flight_record:
-            return Attribute(name, value=self.achieved_flight_record[name])
-        else:
-            return None
+        return self._attributes.get(name)
 
     def operational(self, name, available):
         """
@@ -2281,22 +3113,21 @@ class NodeManager(object):
              or name in ('root', 'Start Datetime', 'HDF Duration'):
             return True
         elif name in self.derived_nodes:
+            key = (name, frozenset(available))
+            try:
+                return self._operational[key]
+            except KeyError:
+                pass
             derived_node = self.derived_nodes[name]
-            # NOTE: Raises "Unbound method" here due to can_operate being
-            # overridden without wrapping with @classmethod decorator
-            attributes = []
-            argspec = inspect.getargspec(derived_node.can_operate)
-            if argspec.defaults:
-                for default in argspec.defaults:
-                    if not isinstance(default, Attribute):
-                        raise TypeError('Only Attributes may be keyword '
-                                        'arguments in can_operate methods.')
-                    attributes.append(self.get_attribute(default.name))
+            attributes = [self.get_attribute(attribute_name) for
+                          attribute_name in
+                          can_operate_attribute_names(derived_node)]
             # can_operate expects attributes.
             res = derived_node.can_operate(available, *attributes)
             if not res:
                 logger.debug("Derived Node %s cannot operate with available nodes: %s",
                               name, available)
+            self._operational[key] = res
             return res
         else:
             logger.debug("Node '%s' is unavailable", name)
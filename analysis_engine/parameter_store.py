@@ -0,0 +1,258 @@
+import json
+import logging
+import numpy as np
+import os
+import shutil
+
+from hashlib import sha256
+
+from hdfaccess.parameter import MappedArray
+
+from analysis_engine.node import MultistateDerivedParameterNode, Parameter
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = 'index.json'
+
+
+def _dataset_digest(dataset):
+    '''
+    Hash the bytes stored within an HDF dataset. Chunks are hashed as stored
+    without being decompressed where h5py can read them directly (h5py 2.10
+    and HDF5 1.10.5 or later), otherwise the dataset's values are hashed.
+
+    :type dataset: h5py.Dataset
+    :returns: sha256 hash of the dataset's contents.
+    :rtype: str
+    '''
+    digest = sha256()
+    dataset_id = dataset.id
+    if dataset.chunks and hasattr(dataset_id, 'get_chunk_info'):
+        for index in xrange(dataset_id.get_num_chunks()):
+            info = dataset_id.get_chunk_info(index)
+            chunk = dataset_id.read_direct_chunk(info.chunk_offset)
+            if isinstance(chunk, tuple):
+                # The chunk's filter mask is returned along with its bytes.
+                chunk = chunk[1]
+            digest.update(repr(info.chunk_offset))
+            digest.update(chunk)
+    elif dataset.size:
+        digest.update(np.ascontiguousarray(dataset[...]).tostring())
+    return digest.hexdigest()
+
+
+def parameter_signature(hdf, name):
+    '''
+    Describe a parameter within an HDF file by its attributes and the hashed
+    contents of its datasets. The signature changes when the parameter's
+    datasets or attributes are replaced or rewritten, but not when other
+    parameters or attributes of the file are written, e.g. the derived
+    parameters and attributes stored by process_flight.
+
+    :param hdf: HDF file containing the parameter.
+    :type hdf: hdfaccess.file.hdf_file
+    :param name: Name of the parameter.
+    :type name: str
+    :raises KeyError: If the parameter is not within the HDF file.
+    :returns: sha256 hash of the attributes, shapes, dtypes and contents of the parameter's datasets.
+    :rtype: str
+    '''
+    group = hdf.hdf['series'][name]
+    description = [sorted((key, repr(value)) for key, value in
+                          group.attrs.items())]
+    for key in sorted(group.keys()):
+        dataset = group[key]
+        description.append((key, dataset.shape, dataset.dtype.str,
+                            _dataset_digest(dataset),
+                            sorted((k, repr(v)) for k, v in
+                                   dataset.attrs.items())))
+    return sha256(repr(description)).hexdigest()
+
+
+class ParameterStore(object):
+    '''
+    Stores parameter arrays as uncompressed .npy files within a directory.
+
+    Loaded arrays are memory mapped copy-on-write so that all nodes which
+    depend upon a parameter share the same pages rather than each reading
+    and decompressing their own copy from the HDF file. Changes a node makes
+    to its array are private to that node and are never written back.
+
+    If created with keep_source, parameters read from the HDF file are kept
+    within the directory along with an index when the store is closed and
+    are loaded rather than read from the file when the store is next
+    created. Each kept parameter is read from the file again if its
+    signature (see parameter_signature) has changed. Saved derived
+    parameters are discarded.
+    '''
+    def __init__(self, path, keep_source=False):
+        '''
+        :param path: Directory to store the parameter arrays within.
+        :type path: str
+        :param keep_source: Keep the parameters read from the HDF file within the directory between uses.
+        :type keep_source: bool
+        '''
+        self.path = path
+        self.keep_source = keep_source
+        # Parameter name -> attributes of the stored parameter.
+        self._params = {}
+        # Names of kept parameters whose signatures have been checked.
+        self._checked = set()
+        if keep_source:
+            self._params = self._read_index()
+        if not self._params and os.path.isdir(path):
+            # Remove arrays of parameters which are not within the index.
+            shutil.rmtree(path, ignore_errors=True)
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def __contains__(self, name):
+        return name in self._params
+
+    def keys(self):
+        return self._params.keys()
+
+    def _array_path(self, name, kind):
+        return os.path.join(self.path,
+                            '%s.%s.npy' % (self._params[name]['file'], kind))
+
+    def _read_index(self):
+        '''
+        :returns: Attributes of the parameters within the index keyed by name, or empty if there is no index.
+        :rtype: dict
+        '''
+        try:
+            with open(os.path.join(self.path, INDEX_FILENAME)) as index_file:
+                index = json.load(index_file)
+        except (IOError, ValueError):
+            return {}
+        params = index['parameters']
+        for attrs in params.itervalues():
+            if attrs['values_mapping'] is not None:
+                # JSON object keys are always strings.
+                attrs['values_mapping'] = dict(
+                    (int(k), v) for k, v in attrs['values_mapping'].items())
+        return params
+
+    def _remove(self, name):
+        '''
+        Remove a stored parameter and its arrays.
+        '''
+        for kind in ('data', 'mask'):
+            array_path = self._array_path(name, kind)
+            if os.path.exists(array_path):
+                os.remove(array_path)
+        del self._params[name]
+
+    def _write_index(self):
+        '''
+        Write the index of the parameters read from the source file and
+        remove the arrays of any other parameters.
+        '''
+        for name, attrs in self._params.items():
+            if not attrs['source']:
+                self._remove(name)
+        index_path = os.path.join(self.path, INDEX_FILENAME)
+        with open(index_path + '.tmp', 'w') as index_file:
+            json.dump({'parameters': self._params}, index_file)
+        os.rename(index_path + '.tmp', index_path)
+
+    def save(self, param, source=False, signature=None):
+        '''
+        Store a parameter's array and attributes, replacing any previously
+        stored parameter with the same name.
+
+        :param param: Parameter from an HDF file or a derived parameter.
+        :type param: hdfaccess.parameter.Parameter or DerivedParameterNode
+        :param source: Whether the parameter was read from the source HDF file.
+        :type source: bool
+        :param signature: Signature of the parameter within the source HDF file.
+        :type signature: str or None
+        '''
+        attrs = self._params.setdefault(param.name, {
+            'file': sha256(param.name.encode('utf-8')).hexdigest()})
+        array = param.array
+        mask = np.ma.getmask(array)
+        attrs.update(
+            frequency=float(param.frequency),
+            offset=float(param.offset),
+            data_type=getattr(param, 'data_type', None),
+            values_mapping=getattr(array, 'values_mapping', None)
+            if isinstance(array, MappedArray) else None,
+            masked=bool(mask is not np.ma.nomask and mask.any()),
+            source=source,
+            signature=signature,
+        )
+        np.save(self._array_path(param.name, 'data'), np.ma.getdata(array))
+        if attrs['masked']:
+            np.save(self._array_path(param.name, 'mask'), mask)
+
+    def load(self, name):
+        '''
+        :param name: Name of a stored parameter.
+        :type name: str
+        :raises KeyError: If the parameter has not been stored.
+        :returns: Parameter with a copy-on-write memory mapped array.
+        :rtype: DerivedParameterNode or MultistateDerivedParameterNode
+        '''
+        attrs = self._params[name]
+        data = np.load(self._array_path(name, 'data'), mmap_mode='c')
+        if attrs['masked']:
+            mask = np.load(self._array_path(name, 'mask'), mmap_mode='c')
+        else:
+            mask = np.ma.nomask
+        if attrs['values_mapping'] is not None:
+            return MultistateDerivedParameterNode(
+                name=name,
+                array=MappedArray(data, mask=mask,
+                                  values_mapping=attrs['values_mapping']),
+                frequency=attrs['frequency'], offset=attrs['offset'],
+                data_type=attrs['data_type'],
+                values_mapping=attrs['values_mapping'])
+        return Parameter(
+            name=name, array=np.ma.MaskedArray(data, mask=mask, copy=False),
+            frequency=attrs['frequency'], offset=attrs['offset'],
+            data_type=attrs['data_type'])
+
+    def get_param(self, hdf, name):
+        '''
+        Load a valid parameter, storing it from the HDF file on first use or
+        if it has changed within the HDF file since it was kept.
+
+        :param hdf: HDF file to read the parameter from if not stored.
+        :type hdf: hdfaccess.file.hdf_file
+        :param name: Name of the parameter.
+        :type name: str
+        :raises KeyError: If the parameter is not available or is invalid within the HDF file.
+        :rtype: DerivedParameterNode or MultistateDerivedParameterNode
+        '''
+        attrs = self._params.get(name)
+        signature = None
+        if self.keep_source and name not in self._checked and \
+           (attrs is None or attrs['source']):
+            signature = parameter_signature(hdf, name)
+            self._checked.add(name)
+            if attrs is not None and attrs['signature'] != signature:
+                logger.info("Discarding cached parameter '%s' as it has "
+                            "changed within the HDF file.", name)
+                self._remove(name)
+                attrs = None
+        if attrs is None:
+            logger.debug("Storing parameter '%s' for memory mapping.", name)
+            self.save(hdf.get_param(name, valid_only=True), source=True,
+                      signature=signature)
+        return self.load(name)
+
+    def close(self):
+        '''
+        Write the index of parameters read from the source file if created
+        with keep_source, otherwise remove the store's directory and all
+        stored arrays.
+        '''
+        if self.keep_source:
+            self._write_index()
+        else:
+            shutil.rmtree(self.path, ignore_errors=True)
+        self._params = {}
+        self._checked = set()
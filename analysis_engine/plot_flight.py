@@ -7,6 +7,7 @@ import platform
 import simplekml
 
 from copy import copy
+from itertools import izip
 
 from hdfaccess.file import hdf_file
 from flightdatautilities.print_table import indent
@@ -457,8 +458,9 @@ def csv_flight_details(hdf_path, kti_list, kpv_list, phase_list,
             p = hdf[param]
             dp = Parameter(name=p.name, array=p.array, 
                            frequency=p.frequency, offset=p.offset)
-            for row in rows:
-                row[param] = dp.at(row['index'])
+            values = dp.at_many([row['index'] for row in rows])
+            for row, value in izip(rows, values):
+                row[param] = value
 
     # sort rows
     rows = sorted(rows, key=lambda x: x['index'])
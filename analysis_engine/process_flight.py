@@ -3,24 +3,29 @@ import logging
 import numpy as np
 import os
 import sys
+import tempfile
 
+from collections import Counter, OrderedDict
 from datetime import datetime, timedelta
-from networkx.readwrite import json_graph
+from itertools import izip
 
 from flightdatautilities.filesystem_tools import copy_file
 
 from hdfaccess.file import hdf_file
 
 from analysis_engine import hooks, settings, __version__
-from analysis_engine.dependency_graph import dependency_order
+from analysis_engine.dependency_graph import (dependency_order,
+                                              dump_dependency_tree)
 from analysis_engine.library import np_ma_masked_zeros_like, repair_mask
 from analysis_engine.node import (ApproachNode, Attribute,
                                   derived_param_from_hdf,
                                   DerivedParameterNode,
+                                  EngineAggregateNode,
                                   FlightAttributeNode,
                                   KeyPointValueNode,
                                   KeyTimeInstanceNode,
                                   NodeManager, P, Section, SectionNode)
+from analysis_engine.parameter_store import ParameterStore
 from analysis_engine.utils import get_aircraft_info, get_derived_nodes
 
 
@@ -41,9 +46,12 @@ def geo_locate(hdf, items):
     lon_pos = derived_param_from_hdf(hdf['Longitude Smoothed'])
     lat_rep = repair_mask(lat_pos, extrapolate=True)
     lon_rep = repair_mask(lon_pos, extrapolate=True)
-    for item in items:
-        item.latitude = lat_rep.at(item.index) or None
-        item.longitude = lon_rep.at(item.index) or None
+    indices = [item.index for item in items]
+    latitudes = lat_rep.at_many(indices)
+    longitudes = lon_rep.at_many(indices)
+    for item, latitude, longitude in izip(items, latitudes, longitudes):
+        item.latitude = latitude or None
+        item.longitude = longitude or None
     return items
 
 
@@ -61,7 +69,88 @@ def _timestamp(start_datetime, item_list):
     return item_list
 
 
-def derive_parameters(hdf, node_mgr, process_order):
+class DerivedParameterWriter(object):
+    '''
+    Queues derived parameters and writes them to the HDF file in batches
+    rather than one dataset at a time in between deriving nodes.
+
+    Queued parameters are available from get_param before they are written.
+
+    Dataset options are applied by overriding hdf_file.DATASET_KWARGS, the
+    keyword arguments hdf_file passes to h5py's create_dataset, while the
+    queued parameters are written.
+    '''
+    def __init__(self, hdf, batch_size=1, dataset_kwargs=None):
+        '''
+        :param hdf: HDF file to write the derived parameters to.
+        :type hdf: hdf_file
+        :param batch_size: Number of parameters to queue before writing them.
+        :type batch_size: int
+        :param dataset_kwargs: Keyword arguments of h5py's create_dataset used by hdf_file when writing the parameters instead of its defaults, e.g. compression and chunks. None to use hdf_file's defaults.
+        :type dataset_kwargs: dict or None
+        :raises ValueError: If dataset_kwargs are provided but hdf's class does not define DATASET_KWARGS, i.e. the version of hdfaccess does not support dataset options.
+        '''
+        if dataset_kwargs and \
+           not isinstance(getattr(type(hdf), 'DATASET_KWARGS', None), dict):
+            raise ValueError(
+                "Dataset options %s cannot be applied since %s does not "
+                "define DATASET_KWARGS." % (dataset_kwargs,
+                                            type(hdf).__name__))
+        self.hdf = hdf
+        self.batch_size = batch_size
+        self.dataset_kwargs = dataset_kwargs
+        self._pending = OrderedDict()
+
+    def __contains__(self, name):
+        return name in self._pending
+
+    def get_param(self, name):
+        '''
+        :param name: Name of a queued parameter.
+        :type name: str
+        :raises KeyError: If the parameter is not queued.
+        :returns: Copy of the queued parameter, as it would be read from the HDF file.
+        :rtype: DerivedParameterNode or MultistateDerivedParameterNode
+        '''
+        param = derived_param_from_hdf(self._pending[name])
+        # Nodes may modify their dependencies' arrays.
+        param.array = param.array.copy()
+        return param
+
+    def set_param(self, param):
+        '''
+        Queue a derived parameter, writing all queued parameters once the
+        batch size is reached.
+
+        :type param: DerivedParameterNode
+        '''
+        self._pending[param.name] = param
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        '''
+        Write all queued parameters to the HDF file.
+        '''
+        if not self._pending:
+            return
+        if self.dataset_kwargs:
+            # Override the defaults for this file only.
+            default_kwargs = self.hdf.__dict__.get('DATASET_KWARGS')
+            self.hdf.DATASET_KWARGS = self.dataset_kwargs
+        try:
+            for param in self._pending.itervalues():
+                self.hdf.set_param(param)
+        finally:
+            if self.dataset_kwargs:
+                if default_kwargs is None:
+                    del self.hdf.DATASET_KWARGS
+                else:
+                    self.hdf.DATASET_KWARGS = default_kwargs
+        self._pending.clear()
+
+
+def derive_parameters(hdf, node_mgr, process_order, param_store=None):
     '''
     Derives parameters in process_order. Dependencies are sourced via the
     node_mgr.
@@ -72,6 +161,8 @@ def derive_parameters(hdf, node_mgr, process_order):
     :type node_mgr: NodeManager
     :param process_order: Parameter / Node class names in the required order to be processed
     :type process_order: list of strings
+    :param param_store: If provided, parameter dependencies are memory mapped from the store rather than read from the HDF file for each node.
+    :type param_store: ParameterStore
     '''
     params = {} # store all derived params that aren't masked arrays
     approach_list = ApproachNode(restrict_names=False)
@@ -80,6 +171,17 @@ def derive_parameters(hdf, node_mgr, process_order):
     section_list = SectionNode()  # 'Node Name' : node()  pass in node.get_accessor()
     flight_attrs = []
     duration = hdf.duration
+    writer = DerivedParameterWriter(
+        hdf, batch_size=settings.DERIVED_PARAMETER_WRITE_BATCH_SIZE,
+        dataset_kwargs=settings.DERIVED_PARAMETER_DATASET_KWARGS)
+    # Engine aggregates shared between nodes reducing the same parameters,
+    # and the number of nodes yet to be processed which may use each entry.
+    engine_cache = {}
+    engine_consumers = Counter(
+        node_mgr.derived_nodes[name].engine_cache_group()
+        for name in process_order
+        if name not in node_mgr.hdf_keys and name in node_mgr.derived_nodes
+        and issubclass(node_mgr.derived_nodes[name], EngineAggregateNode))
 
     for param_name in process_order:
         if param_name in node_mgr.hdf_keys:
@@ -98,15 +200,24 @@ def derive_parameters(hdf, node_mgr, process_order):
         for dep_name in node_deps:
             if dep_name in params:  # already calculated KPV/KTI/Phase
                 deps.append(params[dep_name])
-            elif node_mgr.get_attribute(dep_name) is not None:
-                deps.append(node_mgr.get_attribute(dep_name))
+                continue
+            attribute = node_mgr.get_attribute(dep_name)
+            if attribute is not None:
+                deps.append(attribute)
             elif dep_name in node_mgr.hdf_keys:
                 # LFL/Derived parameter
                 # all parameters (LFL or other) need get_aligned which is
                 # available on DerivedParameterNode
                 try:
-                    dp = derived_param_from_hdf(hdf.get_param(dep_name,
-                                                              valid_only=True))
+                    if param_store is not None:
+                        dp = param_store.get_param(hdf, dep_name)
+                    elif dep_name in writer:
+                        dp = writer.get_param(dep_name)
+                    else:
+                        dp = derived_param_from_hdf(
+                            hdf.get_param(dep_name, valid_only=True))
+                    if settings.COMPACT_DERIVED_PARAMETERS:
+                        dp.widen()
                 except KeyError:
                     # Parameter is invalid.
                     dp = None
@@ -124,10 +235,17 @@ def derive_parameters(hdf, node_mgr, process_order):
         node._p = params
         node._h = hdf
         node._n = node_mgr
+        if isinstance(node, EngineAggregateNode):
+            node.engine_cache = engine_cache
         logger.info("Processing parameter %s", param_name)
         # Derive the resulting value
 
         result = node.get_derived(deps)
+        if isinstance(node, EngineAggregateNode):
+            group = node.engine_cache_group()
+            engine_consumers[group] -= 1
+            if not engine_consumers[group]:
+                node.release_engine_aggregates(deps)
         del node._p
         del node._h
         del node._n
@@ -221,7 +339,11 @@ def derive_parameters(hdf, node_mgr, process_order):
                                                        expected_length,
                                                        array_length))
 
-            hdf.set_param(result)
+            if settings.COMPACT_DERIVED_PARAMETERS:
+                result.compact()
+            if param_store is not None:
+                param_store.save(result)
+            writer.set_param(result)
             # Keep hdf_keys up to date.
             node_mgr.hdf_keys.append(param_name)
         elif issubclass(node.node_type, ApproachNode):
@@ -247,6 +369,7 @@ def derive_parameters(hdf, node_mgr, process_order):
         else:
             raise NotImplementedError("Unknown Type %s" % node.__class__)
         continue
+    writer.flush()
     return kti_list, kpv_list, section_list, approach_list, flight_attrs
 
 
@@ -482,7 +605,8 @@ def process_flight(hdf_path, tail_number, aircraft_info={},
             requested, required, derived_nodes, aircraft_info,
             achieved_flight_record)
         # calculate dependency tree
-        process_order, gr_st = dependency_order(node_mgr, draw=False)
+        process_order, gr_st = dependency_order(node_mgr, draw=False,
+                                                prune=True)
         if settings.CACHE_PARAMETER_MIN_USAGE:
             # find params used more than
             for node in gr_st.nodes():
@@ -494,9 +618,22 @@ def process_flight(hdf_path, tail_number, aircraft_info={},
             logging.info("HDF set to cache parameters: %s",
                          hdf.cache_param_list)
 
+        if settings.CACHE_LFL_PARAMETERS:
+            param_store = ParameterStore(hdf_path + '.cache',
+                                         keep_source=True)
+        elif settings.MEMORY_MAP_PARAMETERS:
+            param_store = ParameterStore(tempfile.mkdtemp())
+        else:
+            param_store = None
+
         # derive parameters
-        kti_list, kpv_list, section_list, approach_list, flight_attrs = \
-            derive_parameters(hdf, node_mgr, process_order)
+        try:
+            kti_list, kpv_list, section_list, approach_list, flight_attrs = \
+                derive_parameters(hdf, node_mgr, process_order,
+                                  param_store=param_store)
+        finally:
+            if param_store is not None:
+                param_store.close()
 
         # geo locate KTIs
         kti_list = geo_locate(hdf, kti_list)
@@ -509,7 +646,9 @@ def process_flight(hdf_path, tail_number, aircraft_info={},
         # Store version of FlightDataAnalyser
         hdf.analysis_version = __version__
         # Store dependency tree
-        hdf.dependency_tree = json_graph.dumps(gr_st)
+        hdf.dependency_tree = dump_dependency_tree(
+            gr_st, tree_format=settings.DEPENDENCY_TREE_FORMAT,
+            registry_path=settings.DEPENDENCY_TREE_REGISTRY)
         # Store aircraft info
         hdf.set_attr('aircraft_info', aircraft_info)
         hdf.set_attr('achieved_flight_record', achieved_flight_record)
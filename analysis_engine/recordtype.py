@@ -33,6 +33,8 @@ def recordtype(typename, field_names, verbose=False, **default_kwds):
     100
     >>> Point(**d) == p        # convert from a dictionary
     True
+    >>> hasattr(p, '__dict__') # fields are stored in __slots__
+    False
     '''
     # Parse and validate the field names.  Validation serves two purposes,
     # generating informative error messages and preventing template injection attacks.
@@ -74,6 +76,9 @@ def recordtype(typename, field_names, verbose=False, **default_kwds):
         init_defaults = tuple(field_defaults[f] for f in default_fields)
     if default_kwds:
         raise ValueError('Invalid keyword arguments: %s' % default_kwds)
+    # Records are ordered by the first of these fields which they contain.
+    order_field = next((f for f in ('index', 'datetime', 'slice', 'name')
+                        if f in field_names), None)
     # Create and fill-in the class template
     template = dedent('''
         from functools import total_ordering
@@ -118,10 +123,10 @@ def recordtype(typename, field_names, verbose=False, **default_kwds):
             def __lt__(self, other):
                 if not self.__class__ == other.__class__:
                     return NotImplemented
-                for field in ['index', 'datetime', 'slice', 'name']:
-                    if field in self.__slots__:
-                        return getattr(self, field) < getattr(other, field)
-                return NotImplemented
+                %(lttxt)s
+
+            def __copy__(self):
+                return self.__class__(*%(tupletxt)s)
 
             def __getstate__(self):
                 return %(tupletxt)s
@@ -139,6 +144,8 @@ def recordtype(typename, field_names, verbose=False, **default_kwds):
         'inittxt': '; '.join('self.%s=%s' % (f,f) for f in field_names),
         'itertxt': '; '.join('yield self.%s' % f for f in field_names),
         'eqtxt': ' and '.join('self.%s==other.%s' % (f,f) for f in field_names),
+        'lttxt': ('return self.%s < other.%s' % (order_field, order_field)
+                  if order_field else 'return NotImplemented'),
     }
     # Execute the template string in a temporary namespace
     namespace = {}
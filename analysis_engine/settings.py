@@ -8,6 +8,8 @@
 import os
 import sys
 
+from flightdatautilities import units as ut
+
 # Note: Create an analyser_custom_settings.py module to override settings for
 # your local environment and append customised modules.
 
@@ -60,6 +62,65 @@ CA_CERTIFICATE_FILE = '/etc/ssl/certs/ca-certificates.crt'
 # Cache parameters which are used more than n times in HDF
 CACHE_PARAMETER_MIN_USAGE = 0
 
+# Store parameters as uncompressed arrays which are memory mapped when nodes
+# depend upon them rather than reading each from the HDF file per node.
+MEMORY_MAP_PARAMETERS = False
+
+# Keep the parameters read from each HDF file within a directory alongside it
+# (named '<hdf_path>.cache') to be memory mapped rather than decompressed from
+# the file when the flight is reprocessed. Each cached parameter is read from
+# the file again if its datasets or attributes have changed.
+CACHE_LFL_PARAMETERS = False
+
+# Number of derived parameters to queue before writing them to the HDF file
+# together. Queued parameters are read from memory by the nodes which depend
+# upon them.
+DERIVED_PARAMETER_WRITE_BATCH_SIZE = 16
+
+# Keyword arguments of h5py's create_dataset used instead of hdf_file's
+# defaults when writing derived parameters to the HDF file, e.g.
+# {'compression': 'lzf', 'chunks': True}. Empty to use hdf_file's defaults.
+DERIVED_PARAMETER_DATASET_KWARGS = {}
+
+# Convert the arrays of derived parameters to compact dtypes (see
+# DERIVED_PARAMETER_STORAGE_DTYPES) before writing them to the HDF file and
+# holding them for the nodes which depend upon them. Floating point arrays
+# are converted back to float64 for derivation.
+COMPACT_DERIVED_PARAMETERS = False
+
+# Format of the dependency tree stored within each processed HDF file:
+# 'json' for networkx node-link JSON, 'compact' for a compressed list of edges
+# between indexed nodes or 'hash' for the hash of the compact tree within the
+# DEPENDENCY_TREE_REGISTRY directory. All are read by
+# dependency_graph.read_dependency_tree.
+DEPENDENCY_TREE_FORMAT = 'json'
+
+# Path of the directory shared by processed flights which compact dependency
+# trees are registered within, one file per tree hash, when
+# DEPENDENCY_TREE_FORMAT is 'hash'.
+DEPENDENCY_TREE_REGISTRY = os.path.join(WORKING_DIR, 'dependency_trees')
+
+# Dtypes to store the arrays of derived parameters with keyed by units when
+# COMPACT_DERIVED_PARAMETERS is enabled. Nodes may override this with their
+# storage_dtype attribute. Units where float32 would lose precision which is
+# relied upon, e.g. latitude and longitude in degrees, times in seconds or
+# ILS frequencies, are stored as derived.
+DERIVED_PARAMETER_STORAGE_DTYPES = {
+    ut.CELSIUS: 'float32',
+    ut.DECANEWTON: 'float32',
+    ut.DEGREE_S: 'float32',
+    ut.DOTS: 'float32',
+    ut.FPM: 'float32',
+    ut.FT: 'float32',
+    ut.FT_LB: 'float32',
+    ut.G: 'float32',
+    ut.KT: 'float32',
+    ut.MACH: 'float32',
+    ut.PERCENT: 'float32',
+    ut.PSI: 'float32',
+    ut.QUART: 'float32',
+}
+
 
 ##############################################################################
 # Segment Splitting
@@ -77,6 +138,14 @@ MINIMUM_SPLIT_PARAM_VALUE = 0.175
 # when the aircraft is not considered to be turning.
 RATE_OF_TURN_SPLITTING_THRESHOLD = 0.1
 
+# Number of samples of each split parameter which are normalised and
+# combined at a time. Each split parameter is still read in full.
+SPLIT_PARAMETER_CHUNK_SIZE = 2 ** 20
+
+# Duration in seconds of the windows of data read by split_segments_streaming.
+# Must be a multiple of the superframe duration (64 seconds).
+SPLIT_WINDOW_DURATION = 2 ** 12
+
 # Parameter names to be normalised for splitting flights.
 SPLIT_PARAMETERS = ('Eng (1) N1', 'Eng (2) N1', 'Eng (3) N1', 'Eng (4) N1',
                     'Eng (1) N2', 'Eng (2) N2', 'Eng (3) N2', 'Eng (4) N2',
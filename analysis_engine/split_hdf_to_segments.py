@@ -3,15 +3,18 @@
 
 import os
 import logging
+import multiprocessing
 import numpy as np
 
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
+from hashlib import sha256
 from math import floor
 
 from analysis_engine import hooks, settings
 from analysis_engine.datastructures import Segment
 from analysis_engine.node import P
+from analysis_engine.utils import read_param_window
 from analysis_engine.library import (align, calculate_timebase, hash_array,
                                      min_value, normalise, repair_mask,
                                      rate_of_change, runs_of_ones,
@@ -82,25 +85,51 @@ def _segment_type_and_slice(airspeed, frequency, heading, start, stop):
     """
     airspeed_start = start * frequency
     airspeed_stop = stop * frequency
-    try:
-        unmasked_start, unmasked_stop = \
-            np.ma.flatnotmasked_edges(airspeed[airspeed_start:airspeed_stop])
-    except TypeError:
-        # Raised when flatnotmasked_edges returns None because all data is
-        # masked.
+    segment_airspeed = airspeed[airspeed_start:airspeed_stop]
+    unmasked_edges = np.ma.flatnotmasked_edges(segment_airspeed)
+    if unmasked_edges is None:
+        # All data is masked.
+        first_value, last_value = None, None
+    else:
+        first_value = segment_airspeed[unmasked_edges[0]]
+        last_value = segment_airspeed[unmasked_edges[1]]
+
+    threshold_exceedance = np.ma.sum(segment_airspeed >
+                                     settings.AIRSPEED_THRESHOLD) * frequency
+    hdiff = np.ma.abs(np.ma.diff(heading)).sum()
+    return _segment_type(first_value, last_value, threshold_exceedance, hdiff,
+                         start, stop)
+
+
+def _segment_type(first_value, last_value, threshold_exceedance, hdiff, start,
+                  stop):
+    """
+    Determine the segment type from a summary of the segment's data. See
+    _segment_type_and_slice.
+
+    :param first_value: First unmasked Airspeed value within the segment or None if all Airspeed is masked.
+    :type first_value: float or None
+    :param last_value: Last unmasked Airspeed value within the segment or None if all Airspeed is masked.
+    :type last_value: float or None
+    :param threshold_exceedance: Number of Airspeed samples above AIRSPEED_THRESHOLD multiplied by the Airspeed frequency.
+    :type threshold_exceedance: int or float
+    :param hdiff: Sum of the absolute Heading changes.
+    :type hdiff: float
+    :param start: Start of the segment in seconds.
+    :type start: int or float
+    :param stop: Stop of the segment in seconds.
+    :type stop: int or float
+    :returns: Segment type and slice.
+    :rtype: (str, slice)
+    """
+    if first_value is None:
         segment_type = 'GROUND_ONLY'
         logger.debug("Airspeed data was entirely masked. Assuming '%s' between"
                      "'%s' and '%s'." % (segment_type, start, stop))
         return segment_type, slice(start, stop)
-    unmasked_start += airspeed_start
-    unmasked_stop += airspeed_start
-
-    slow_start = airspeed[unmasked_start] < settings.AIRSPEED_THRESHOLD
-    slow_stop = airspeed[unmasked_stop] < settings.AIRSPEED_THRESHOLD
 
-    threshold_exceedance = np.ma.sum(airspeed[airspeed_start:airspeed_stop] >
-                                     settings.AIRSPEED_THRESHOLD) * frequency
-    hdiff = np.ma.abs(np.ma.diff(heading)).sum()
+    slow_start = first_value < settings.AIRSPEED_THRESHOLD
+    slow_stop = last_value < settings.AIRSPEED_THRESHOLD
 
     heading_change = hdiff > settings.HEADING_CHANGE_TAXI_THRESHOLD
     fast_for_long = threshold_exceedance > settings.AIRSPEED_THRESHOLD_TIME
@@ -132,52 +161,80 @@ def _segment_type_and_slice(airspeed, frequency, heading, start, stop):
     return segment_type, slice(start, stop)
 
 
-def _get_normalised_split_params(hdf):
+def _get_normalised_split_params(hdf, chunk_size=None, window=None):
     '''
     Get split parameters (currently engine power and Groundspeed) from hdf, normalise
-    them on a scale from 0-1.0 and return the minimum.
+    them on a scale from 0-1.0 and return the average.
+
+    Rather than stacking every split parameter, each parameter is loaded in
+    turn and combined into running totals in windows of chunk_size samples,
+    so that only one split parameter is held in memory at a time. Each
+    parameter is still read in full unless a window is provided.
 
     :param hdf: hdf_file object.
     :type hdf: hdfaccess.file.hdf_file
-    :returns: Minimum of normalised split parameters along with its frequency. Will return None, None if no split parameters are available.
+    :param chunk_size: Number of samples to combine at a time, defaults to settings.SPLIT_PARAMETER_CHUNK_SIZE.
+    :type chunk_size: int
+    :param window: Start and stop in seconds of the data to read (see read_param_window). The returned array starts at the start of the window.
+    :type window: (int or float, int or float)
+    :returns: Average of normalised split parameters along with its frequency. Will return None, None if no split parameters are available.
     :rtype: (None, None) or (np.ma.masked_array, float)
+    :raises ValueError: If the aligned split parameters differ in length.
     '''
-    params = []
+    chunk_size = chunk_size or settings.SPLIT_PARAMETER_CHUNK_SIZE
     first_split_param = None
     for param_name in ('Eng (1) N1', 'Eng (2) N1', 'Eng (3) N1', 'Eng (4) N1',
                        'Eng (1) N2', 'Eng (2) N2', 'Eng (3) N2', 'Eng (4) N2',
                        'Eng (1) Np', 'Eng (2) Np', 'Eng (3) Np', 'Eng (4) Np',
                        'Groundspeed', 'Groundspeed (1)', 'Groundspeed (2)'):
         try:
-            param = hdf[param_name]
+            if window:
+                param = read_param_window(hdf, param_name, *window)
+            else:
+                param = hdf[param_name]
         except KeyError:
             continue
         if first_split_param:
             # Align all other parameters to first available.  #Q: Why not force to 1Hz?
-            param.array = align(param, first_split_param)
+            array = align(param, first_split_param)
+            if len(array) != len(totals):
+                raise ValueError("Split parameter '%s' is not the same length "
+                                 "as '%s' after alignment." %
+                                 (param_name, first_split_param.name))
         else:
             first_split_param = param
-        params.append(param)
+            array = param.array
+            # Running totals of the unmasked normalised values.
+            totals = np.zeros(len(array), dtype=np.float64)
+            counts = np.zeros(len(array), dtype=np.int64)
+        for start in xrange(0, len(array), chunk_size):
+            chunk = slice(start, start + chunk_size)
+            normalised = normalise(array[chunk], scale_max=100)
+            totals[chunk] += np.ma.filled(normalised, 0)
+            counts[chunk] += ~np.ma.getmaskarray(normalised)
+        del array
 
     if not first_split_param:
         return None, None
-    # If there is at least one split parameter available.
-    # normalise the parameters we'll use for splitting the data
-    stacked_params = vstack_params(*params)
-    normalised_params = normalise(stacked_params, scale_max=100)
-    split_params_min = np.ma.average(normalised_params, axis=0)
+    # If there is at least one split parameter available, average the
+    # normalised parameters masking where all were masked.
+    split_params_min = np.ma.masked_array(
+        np.where(counts, totals / np.maximum(counts, 1), 0), mask=counts == 0)
     return split_params_min, first_split_param.frequency
 
 
-def _rate_of_turn(heading):
+def _rate_of_turn(heading, straightened=False):
     '''
     Create rate of turn from heading.
 
     :param heading: Heading parameter.
     :type heading: Parameter
+    :param straightened: Whether the heading array has already been straightened.
+    :type straightened: bool
     '''
-    heading.array = repair_mask(straighten_headings(heading.array),
-                                repair_duration=None)
+    if not straightened:
+        heading.array = straighten_headings(heading.array)
+    heading.array = repair_mask(heading.array, repair_duration=None)
     rate_of_turn = np.ma.abs(rate_of_change(heading, 2))
     rate_of_turn_masked = \
         np.ma.masked_greater(rate_of_turn,
@@ -288,6 +345,123 @@ def _split_on_rot(slice_start_secs, slice_stop_secs, heading_frequency,
     return split_index
 
 
+def _frame_counter_diff(dfc_array):
+    '''
+    Diff of the 'Frame Counter' masked where it increments normally.
+
+    :param dfc_array: 'Frame Counter' array.
+    :type dfc_array: np.ma.MaskedArray
+    :rtype: np.ma.MaskedArray
+    '''
+    dfc_diff = np.ma.diff(dfc_array)
+    # Mask 'Frame Counter' incrementing by 1.
+    dfc_diff = np.ma.masked_equal(dfc_diff, 1)
+    # Mask 'Frame Counter' overflow where the Frame Counter transitions from
+    # 4095 to 0.
+    # Q: This used to be 4094, are there some Frame Counters which increment
+    # from 1 rather than 0 or something else?
+    return np.ma.masked_equal(dfc_diff, -4095)
+
+
+def _split_slow_slice(slow_slice, slice_start_secs, slice_stop_secs,
+                      split_params_min, split_params_frequency, dfc_frequency,
+                      dfc_diff, heading_frequency, rate_of_turn,
+                      offset_secs=0):
+    '''
+    Find where to split within a slow slice using the 'Frame Counter', then
+    the engine parameters and then the rate of turn.
+
+    :param slow_slice: Slow slice of Airspeed, used for logging.
+    :type slow_slice: slice
+    :param slice_start_secs: Start of slow slice in seconds.
+    :type slice_start_secs: int or float
+    :param slice_stop_secs: Stop of slow slice in seconds.
+    :type slice_stop_secs: int or float
+    :param split_params_min: Average of normalised split parameters or None.
+    :type split_params_min: np.ma.MaskedArray or None
+    :param split_params_frequency: Frequency of split_params_min.
+    :type split_params_frequency: int or float
+    :param dfc_frequency: Frequency of 'Frame Counter' or None if it is not used for splitting.
+    :type dfc_frequency: int or float or None
+    :param dfc_diff: Diff of 'Frame Counter' (see _frame_counter_diff).
+    :type dfc_diff: np.ma.MaskedArray
+    :param heading_frequency: Frequency of Heading.
+    :type heading_frequency: int or float
+    :param rate_of_turn: Rate of turn array created from Heading diff.
+    :type rate_of_turn: np.ma.MaskedArray
+    :param offset_secs: Time in seconds of the first sample of the arrays, which may be windows of the data rather than the whole of it. Must be a whole number of samples of each array.
+    :type offset_secs: int or float
+    :returns: Split index in seconds or None if no split was found.
+    :rtype: int or float or None
+    '''
+    start_secs = slice_start_secs - offset_secs
+    stop_secs = slice_stop_secs - offset_secs
+
+    # Find split based on minimum of engine parameters.
+    if split_params_min is not None:
+        eng_split_index, eng_split_value = _split_on_eng_params(
+            start_secs, stop_secs, split_params_min, split_params_frequency)
+    else:
+        eng_split_index, eng_split_value = None, None
+
+    # Split using 'Frame Counter'.
+    if dfc_frequency is not None:
+        # Gap between difference values.
+        dfc_half_period = (1 / dfc_frequency) / 2
+        dfc_split_index = _split_on_dfc(
+            start_secs, stop_secs, dfc_frequency, dfc_half_period, dfc_diff,
+            eng_split_index=eng_split_index)
+        if dfc_split_index:
+            dfc_split_index += offset_secs
+            logger.info("'Frame Counter' jumped within slow_slice '%s' "
+                        "at index '%d'.", slow_slice, dfc_split_index)
+            return dfc_split_index
+        else:
+            logger.info("'Frame Counter' did not jump within slow_slice "
+                        "'%s'.", slow_slice)
+
+    if eng_split_index is not None:
+        eng_split_index += offset_secs
+
+    # Split using minimum of engine parameters.
+    if eng_split_value is not None and \
+       eng_split_value < settings.MINIMUM_SPLIT_PARAM_VALUE:
+        logger.info("Minimum of normalised split parameters ('%s') was "
+                    "below MINIMUM_SPLIT_PARAM_VALUE ('%s') within "
+                    "slow_slice '%s' at index '%d'.",
+                    eng_split_value, settings.MINIMUM_SPLIT_PARAM_VALUE,
+                    slow_slice, eng_split_index)
+        return eng_split_index
+    else:
+        logger.info("Minimum of normalised split parameters ('%s') was "
+                    "not below MINIMUM_SPLIT_PARAM_VALUE ('%s') within "
+                    "slow_slice '%s' at index '%s'.",
+                    eng_split_value, settings.MINIMUM_SPLIT_PARAM_VALUE,
+                    slow_slice, eng_split_index)
+
+    # Split using rate of turn. Q: Should this be considered in other
+    # splitting methods.
+    if rate_of_turn is None:
+        return
+
+    rot_split_index = _split_on_rot(start_secs, stop_secs, heading_frequency,
+                                    rate_of_turn)
+    if rot_split_index:
+        rot_split_index += offset_secs
+        logger.info("Splitting at index '%s' where rate of turn was below "
+                    "'%s'.", rot_split_index,
+                    settings.RATE_OF_TURN_SPLITTING_THRESHOLD)
+        return rot_split_index
+    else:
+        logger.info(
+            "Aircraft did not stop turning during slow_slice "
+            "('%s'). Therefore a split will not be made.", slow_slice)
+
+    #Q: Raise error here?
+    logger.warning("Splitting methods failed to split within slow_slice "
+                   "'%s'.", slow_slice)
+
+
 def split_segments(hdf):
     '''
     TODO: DJ suggested not to use decaying engine oil temperature.
@@ -342,20 +516,13 @@ def split_segments(hdf):
 
     if hdf.reliable_frame_counter:
         dfc = hdf['Frame Counter']
-        dfc_diff = np.ma.diff(dfc.array)
-        # Mask 'Frame Counter' incrementing by 1.
-        dfc_diff = np.ma.masked_equal(dfc_diff, 1)
-        # Mask 'Frame Counter' overflow where the Frame Counter transitions from
-        # 4095 to 0.
-        # Q: This used to be 4094, are there some Frame Counters which increment
-        # from 1 rather than 0 or something else?
-        dfc_diff = np.ma.masked_equal(dfc_diff, -4095)
-        # Gap between difference values.
-        dfc_half_period = (1 / dfc.frequency) / 2
+        dfc_frequency = dfc.frequency
+        dfc_diff = _frame_counter_diff(dfc.array)
     else:
         logger.info("'Frame Counter' will not be used for splitting since "
                     "'reliable_frame_counter' is False.")
-        dfc = None
+        dfc_frequency = None
+        dfc_diff = None
 
     segments = []
     start = 0
@@ -381,78 +548,17 @@ def split_segments(hdf):
                         settings.MINIMUM_SPLIT_DURATION)
             continue
 
-        # Find split based on minimum of engine parameters.
-        if split_params_min is not None:
-            eng_split_index, eng_split_value = _split_on_eng_params(
-                slice_start_secs, slice_stop_secs, split_params_min,
-                split_params_frequency)
-        else:
-            eng_split_index, eng_split_value = None, None
-
-        # Split using 'Frame Counter'.
-        if dfc is not None:
-            dfc_split_index = _split_on_dfc(
-                slice_start_secs, slice_stop_secs, dfc.frequency,
-                dfc_half_period, dfc_diff, eng_split_index=eng_split_index)
-            if dfc_split_index:
-                segments.append(_segment_type_and_slice(airspeed_array,
-                                                        airspeed.frequency,
-                                                        heading.array,
-                                                        start, dfc_split_index))
-                start = dfc_split_index
-                logger.info("'Frame Counter' jumped within slow_slice '%s' "
-                            "at index '%d'.", slow_slice, dfc_split_index)
-                continue
-            else:
-                logger.info("'Frame Counter' did not jump within slow_slice "
-                            "'%s'.", slow_slice)
-
-        # Split using minimum of engine parameters.
-        if eng_split_value is not None and \
-           eng_split_value < settings.MINIMUM_SPLIT_PARAM_VALUE:
-            logger.info("Minimum of normalised split parameters ('%s') was "
-                        "below MINIMUM_SPLIT_PARAM_VALUE ('%s') within "
-                        "slow_slice '%s' at index '%d'.",
-                        eng_split_value, settings.MINIMUM_SPLIT_PARAM_VALUE,
-                        slow_slice, eng_split_index)
-            segments.append(_segment_type_and_slice(airspeed_array,
-                                                    airspeed.frequency,
-                                                    heading.array,
-                                                    start, eng_split_index))
-            start = eng_split_index
-            continue
-        else:
-            logger.info("Minimum of normalised split parameters ('%s') was "
-                        "not below MINIMUM_SPLIT_PARAM_VALUE ('%s') within "
-                        "slow_slice '%s' at index '%s'.",
-                        eng_split_value, settings.MINIMUM_SPLIT_PARAM_VALUE,
-                        slow_slice, eng_split_index)
-
-        # Split using rate of turn. Q: Should this be considered in other
-        # splitting methods.
-        if rate_of_turn is None:
-            continue
-
-        rot_split_index = _split_on_rot(slice_start_secs, slice_stop_secs,
-                                        heading.frequency, rate_of_turn)
-        if rot_split_index:
-            segments.append(_segment_type_and_slice(airspeed_array,
-                                                    airspeed.frequency,
-                                                    heading.array,
-                                                    start, rot_split_index))
-            start = rot_split_index
-            logger.info("Splitting at index '%s' where rate of turn was below "
-                        "'%s'.", rot_split_index,
-                        settings.RATE_OF_TURN_SPLITTING_THRESHOLD)
+        split_index = _split_slow_slice(
+            slow_slice, slice_start_secs, slice_stop_secs, split_params_min,
+            split_params_frequency, dfc_frequency, dfc_diff, heading.frequency,
+            rate_of_turn)
+        if split_index is None:
             continue
-        else:
-            logger.info(
-                "Aircraft did not stop turning during slow_slice "
-                "('%s'). Therefore a split will not be made.", slow_slice)
-
-        #Q: Raise error here?
-        logger.warning("Splitting methods failed to split within slow_slice "
-                       "'%s'.", slow_slice)
+        segments.append(_segment_type_and_slice(airspeed_array,
+                                                airspeed.frequency,
+                                                heading.array,
+                                                start, split_index))
+        start = split_index
 
     # Add remaining data to a segment.
     segments.append(_segment_type_and_slice(airspeed_array, airspeed.frequency,
@@ -460,6 +566,398 @@ def split_segments(hdf):
     return segments
 
 
+class _SegmentAirspeed(object):
+    '''
+    Airspeed of a segment gathered while splitting: the values used to
+    determine the segment type and the go-fast index and Airspeed hash which
+    append_segment_info would otherwise read back from the segment.
+    '''
+    def __init__(self):
+        self.length = 0
+        self.first_value = None
+        self.last_value = None
+        self.fast_samples = 0
+        self.go_fast_index = None
+        self._checksum = sha256()
+        # Data of a run above the threshold which may continue into the
+        # next samples.
+        self._run = None
+
+    @property
+    def hash(self):
+        '''
+        Hash of the Airspeed data as created by hash_array.
+        '''
+        if self._run is not None:
+            hash_array(self._run, [slice(0, len(self._run))],
+                       settings.AIRSPEED_HASH_MIN_SAMPLES,
+                       checksum=self._checksum)
+            self._run = None
+        return self._checksum.hexdigest()
+
+    def feed(self, airspeed, repaired):
+        '''
+        Add the next samples of the segment's Airspeed.
+
+        :param airspeed: Airspeed as it will be written to the segment.
+        :type airspeed: np.ma.MaskedArray
+        :param repaired: Airspeed repaired as by split_segments.
+        :type repaired: np.ma.MaskedArray
+        '''
+        if not len(airspeed):
+            return
+        edges = np.ma.flatnotmasked_edges(repaired)
+        if edges is not None:
+            if self.first_value is None:
+                self.first_value = repaired[edges[0]]
+            self.last_value = repaired[edges[1]]
+        self.fast_samples += \
+            (repaired > settings.AIRSPEED_THRESHOLD).filled(False).sum()
+        if self.go_fast_index is None:
+            fast = np.ma.where(airspeed > settings.AIRSPEED_THRESHOLD)[0]
+            if len(fast):
+                self.go_fast_index = self.length + fast[0]
+        self.length += len(airspeed)
+        data = airspeed.data
+        if self._run is not None:
+            data = np.concatenate([self._run, data])
+        sections = runs_of_ones(data > settings.AIRSPEED_THRESHOLD)
+        self._run = None
+        if sections and sections[-1].stop == len(data):
+            self._run = data[sections.pop()]
+        hash_array(data, sections, settings.AIRSPEED_HASH_MIN_SAMPLES,
+                   checksum=self._checksum)
+
+
+def _abs_diff_sum(array, previous):
+    '''
+    Sum of the absolute differences between unmasked consecutive values of
+    an array which continues from previous.
+
+    :type array: np.ma.MaskedArray
+    :param previous: End of the preceding data or None.
+    :type previous: np.ma.MaskedArray or None
+    :returns: The sum and the end of the data to continue from.
+    :rtype: (float, np.ma.MaskedArray)
+    '''
+    if previous is not None:
+        array = np.ma.concatenate([previous, array])
+    if not len(array):
+        return 0.0, previous
+    return np.ma.abs(np.ma.diff(array)).filled(0).sum(), array[-1:]
+
+
+class _SplitScan(object):
+    '''
+    Scan of Airspeed and Heading in windows for split_segments_streaming.
+
+    Airspeed is repaired and Heading straightened and repaired as by
+    split_segments, continuing each window from the state of the previous
+    one. Repaired Airspeed from the start of each slow slice which may be
+    split and repaired Heading around it are kept until the split is found.
+    '''
+    def __init__(self, hdf, window_duration):
+        self.hdf = hdf
+        self.window_duration = window_duration
+        self.heading_name = None
+        for name in ('Heading', 'Heading True'):
+            try:
+                read_param_window(hdf, name, 0, 0, valid_only=True)
+            except KeyError:
+                continue
+            self.heading_name = name
+            break
+        if not hdf.reliable_frame_counter:
+            logger.info("'Frame Counter' will not be used for splitting since "
+                        "'reliable_frame_counter' is False.")
+        self.frequency = None
+        self.length = 0
+        self.unmasked = False
+        self.airspeed_state = None
+        # Airspeed and repaired Airspeed since the sample the current segment
+        # has been fed up to. Repaired Airspeed excludes masked samples held
+        # back by repair_mask.
+        self.fed = 0
+        self.airspeed = None
+        self.repaired = None
+        # Whether the current run of repaired Airspeed is fast, its start,
+        # the number of fast runs and the slow slices waiting to be split.
+        self.run_fast = None
+        self.run_start = None
+        self.speedy_count = 0
+        self.slow_slices = []
+        # Straightened and repaired Heading from heading_start and the sums
+        # of the absolute Heading changes.
+        self.heading_frequency = None
+        self.heading_length = 0
+        self.heading_states = (None, None)
+        self.heading_start = 0
+        self.heading = np.ma.masked_array([])
+        self.raw_hdiff = 0.0
+        self.raw_last = None
+        self.straightened_hdiff = 0.0
+        self.straightened_last = None
+        # Start in seconds and Airspeed of the current segment and the
+        # segments found so far.
+        self.segment_start = 0
+        self.segment = _SegmentAirspeed()
+        self.records = []
+
+    def scan(self):
+        '''
+        :returns: Segment type, slice and Airspeed information (see split_segments_streaming) of each segment.
+        :rtype: [(str, slice, (int or None, str or None))]
+        '''
+        start_secs = 0
+        while True:
+            stop_secs = start_secs + self.window_duration
+            airspeed = read_param_window(self.hdf, 'Airspeed', start_secs,
+                                         stop_secs)
+            if not len(airspeed.array):
+                break
+            self._scan_airspeed(airspeed)
+            if self.heading_name:
+                self._scan_heading(read_param_window(
+                    self.hdf, self.heading_name, start_secs, stop_secs,
+                    valid_only=True))
+            self._split_slow_slices()
+            self._trim()
+            start_secs = stop_secs
+        return self._finish()
+
+    def _scan_airspeed(self, airspeed):
+        if self.frequency is None:
+            # Keep the dtype of Airspeed, which is hashed.
+            self.airspeed = airspeed.array[:0].copy()
+            self.repaired = airspeed.array[:0].copy()
+        self.frequency = airspeed.frequency
+        self.length += len(airspeed.array)
+        self.unmasked = self.unmasked or bool(np.ma.count(airspeed.array))
+        self.airspeed = np.ma.concatenate([self.airspeed, airspeed.array])
+        repaired, self.airspeed_state = repair_mask(
+            airspeed.array, repair_duration=None,
+            repair_above=settings.AIRSPEED_THRESHOLD, copy=True,
+            state=self.airspeed_state, return_state=True)
+        self._add_repaired(repaired)
+
+    def _add_repaired(self, repaired):
+        '''
+        Classify the next samples of repaired Airspeed as fast or slow.
+        '''
+        start = self.fed + len(self.repaired)
+        self.repaired = np.ma.concatenate([self.repaired, repaired])
+        fast = ~np.ma.getmaskarray(
+            np.ma.masked_less_equal(repaired, settings.AIRSPEED_THRESHOLD))
+        changes = np.flatnonzero(fast[1:] != fast[:-1]) + 1
+        for index in np.append(0, changes)[:len(fast)]:
+            run_fast, run_start = bool(fast[index]), start + int(index)
+            if self.run_fast is None:
+                self.run_fast, self.run_start = run_fast, run_start
+            elif run_fast != self.run_fast:
+                if self.run_fast:
+                    self.speedy_count += 1
+                else:
+                    self.slow_slices.append(slice(self.run_start, run_start))
+                self.run_fast, self.run_start = run_fast, run_start
+
+    def _scan_heading(self, heading):
+        self.heading_frequency = heading.frequency
+        self.heading_length += len(heading.array)
+        hdiff, self.raw_last = _abs_diff_sum(heading.array, self.raw_last)
+        self.raw_hdiff += hdiff
+        straighten_state, repair_state = self.heading_states
+        straightened, straighten_state = straighten_headings(
+            heading.array, state=straighten_state, return_state=True)
+        repaired, repair_state = repair_mask(
+            straightened, repair_duration=None, state=repair_state,
+            return_state=True)
+        self.heading_states = (straighten_state, repair_state)
+        self._add_heading(repaired)
+
+    def _add_heading(self, repaired):
+        hdiff, self.straightened_last = _abs_diff_sum(repaired,
+                                                      self.straightened_last)
+        self.straightened_hdiff += hdiff
+        self.heading = np.ma.concatenate([self.heading, repaired])
+
+    def _window_bounds(self, slow_slice):
+        '''
+        Bounds in seconds of the data used to split within a slow slice,
+        extended by at least a window either side so that aligning
+        parameters and the rate of turn are not affected by the ends of the
+        data.
+        '''
+        start = max(floor(slow_slice.start / self.frequency /
+                          self.window_duration) - 1, 0) * self.window_duration
+        stop = (floor(slow_slice.stop / self.frequency /
+                      self.window_duration) + 2) * self.window_duration
+        return start, stop
+
+    def _split_slow_slices(self, finished=False):
+        '''
+        Split within the slow slices which Heading has been repaired beyond.
+        '''
+        while self.slow_slices:
+            slow_slice = self.slow_slices[0]
+            start_secs, stop_secs = self._window_bounds(slow_slice)
+            if self.heading_name is None:
+                raise KeyError("Neither 'Heading' nor 'Heading True' are "
+                               "available.")
+            heading_stop = self.heading_start + len(self.heading)
+            if not finished and \
+               heading_stop < stop_secs * self.heading_frequency:
+                return
+            self.slow_slices.pop(0)
+            self._split(slow_slice, start_secs, stop_secs)
+
+    def _split(self, slow_slice, start_secs, stop_secs):
+        if slow_slice.start == 0:
+            # Do not split if slow_slice is at the beginning of the data.
+            return
+        # Get start and stop at 1Hz.
+        slice_start_secs = slow_slice.start / self.frequency
+        slice_stop_secs = slow_slice.stop / self.frequency
+
+        slow_duration = slice_stop_secs - slice_start_secs
+        if slow_duration < settings.MINIMUM_SPLIT_DURATION:
+            logger.info("Disregarding period of airspeed below '%s' "
+                        "since '%s' is shorter than MINIMUM_SPLIT_DURATION "
+                        "('%s').", settings.AIRSPEED_THRESHOLD, slow_duration,
+                        settings.MINIMUM_SPLIT_DURATION)
+            return
+
+        split_params_min, split_params_frequency = \
+            _get_normalised_split_params(self.hdf,
+                                         window=(start_secs, stop_secs))
+        if self.hdf.reliable_frame_counter:
+            dfc = read_param_window(self.hdf, 'Frame Counter', start_secs,
+                                    stop_secs)
+            dfc_frequency = dfc.frequency
+            dfc_diff = _frame_counter_diff(dfc.array)
+        else:
+            dfc_frequency = None
+            dfc_diff = None
+        heading_window = slice(
+            int(start_secs * self.heading_frequency) - self.heading_start,
+            int(stop_secs * self.heading_frequency) - self.heading_start)
+        heading = P(self.heading_name,
+                    array=self.heading[heading_window].copy(),
+                    frequency=self.heading_frequency)
+        rate_of_turn = _rate_of_turn(heading, straightened=True)
+
+        split_index = _split_slow_slice(
+            slow_slice, slice_start_secs, slice_stop_secs, split_params_min,
+            split_params_frequency, dfc_frequency, dfc_diff,
+            self.heading_frequency, rate_of_turn, offset_secs=start_secs)
+        if split_index is None:
+            return
+        self._feed_to(int(split_index * self.frequency))
+        self.records.append((self.segment_start, split_index, self.segment))
+        self.segment_start = split_index
+        self.segment = _SegmentAirspeed()
+
+    def _feed_to(self, stop):
+        '''
+        Add Airspeed up to stop to the current segment.
+        '''
+        samples = stop - self.fed
+        self.segment.feed(self.airspeed[:samples], self.repaired[:samples])
+        self.airspeed = self.airspeed[samples:]
+        self.repaired = self.repaired[samples:]
+        self.fed = stop
+
+    def _trim(self):
+        '''
+        Add Airspeed to the current segment and discard Heading up to where
+        it may still be needed for splitting.
+        '''
+        if self.slow_slices:
+            start = self.slow_slices[0].start
+        elif self.run_fast is False:
+            start = self.run_start
+        else:
+            start = self.fed + len(self.repaired)
+        self._feed_to(start)
+        if not self.heading_name:
+            return
+        heading_start, _stop = self._window_bounds(slice(start, start))
+        # Heading held back by repair_mask has not been added yet.
+        discard = min(int(heading_start * self.heading_frequency) -
+                      self.heading_start, len(self.heading))
+        if discard > 0:
+            self.heading = self.heading[discard:]
+            self.heading_start += discard
+
+    def _finish(self):
+        if not self.unmasked:
+            # Airspeed array is masked, most likely under min threshold so it
+            # did not go fast.
+            logger.warning("Airspeed is entirely masked. The entire contents "
+                           "of the data will be a GROUND_ONLY slice.")
+            return [('GROUND_ONLY', slice(0, self.hdf.duration), (None, None))]
+        if self.heading_name is None:
+            raise KeyError("Neither 'Heading' nor 'Heading True' are "
+                           "available.")
+        # Masked data held back at the end of the data is not repaired.
+        self._add_repaired(self.airspeed[len(self.repaired):].copy())
+        if self.run_fast:
+            self.speedy_count += 1
+        self._add_heading(np.ma.masked_all(
+            self.heading_length - self.heading_start - len(self.heading)))
+        self._split_slow_slices(finished=True)
+
+        self._feed_to(self.length)
+        duration = self.length / self.frequency
+        self.records.append((self.segment_start, duration, self.segment))
+        if self.speedy_count <= 1:
+            logger.info("There are '%d' sections of data where airspeed is "
+                        "above the splitting threshold. Therefore there can "
+                        "only be at maximum one flights worth of data. "
+                        "Creating a single segment comprising all data.",
+                        self.speedy_count)
+            hdiff = self.raw_hdiff
+        else:
+            # split_segments straightens and repairs Heading to find the rate
+            # of turn before determining segment types.
+            hdiff = self.straightened_hdiff
+
+        segments = []
+        for start, stop, airspeed in self.records:
+            segment_type, segment_slice = _segment_type(
+                airspeed.first_value, airspeed.last_value,
+                airspeed.fast_samples * self.frequency, hdiff, start, stop)
+            segments.append((segment_type, segment_slice,
+                             (airspeed.go_fast_index, airspeed.hash)))
+        return segments
+
+
+def split_segments_streaming(hdf, window_duration=None):
+    '''
+    Split segments in the same way as split_segments while reading the data
+    in windows rather than loading whole parameters.
+
+    Airspeed and Heading are each read once in windows of window_duration
+    seconds. The split parameters and 'Frame Counter' are read only around
+    each slow slice which may be split. Memory is bounded by the longest
+    slow slice rather than the length of the data. The go-fast index and
+    Airspeed hash of each segment are gathered during the scan so that
+    append_segment_info does not read them back from each segment.
+
+    Only finding the segments is streamed: segments are written afterwards
+    by hdfaccess's write_segment, which reads each segment's data from the
+    original file.
+
+    :param hdf: hdf_file object.
+    :type hdf: hdfaccess.file.hdf_file
+    :param window_duration: Duration of each window in seconds, defaults to settings.SPLIT_WINDOW_DURATION. Must be a multiple of the superframe duration (64 seconds).
+    :type window_duration: int
+    :returns: Segment type, slice and a tuple of the go-fast index (relative to the start of the segment, or None if Airspeed did not go fast) and the Airspeed hash of each segment.
+    :rtype: [(str, slice, (int or None, str or None))]
+    '''
+    window_duration = window_duration or settings.SPLIT_WINDOW_DURATION
+    return _SplitScan(hdf, window_duration).scan()
+
+
 def _mask_invalid_years(array, latest_year):
     '''
     Mask years which are in the future, not 2 or 4 digits or were made before
@@ -585,8 +1083,34 @@ def _calculate_start_datetime(hdf, fallback_dt=None):
     return timebase
 
 
+def _slice_segment_params(params, segment_slice):
+    '''
+    Slice parameters of the original data file to a segment in the same way
+    as write_segment does when not splitting on superframe boundaries.
+
+    :param params: Parameters of the original data file.
+    :type params: dict
+    :param segment_slice: Slice of the segment in seconds.
+    :type segment_slice: slice
+    :returns: Copies of the parameters containing only the segment's data.
+    :rtype: dict
+    '''
+    segment_params = {}
+    for name, param in params.iteritems():
+        start = int((segment_slice.start or 0) * param.frequency)
+        if segment_slice.stop is None:
+            stop = None
+        else:
+            stop = int(segment_slice.stop * param.frequency)
+        segment_params[name] = P(name, array=param.array[start:stop].copy(),
+                                 frequency=param.frequency,
+                                 offset=param.offset)
+    return segment_params
+
+
 def append_segment_info(hdf_segment_path, segment_type, segment_slice, part,
-                        fallback_dt=None):
+                        fallback_dt=None, segment_params=None,
+                        airspeed_info=None):
     """
     Get information about a segment such as type, hash, etc. and return a
     named tuple.
@@ -603,35 +1127,53 @@ def append_segment_info(hdf_segment_path, segment_type, segment_slice, part,
     :type part: Integer
     :param fallback_dt: Used to replace elements of datetimes which are not available in the hdf file (e.g. YEAR not being recorded)
     :type fallback_dt: datetime
+    :param segment_params: Airspeed and date/time parameters already sliced to this segment (see _slice_segment_params). If provided, they are used rather than reading the parameters back from the segment.
+    :type segment_params: dict
+    :param airspeed_info: Go-fast index and Airspeed hash of the segment found by split_segments_streaming. If provided, Airspeed is not read.
+    :type airspeed_info: (int or None, str or None)
     :returns: Segment named tuple
     :rtype: Segment
     """
     # build information about a slice
-    with hdf_file(hdf_segment_path) as hdf:
-        airspeed = hdf['Airspeed'].array
-        duration = hdf.duration
-        # For now, raise TimebaseError up rather than using EPOCH
-        # TODO: Review whether to revert to epoch again.
-        ##try:
-        start_datetime = _calculate_start_datetime(hdf, fallback_dt)
-        ##except TimebaseError:
-            ##logger.warning("Unable to calculate timebase, using epoch "
-                           ##"1.1.1970!")
-            ##start_datetime = datetime.fromtimestamp(0)
+    if segment_params is None:
+        with hdf_file(hdf_segment_path) as hdf:
+            if airspeed_info is None:
+                airspeed = hdf['Airspeed'].array
+            duration = hdf.duration
+            # For now, raise TimebaseError up rather than using EPOCH
+            # TODO: Review whether to revert to epoch again.
+            ##try:
+            start_datetime = _calculate_start_datetime(hdf, fallback_dt)
+            ##except TimebaseError:
+                ##logger.warning("Unable to calculate timebase, using epoch "
+                               ##"1.1.1970!")
+                ##start_datetime = datetime.fromtimestamp(0)
+            stop_datetime = start_datetime + timedelta(seconds=duration)
+            hdf.start_datetime = start_datetime
+    else:
+        # Only the segment's duration is read and start_datetime stored.
+        if airspeed_info is None:
+            airspeed = segment_params['Airspeed'].array
+        start_datetime = _calculate_start_datetime(segment_params, fallback_dt)
+        with hdf_file(hdf_segment_path) as hdf:
+            duration = hdf.duration
+            hdf.start_datetime = start_datetime
         stop_datetime = start_datetime + timedelta(seconds=duration)
-        hdf.start_datetime = start_datetime
 
     if segment_type in ('START_AND_STOP', 'START_ONLY', 'STOP_ONLY'):
-        # we went fast, so get the index
-        spd_above_threshold = \
-            np.ma.where(airspeed > settings.AIRSPEED_THRESHOLD)
-        go_fast_index = spd_above_threshold[0][0]
+        if airspeed_info is not None:
+            go_fast_index, airspeed_hash = airspeed_info
+        else:
+            # we went fast, so get the index
+            spd_above_threshold = \
+                np.ma.where(airspeed > settings.AIRSPEED_THRESHOLD)
+            go_fast_index = spd_above_threshold[0][0]
+            # Identification of raw data airspeed hash
+            airspeed_hash_sections = runs_of_ones(airspeed.data > settings.AIRSPEED_THRESHOLD)
+            airspeed_hash = hash_array(airspeed.data,airspeed_hash_sections,
+                                       settings.AIRSPEED_HASH_MIN_SAMPLES)
         go_fast_datetime = \
             start_datetime + timedelta(seconds=int(go_fast_index))
-        # Identification of raw data airspeed hash
-        airspeed_hash_sections = runs_of_ones(airspeed.data > settings.AIRSPEED_THRESHOLD)
-        airspeed_hash = hash_array(airspeed.data,airspeed_hash_sections,
-                                   settings.AIRSPEED_HASH_MIN_SAMPLES)
     #elif segment_type == 'GROUND_ONLY':
         ##Q: Create a groundspeed hash?
         #pass
@@ -645,8 +1187,114 @@ def append_segment_info(hdf_segment_path, segment_type, segment_slice, part,
     return segment
 
 
+def _write_segment(args):
+    '''
+    Write a segment of the source HDF file to a new file. Defined at module
+    level so that it can be called by a multiprocessing pool.
+
+    :param args: Source path, segment slice, destination path and whether to split on superframe boundaries.
+    :type args: (str, slice, str, bool)
+    :returns: Duration of the written segment in seconds.
+    :rtype: float
+    '''
+    hdf_path, segment_slice, dest_path, supf_boundary = args
+    logger.debug("Writing segment: %s", dest_path)
+    write_segment(hdf_path, segment_slice, dest_path,
+                  supf_boundary=supf_boundary)
+    with hdf_file(dest_path) as hdf:
+        return hdf.duration
+
+
+def _append_segment_info(args):
+    '''
+    Unpack arguments for append_segment_info from a multiprocessing pool.
+
+    :param args: Positional arguments of append_segment_info.
+    :type args: tuple
+    :rtype: Segment
+    '''
+    return append_segment_info(*args)
+
+
+def _chain_fallback_dts(fallback_dt, durations):
+    '''
+    Move fallback_dt on by the duration of each preceding segment so that it
+    is relative to the start of each segment.
+
+    :param fallback_dt: fallback_dt relative to the start of the data.
+    :type fallback_dt: datetime or None
+    :param durations: Duration of each segment in seconds.
+    :type durations: [float]
+    :returns: fallback_dt for each segment.
+    :rtype: [datetime or None]
+    '''
+    fallback_dts = []
+    for duration in durations:
+        fallback_dts.append(fallback_dt)
+        if fallback_dt:
+            fallback_dt += timedelta(seconds=duration)
+    return fallback_dts
+
+
+def _process_segments_concurrently(hdf_path, segment_tuples, dest_paths,
+                                   superframe_present, fallback_dt, workers,
+                                   split_params=None, airspeed_infos=None):
+    '''
+    Write segments and gather their information using a pool of processes.
+
+    All segments are written first so that the fallback_dt of each segment
+    can be chained from the durations of the preceding segments before
+    their information is gathered.
+
+    :param hdf_path: path to HDF file
+    :type hdf_path: str
+    :param segment_tuples: Segment type and slice of each segment.
+    :type segment_tuples: [(str, slice)]
+    :param dest_paths: Destination path of each segment.
+    :type dest_paths: [str]
+    :param superframe_present: Whether to split on superframe boundaries.
+    :type superframe_present: bool
+    :param fallback_dt: fallback_dt relative to the start of the data.
+    :type fallback_dt: datetime or None
+    :param workers: Number of processes.
+    :type workers: int
+    :param split_params: Airspeed and date/time parameters of the original file to slice for each segment rather than reading them back from the segments.
+    :type split_params: dict or None
+    :param airspeed_infos: Go-fast index and Airspeed hash of each segment (see append_segment_info).
+    :type airspeed_infos: [(int or None, str or None)] or None
+    :returns: Segments in the order of segment_tuples.
+    :rtype: [Segment]
+    '''
+    pool = multiprocessing.Pool(min(workers, len(segment_tuples)))
+    try:
+        durations = pool.map(
+            _write_segment,
+            [(hdf_path, segment_slice, dest_path, superframe_present)
+             for (_segment_type, segment_slice), dest_path
+             in zip(segment_tuples, dest_paths)],
+            chunksize=1)
+        fallback_dts = _chain_fallback_dts(fallback_dt, durations)
+        if airspeed_infos is None:
+            airspeed_infos = [None] * len(segment_tuples)
+        return pool.map(
+            _append_segment_info,
+            [(dest_path, segment_type, segment_slice, part, segment_fallback_dt,
+              _slice_segment_params(split_params, segment_slice)
+              if split_params else None, airspeed_info)
+             for part, ((segment_type, segment_slice), dest_path,
+                        segment_fallback_dt, airspeed_info)
+             in enumerate(zip(segment_tuples, dest_paths, fallback_dts,
+                              airspeed_infos),
+                          start=1)],
+            chunksize=1)
+    finally:
+        pool.close()
+        pool.join()
+
+
 def split_hdf_to_segments(hdf_path, aircraft_info, fallback_dt=None,
-                          draw=False, dest_dir=None):
+                          draw=False, dest_dir=None, workers=None,
+                          streaming=False):
     """
     Main method - analyses an HDF file for flight segments and splits each
     flight into a new segment appropriately.
@@ -662,6 +1310,10 @@ def split_hdf_to_segments(hdf_path, aircraft_info, fallback_dt=None,
     :param dest_dir: Destination directory, if None, the source file directory
         is used
     :type dest_dir: str
+    :param workers: Number of processes used to write segments and gather their information concurrently. Segments are processed serially if None or 1.
+    :type workers: int
+    :param streaming: Find the segments with split_segments_streaming, reading the data in windows rather than loading whole parameters. Segments are then written by write_segment as usual.
+    :type streaming: bool
     :returns: List of Segments
     :rtype: List of Segment recordtypes ('slice type part duration path hash')
     """
@@ -689,7 +1341,34 @@ def split_hdf_to_segments(hdf_path, aircraft_info, fallback_dt=None,
         else:
             logger.info("No PRE_FILE_ANALYSIS actions to perform")
 
-        segment_tuples = split_segments(hdf)
+        if streaming:
+            split_results = split_segments_streaming(hdf)
+            segment_tuples = [(segment_type, segment_slice) for
+                              segment_type, segment_slice, _airspeed_info
+                              in split_results]
+        else:
+            segment_tuples = split_segments(hdf)
+
+        airspeed_infos = None
+        if streaming or superframe_present:
+            # write_segment pads segments to superframe boundaries, so
+            # parameters are read back from each segment. When streaming,
+            # date/time parameters are read back from each segment rather
+            # than being loaded for the whole file.
+            split_params = None
+            if streaming and not superframe_present:
+                airspeed_infos = [airspeed_info for _segment_type,
+                                  _segment_slice, airspeed_info
+                                  in split_results]
+        else:
+            # Keep the parameters required for segment info in memory to
+            # avoid reading them back from each segment.
+            split_params = {'Airspeed': hdf['Airspeed']}
+            for name in ('Year', 'Month', 'Day', 'Hour', 'Minute', 'Second'):
+                param = hdf.get(name)
+                if param:
+                    split_params[name] = param
+
         if fallback_dt:
             # fallback_dt is relative to the end of the data; remove the data
             # duration to make it relative to the start of the data
@@ -699,32 +1378,52 @@ def split_hdf_to_segments(hdf_path, aircraft_info, fallback_dt=None,
                secs//86400, secs%86400//3600, secs%86400%3600//60, fallback_dt)
 
     # process each segment (into a new file) having closed original hdf_path
-    segments = []
-    previous_stop_dt = None
-    for part, segment_tuple in enumerate(segment_tuples, start=1):
-        segment_type, segment_slice = segment_tuple
-        # write segment to new split file (.001)
-        basename = os.path.basename(hdf_path)
-        dest_basename = os.path.splitext(basename)[0] + '.%03d.hdf5' % part
-        dest_path = os.path.join(dest_dir, dest_basename)
-        logger.debug("Writing segment %d: %s", part, dest_path)
-        write_segment(hdf_path, segment_slice, dest_path, supf_boundary=superframe_present)
-        segment = append_segment_info(dest_path, segment_type, segment_slice,
-                                      part, fallback_dt=fallback_dt)
+    basename = os.path.splitext(os.path.basename(hdf_path))[0]
+    dest_paths = [os.path.join(dest_dir, basename + '.%03d.hdf5' % part)
+                  for part in range(1, len(segment_tuples) + 1)]
+    if workers > 1 and len(segment_tuples) > 1:
+        segments = _process_segments_concurrently(
+            hdf_path, segment_tuples, dest_paths, superframe_present,
+            fallback_dt, workers, split_params=split_params,
+            airspeed_infos=airspeed_infos)
+    else:
+        segments = []
+        for part, (segment_tuple, dest_path) in \
+                enumerate(zip(segment_tuples, dest_paths), start=1):
+            segment_type, segment_slice = segment_tuple
+            if airspeed_infos:
+                airspeed_info = airspeed_infos[part - 1]
+            else:
+                airspeed_info = None
+            # write segment to new split file (.001)
+            logger.debug("Writing segment %d: %s", part, dest_path)
+            write_segment(hdf_path, segment_slice, dest_path,
+                          supf_boundary=superframe_present)
+            if split_params:
+                segment_params = _slice_segment_params(split_params,
+                                                       segment_slice)
+            else:
+                segment_params = None
+            segment = append_segment_info(dest_path, segment_type,
+                                          segment_slice, part,
+                                          fallback_dt=fallback_dt,
+                                          segment_params=segment_params,
+                                          airspeed_info=airspeed_info)
+            if fallback_dt:
+                # move the fallback_dt on to be relative to start of next segment
+                fallback_dt += segment.stop_dt - segment.start_dt
+            segments.append(segment)
 
+    previous_stop_dt = None
+    for segment in segments:
         if previous_stop_dt and segment.start_dt < previous_stop_dt:
             # In theory, this should not happen - but be warned of superframe padding?
             logger.warning(
                 "Segment start_dt '%s' comes before the previous segment "
                 "ended '%s'", segment.start_dt, previous_stop_dt)
         previous_stop_dt = segment.stop_dt
-
-        if fallback_dt:
-            # move the fallback_dt on to be relative to start of next segment
-            fallback_dt += segment.stop_dt - segment.start_dt
-        segments.append(segment)
         if draw:
-            plot_essential(dest_path)
+            plot_essential(segment.path)
 
     if draw:
         # show all figures together
@@ -751,6 +1450,11 @@ def parse_cmdline():
         'Format YYY-MM-DD hh:mm'
     )
     parser.add_argument('-L', '--log-level', default=None, help='Log level')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='Number of processes used to write segments.')
+    parser.add_argument('--streaming', action='store_true',
+                        help='Read the data in windows while splitting '
+                        'rather than loading whole parameters.')
     parser.add_argument('-q', '--quiet', action='store_true',
                         help="Don't output messages")
 
@@ -801,7 +1505,9 @@ def main():
         hdf_copy,
         ac_info,
         fallback_dt=args.fallback_datetime,
-        draw=False)
+        draw=False,
+        workers=args.workers,
+        streaming=args.streaming)
 
     # Rename the segment filenames to be able to use glob()
     for segment in segments:
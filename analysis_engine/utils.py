@@ -1,5 +1,7 @@
 import argparse
+import json
 import logging
+import numpy as np
 import os
 
 from datetime import datetime
@@ -10,7 +12,7 @@ from hdfaccess.utils import strip_hdf
 
 from analysis_engine.api_handler import APIError, get_api_handler
 from analysis_engine.dependency_graph import dependencies3, graph_nodes
-from analysis_engine.node import Node, NodeManager
+from analysis_engine.node import Node, NodeManager, P
 from analysis_engine import settings
 
 
@@ -93,6 +95,54 @@ def get_derived_nodes(module_names):
     return nodes
 
 
+def read_param_window(hdf, name, start_secs=0, stop_secs=None,
+                      valid_only=False):
+    '''
+    Read a parameter between start_secs and stop_secs from an HDF file
+    without loading the rest of its data. hdfaccess only reads whole
+    parameters, so this is the only place which reads its layout of the
+    file directly.
+
+    The result is built as derived_param_from_hdf would build it from the
+    whole parameter, i.e. with its data_type and combined mask but without
+    its submasks. Multistate parameters are rejected since their values
+    mapping is not decoded.
+
+    :param hdf: HDF file to read the parameter from.
+    :type hdf: hdfaccess.file.hdf_file
+    :param name: Name of the parameter.
+    :type name: str
+    :param start_secs: Start of the window in seconds.
+    :type start_secs: int or float
+    :param stop_secs: Stop of the window in seconds or None to read to the end of the data.
+    :type stop_secs: int or float or None
+    :param valid_only: Raise KeyError if the parameter is marked as invalid.
+    :type valid_only: bool
+    :raises KeyError: If the parameter does not exist or is invalid and valid_only is True.
+    :raises ValueError: If the parameter is multistate.
+    :returns: Parameter containing only the data within the window.
+    :rtype: Parameter
+    '''
+    group = hdf.hdf['series'][name]
+    if valid_only and group.attrs.get('invalid'):
+        raise KeyError(name)
+    # hdfaccess stores the values mapping as JSON, 'null' unless multistate.
+    if json.loads(group.attrs.get('values_mapping', 'null')):
+        raise ValueError("Cannot read a window of multistate parameter '%s'."
+                         % name)
+    frequency = group.attrs['frequency']
+    window = slice(int(start_secs * frequency),
+                   None if stop_secs is None else int(stop_secs * frequency))
+    data = group['data'][window]
+    if 'mask' in group:
+        mask = group['mask'][window]
+    else:
+        mask = np.ma.nomask
+    return P(name, array=np.ma.masked_array(data, mask=mask),
+             frequency=frequency, offset=group.attrs.get('supf_offset', 0),
+             data_type=group.attrs.get('data_type'))
+
+
 def derived_trimmer(hdf_path, node_names, dest):
     '''
     Trims an HDF file of parameters which are not dependencies of nodes in
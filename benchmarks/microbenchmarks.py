@@ -0,0 +1,364 @@
+#!/usr/bin/env python
+'''
+Microbenchmarks of analysis_engine.library functions.
+
+Functions are registered with a generator of representative inputs of a
+given number of samples. Each function is timed across increasing input
+sizes to estimate its empirical complexity (the slope of log(time) against
+log(size)). Results are compared against a baseline file, flagging
+functions whose scaling exponent or time regress beyond a tolerance. Times
+are only compared when the baseline was recorded within the same environment
+(see regressions.environment), otherwise only scaling exponents are compared.
+
+Usage:
+    python benchmarks/microbenchmarks.py
+    python benchmarks/microbenchmarks.py --only align repair_mask
+    python benchmarks/microbenchmarks.py --write-baseline
+    python benchmarks/microbenchmarks.py --compare-times
+'''
+import argparse
+import os
+import sys
+import timeit
+
+from collections import namedtuple, OrderedDict
+from datetime import datetime
+
+import numpy as np
+
+from analysis_engine import library
+from analysis_engine.node import P
+
+from regressions import (environment, find_regressions, read_results,
+                         report, same_environment, write_results)
+
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             'microbenchmarks_baseline.json')
+
+SIZES = (10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7)
+
+Microbenchmark = namedtuple('Microbenchmark', 'func inputs max_size')
+
+REGISTRY = OrderedDict()
+
+
+def register(func, max_size=None, name=None):
+    '''
+    Register a generator of representative inputs for a library function.
+
+    The decorated generator is called with the number of samples and a
+    random number generator and returns the positional and keyword arguments
+    to call func with. Functions which modify their inputs should be called
+    with copy=True or equivalent.
+
+    :param func: Library function to benchmark.
+    :type func: callable
+    :param max_size: Largest number of samples to time func with, e.g. for functions which are too slow to time with 10 million samples.
+    :type max_size: int or None
+    :param name: Name of the benchmark, defaults to the function name.
+    :type name: str or None
+    '''
+    def decorator(inputs):
+        REGISTRY[name or func.__name__] = Microbenchmark(func, inputs, max_size)
+        return inputs
+    return decorator
+
+
+def _signal(size, rng, mask_density=0.01):
+    '''
+    :returns: Noisy sinusoidal masked array with masked samples scattered throughout.
+    :rtype: np.ma.masked_array
+    '''
+    t = np.arange(size)
+    array = np.ma.array(1000 * np.sin(t / 500.0) + rng.normal(0, 10, size))
+    array[rng.rand(size) < mask_density] = np.ma.masked
+    return array
+
+
+def _slices(size, rng, count=None):
+    '''
+    :returns: Sorted non-overlapping slices within size samples.
+    :rtype: [slice]
+    '''
+    count = count or max(1, size // 100)
+    edges = np.sort(rng.choice(size, size=count * 2, replace=False))
+    return [slice(int(start), int(stop)) for start, stop in edges.reshape(-1, 2)]
+
+
+@register(library.align)
+def _align_inputs(size, rng):
+    slave = P('Slave', _signal(size, rng), frequency=4, offset=0.1)
+    master = P('Master', _signal(max(size // 4, 1), rng), frequency=1,
+               offset=0.5)
+    return (slave, master), {}
+
+
+@register(library.repair_mask)
+def _repair_mask_inputs(size, rng):
+    return (_signal(size, rng, mask_density=0.05),), {'copy': True,
+                                                      'repair_duration': None}
+
+
+@register(library.clip, max_size=10 ** 4)
+def _clip_inputs(size, rng):
+    return (_signal(size, rng), 5), {'hz': 1.0}
+
+
+@register(library.hysteresis, max_size=10 ** 6)
+def _hysteresis_inputs(size, rng):
+    return (_signal(size, rng), 20), {}
+
+
+@register(library.cycle_finder, max_size=10 ** 5)
+def _cycle_finder_inputs(size, rng):
+    return (_signal(size, rng),), {'min_step': 50}
+
+
+@register(library.engine_aggregates)
+def _engine_aggregates_inputs(size, rng):
+    return tuple(_signal(size, rng) for _ in range(4)), {}
+
+
+@register(library.runs_of_ones)
+def _runs_of_ones_inputs(size, rng):
+    return (_signal(size, rng) > 0,), {}
+
+
+@register(library.max_value)
+def _max_value_inputs(size, rng):
+    return (_signal(size, rng),), {'_slice': slice(size // 10, size // 2)}
+
+
+@register(library.max_values)
+def _max_values_inputs(size, rng):
+    slices = _slices(size, rng)
+    return (_signal(size, rng), [s.start for s in slices],
+            [s.stop for s in slices]), {}
+
+
+@register(library.index_at_value)
+def _index_at_value_inputs(size, rng):
+    array = np.ma.arange(size, dtype=float)
+    return (array, size * 0.75), {}
+
+
+@register(library.moving_average)
+def _moving_average_inputs(size, rng):
+    return (_signal(size, rng),), {}
+
+
+@register(library.integrate)
+def _integrate_inputs(size, rng):
+    return (_signal(size, rng), 1.0), {}
+
+
+@register(library.rate_of_change_array)
+def _rate_of_change_array_inputs(size, rng):
+    return (_signal(size, rng), 1.0), {}
+
+
+@register(library.slices_above)
+def _slices_above_inputs(size, rng):
+    return (_signal(size, rng), 500), {}
+
+
+@register(library.values_at_indices)
+def _values_at_indices_inputs(size, rng):
+    indices = rng.uniform(0, size - 1, max(size // 10, 1))
+    return (_signal(size, rng), indices), {}
+
+
+@register(library.slices_and)
+def _slices_and_inputs(size, rng):
+    return (_slices(size, rng), _slices(size, rng)), {}
+
+
+@register(library.slices_or)
+def _slices_or_inputs(size, rng):
+    return (_slices(size, rng), _slices(size, rng)), {}
+
+
+@register(library.slices_not)
+def _slices_not_inputs(size, rng):
+    return (_slices(size, rng),), {'begin_at': 0, 'end_at': size}
+
+
+@register(library.calculate_timebase, max_size=10 ** 6)
+def _calculate_timebase_inputs(size, rng):
+    seconds = np.arange(size) + 12 * 3600
+    return ([2013] * size, [6] * size, [1] * size, (seconds // 3600) % 24,
+            (seconds // 60) % 60, seconds % 60), {}
+
+
+@register(library.bearings_and_distances)
+def _bearings_and_distances_inputs(size, rng):
+    latitudes = np.ma.array(rng.uniform(-60, 60, size))
+    longitudes = np.ma.array(rng.uniform(-180, 180, size))
+    return (latitudes, longitudes, {'latitude': 51.47, 'longitude': -0.45}), {}
+
+
+def measure(func, args, kwargs, repeat=3, min_time=0.05):
+    '''
+    :returns: Fastest time of a single call of func in seconds. Fast functions are called repeatedly so that each measurement takes at least min_time.
+    :rtype: float
+    '''
+    timer = timeit.Timer(lambda: func(*args, **kwargs))
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 10000:
+            break
+        number *= 10
+    times = [elapsed] + timer.repeat(repeat=repeat - 1, number=number)
+    return min(times) / number
+
+
+def scaling_exponent(sizes, times):
+    '''
+    :returns: Slope of log(time) against log(size), e.g. ~1 for linear complexity. None if fewer than two sizes were timed.
+    :rtype: float or None
+    '''
+    if len(sizes) < 2:
+        return None
+    return float(np.polyfit(np.log10(sizes), np.log10(times), 1)[0])
+
+
+def run(names=None, sizes=SIZES, repeat=3, seed=0):
+    '''
+    :param names: Names of the registered benchmarks to run, defaults to all.
+    :type names: [str] or None
+    :returns: Results which can be serialised as JSON.
+    :rtype: dict
+    '''
+    functions = {}
+    for name, benchmark in REGISTRY.iteritems():
+        if names and name not in names:
+            continue
+        timed_sizes = [size for size in sizes
+                       if not benchmark.max_size or size <= benchmark.max_size]
+        times = []
+        try:
+            for size in timed_sizes:
+                args, kwargs = benchmark.inputs(size,
+                                                np.random.RandomState(seed))
+                times.append(measure(benchmark.func, args, kwargs,
+                                     repeat=repeat))
+        except Exception as err:
+            functions[name] = {'error': repr(err)}
+            continue
+        functions[name] = {
+            'times': OrderedDict((str(size), seconds) for size, seconds
+                                 in zip(timed_sizes, times)),
+            'exponent': scaling_exponent(timed_sizes, times),
+        }
+    return {
+        'created': datetime.utcnow().isoformat(),
+        'environment': environment(),
+        'functions': functions,
+    }
+
+
+def compare(results, baseline, time_tolerance=1.0, exponent_tolerance=0.2):
+    '''
+    Compare results against a baseline (see regressions.find_regressions).
+
+    :param time_tolerance: Fraction by which a function may be slower than the baseline at any size. None to only compare scaling exponents, e.g. on different hardware.
+    :type time_tolerance: float or None
+    :param exponent_tolerance: Amount by which the scaling exponent may exceed the baseline.
+    :type exponent_tolerance: float
+    :returns: Name and description of each regression.
+    :rtype: [(str, str)]
+    '''
+    def compare_function(result, previous):
+        regressions = []
+        # Only compare exponents estimated from the same sizes.
+        sizes = sorted((size for size in result['times']
+                        if size in previous['times']), key=int)
+        exponent = scaling_exponent(
+            map(int, sizes), [result['times'][size] for size in sizes])
+        previous_exponent = scaling_exponent(
+            map(int, sizes), [previous['times'][size] for size in sizes])
+        if exponent is not None and \
+           exponent > previous_exponent + exponent_tolerance:
+            regressions.append('scaling exponent %.2f > %.2f' % (
+                exponent, previous_exponent))
+        if time_tolerance is None:
+            return regressions
+        for size, seconds in result['times'].iteritems():
+            previous_seconds = previous['times'].get(size)
+            if previous_seconds and \
+               seconds > previous_seconds * (1 + time_tolerance):
+                regressions.append('%.2fx slower with %s samples' % (
+                    seconds / previous_seconds, size))
+        return regressions
+
+    return find_regressions(results['functions'], baseline['functions'],
+                            compare_function)
+
+
+def parse_cmdline():
+    parser = argparse.ArgumentParser(
+        description='Microbenchmarks of analysis_engine.library functions.')
+    parser.add_argument('--only', nargs='+', help='Names of benchmarks to run.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(SIZES),
+                        help='Numbers of samples to time each function with.')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help='Path to write JSON results to.')
+    parser.add_argument('--baseline', default=BASELINE_PATH,
+                        help='Path of JSON results to compare against.')
+    parser.add_argument('--write-baseline', action='store_true',
+                        help='Write the results to the baseline path.')
+    parser.add_argument('--time-tolerance', type=float, default=1.0,
+                        help='Fraction by which functions may be slower than '
+                        'the baseline.')
+    parser.add_argument('--exponent-tolerance', type=float, default=0.2,
+                        help='Amount by which scaling exponents may exceed '
+                        'the baseline.')
+    parser.add_argument('--exponent-only', action='store_true',
+                        help='Only compare scaling exponents.')
+    parser.add_argument('--compare-times', action='store_true',
+                        help='Compare times even if the baseline was '
+                        'recorded within a different environment.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_cmdline()
+    results = run(names=args.only, sizes=args.sizes, repeat=args.repeat)
+
+    for name, result in sorted(results['functions'].iteritems()):
+        if 'error' in result:
+            print '%-26s %s' % (name, result['error'])
+            continue
+        exponent = result['exponent']
+        print '%-26s %s %s' % (
+            name, 'n^%.2f' % exponent if exponent is not None else '',
+            ' '.join('%s:%.2es' % item for item in result['times'].items()))
+
+    if args.output:
+        write_results(args.output, results)
+
+    if args.write_baseline:
+        write_results(args.baseline, results)
+    elif os.path.exists(args.baseline):
+        baseline = read_results(args.baseline)
+        compare_times = not args.exponent_only and (
+            args.compare_times or same_environment(results, baseline))
+        if not compare_times and not args.exponent_only:
+            print 'Only comparing scaling exponents since the baseline was ' \
+                  'recorded within a different environment.'
+        if args.only:
+            # Only the selected functions are expected to have been run.
+            baseline['functions'] = dict(
+                (name, previous) for name, previous
+                in baseline['functions'].iteritems() if name in args.only)
+        regressions = compare(
+            results, baseline,
+            time_tolerance=args.time_tolerance if compare_times else None,
+            exponent_tolerance=args.exponent_tolerance)
+        sys.exit(report(regressions))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+'''
+Memory and creation time benchmark of the record types used for KPVs, KTIs
+and ApproachItems.
+
+Compares the __slots__ based recordtypes in analysis_engine.node with an
+equivalent class storing its fields within a per-instance __dict__.
+
+Usage:
+    python benchmarks/record_memory.py [count]
+'''
+import gc
+import sys
+import timeit
+
+from analysis_engine.node import ApproachItem, KeyPointValue, KeyTimeInstance
+
+
+class DictKeyPointValue(object):
+    '''
+    KeyPointValue equivalent with a per-instance __dict__.
+    '''
+    def __init__(self, index=None, value=None, name=None, slice=slice(None),
+                 datetime=None, latitude=None, longitude=None):
+        self.index = index
+        self.value = value
+        self.name = name
+        self.slice = slice
+        self.datetime = datetime
+        self.latitude = latitude
+        self.longitude = longitude
+
+
+def record_size(record):
+    '''
+    :param record: Record instance.
+    :type record: object
+    :returns: Size of the record and its __dict__ (if any) in bytes.
+    :rtype: int
+    '''
+    size = sys.getsizeof(record)
+    if hasattr(record, '__dict__'):
+        size += sys.getsizeof(record.__dict__)
+    return size
+
+
+def measure(cls, args, count):
+    '''
+    :param cls: Record class to create.
+    :type cls: class
+    :param args: Positional arguments to create the record with.
+    :type args: tuple
+    :param count: Number of records to create.
+    :type count: int
+    :returns: Bytes per record and microseconds to create each record.
+    :rtype: (int, float)
+    '''
+    gc.collect()
+    timer = timeit.Timer(lambda: [cls(*args) for _ in xrange(count)])
+    seconds = min(timer.repeat(repeat=3, number=1))
+    return record_size(cls(*args)), seconds / count * 1e6
+
+
+def main(count=100000):
+    rows = [
+        ('KeyPointValue', KeyPointValue, (10.5, 12.3, 'Airspeed Max')),
+        ('KeyPointValue (__dict__)', DictKeyPointValue,
+         (10.5, 12.3, 'Airspeed Max')),
+        ('KeyTimeInstance', KeyTimeInstance, (10.5, 'Touchdown')),
+        ('ApproachItem', ApproachItem, ('LANDING', slice(10, 20))),
+    ]
+    print '%-26s %12s %12s' % ('Record', 'Bytes/record', 'Create (us)')
+    for label, cls, args in rows:
+        size, usecs = measure(cls, args, count)
+        print '%-26s %12d %12.3f' % (label, size, usecs)
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
@@ -0,0 +1,117 @@
+'''
+Recording benchmark results as JSON and comparing them against a baseline,
+shared by run_benchmarks.py and microbenchmarks.py.
+
+Results are keyed by benchmark name. Each result either holds the
+measurements of the benchmark or an 'error' if the benchmark raised an
+exception.
+'''
+import json
+import platform
+
+import numpy as np
+
+
+def cpu_model():
+    '''
+    :returns: Model name of the processor, e.g. from /proc/cpuinfo on Linux.
+    :rtype: str
+    '''
+    try:
+        with open('/proc/cpuinfo') as cpuinfo:
+            for line in cpuinfo:
+                if line.startswith('model name'):
+                    return line.split(':', 1)[1].strip()
+    except IOError:
+        pass
+    return platform.processor()
+
+
+def environment():
+    '''
+    :returns: Description of the environment the benchmarks were run within.
+    :rtype: dict
+    '''
+    return {
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'cpu': cpu_model(),
+    }
+
+
+def same_environment(results, baseline):
+    '''
+    :returns: Whether results and baseline were recorded within the same environment, in which case absolute times are comparable.
+    :rtype: bool
+    '''
+    return results.get('environment') == baseline.get('environment')
+
+
+def find_regressions(results, baseline, compare_result):
+    '''
+    Compare each result against the baseline's result of the same name.
+    Benchmarks which raised an exception and benchmarks within the baseline
+    which are missing from the results are regressions.
+
+    :param results: Results keyed by benchmark name.
+    :type results: dict
+    :param baseline: Baseline results keyed by benchmark name.
+    :type baseline: dict
+    :param compare_result: Called with a result and the baseline's result, neither of which raised an exception, returning a description of each regression.
+    :type compare_result: callable
+    :returns: Name and description of each regression.
+    :rtype: [(str, str)]
+    '''
+    regressions = []
+    for name, previous in sorted(baseline.iteritems()):
+        result = results.get(name)
+        if result is None:
+            regressions.append((name, 'not run but within the baseline'))
+        elif 'error' in result:
+            regressions.append((name, 'failed with %s' % result['error']))
+        elif 'error' not in previous:
+            # Nothing to compare if the benchmark also failed when the
+            # baseline was recorded.
+            regressions.extend((name, description) for description
+                               in compare_result(result, previous))
+    for name, result in sorted(results.iteritems()):
+        if name not in baseline and 'error' in result:
+            regressions.append((name, 'failed with %s' % result['error']))
+    return regressions
+
+
+def read_results(path):
+    '''
+    :param path: Path of JSON results.
+    :type path: str
+    :rtype: dict
+    '''
+    with open(path) as results_file:
+        return json.load(results_file)
+
+
+def write_results(path, results):
+    '''
+    :param path: Path to write JSON results to.
+    :type path: str
+    :param results: Results which can be serialised as JSON.
+    :type results: dict
+    '''
+    with open(path, 'w') as output:
+        json.dump(results, output, indent=2, sort_keys=True,
+                  separators=(',', ': '))
+
+
+def report(regressions):
+    '''
+    Print each regression.
+
+    :param regressions: Name and description of each regression.
+    :type regressions: [(str, str)]
+    :returns: Exit status, 1 if there were regressions.
+    :rtype: int
+    '''
+    for name, description in regressions:
+        print 'REGRESSION: %s: %s' % (name, description)
+    return 1 if regressions else 0
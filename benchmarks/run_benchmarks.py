@@ -0,0 +1,311 @@
+#!/usr/bin/env python
+'''
+Times process_flight, split_hdf_to_segments and frequently used library
+functions against synthetic flights (see synthetic.py), and dependency_order
+with every node against a large LFL, and records the results as JSON so that
+runs can be compared against a stored baseline.
+
+Usage:
+    python benchmarks/run_benchmarks.py --output results.json
+    python benchmarks/run_benchmarks.py --baseline baseline.json
+    python benchmarks/run_benchmarks.py --no-dependencies --no-files
+
+Compare against a baseline recorded with the same options, since benchmarks
+within the baseline which are not run are reported as regressions, and
+within the same environment (see regressions.environment), since the
+benchmarks are compared by time.
+'''
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from datetime import datetime
+
+import numpy as np
+
+from analysis_engine import library
+from analysis_engine.node import P
+
+from regressions import (environment, find_regressions, read_results,
+                         report, same_environment, write_results)
+from synthetic import synthetic_parameters, write_flight
+
+
+AIRCRAFT_INFO = {
+    'Tail Number': 'G-SYNT',
+    'Manufacturer': 'Boeing',
+    'Family': 'B737',
+    'Series': 'B737-300',
+    'Model': 'B737-333',
+    'Precise Positioning': True,
+}
+
+
+def time_call(func, repeat=3, setup=None):
+    '''
+    :param func: Function to time.
+    :type func: callable
+    :param repeat: Number of times to call func.
+    :type repeat: int
+    :param setup: Function called before each call of func, which is not timed.
+    :type setup: callable or None
+    :returns: Fastest time of the calls in seconds.
+    :rtype: float
+    '''
+    times = []
+    for _ in range(repeat):
+        if setup:
+            setup()
+        start = time.time()
+        func()
+        times.append(time.time() - start)
+    return min(times)
+
+
+def library_benchmarks(params):
+    '''
+    :param params: Synthetic flight parameters.
+    :type params: dict
+    :returns: Calls of library functions keyed by benchmark name.
+    :rtype: dict
+    '''
+    airspeed = params['Airspeed']
+    altitude = params['Altitude STD']
+    heading = params['Heading']
+    onehz = P(frequency=1, offset=0.5)
+    fast_slices = np.ma.clump_unmasked(
+        np.ma.masked_less(airspeed.array, 80))
+    high_slices = np.ma.clump_unmasked(
+        np.ma.masked_less(altitude.array, 10000))
+    end = len(airspeed.array)
+    return {
+        'align': lambda: library.align(altitude, onehz),
+        'repair_mask': lambda: library.repair_mask(
+            airspeed.array, frequency=airspeed.frequency,
+            repair_duration=None, copy=True),
+        'clip': lambda: library.clip(altitude.array, 5, hz=altitude.frequency),
+        'hysteresis': lambda: library.hysteresis(heading.array, 2),
+        'cycle_finder': lambda: library.cycle_finder(altitude.array,
+                                                     min_step=500),
+        'slices_and': lambda: library.slices_and(fast_slices, high_slices),
+        'slices_or': lambda: library.slices_or(fast_slices, high_slices),
+        'slices_not': lambda: library.slices_not(fast_slices, begin_at=0,
+                                                 end_at=end),
+    }
+
+
+def file_benchmarks(hdf_path, temp_dir):
+    '''
+    :param hdf_path: Path of a synthetic flight HDF file.
+    :type hdf_path: str
+    :param temp_dir: Directory for copies of the HDF file and its segments.
+    :type temp_dir: str
+    :returns: (call, setup) of file based benchmarks keyed by benchmark name.
+    :rtype: dict
+    '''
+    from analysis_engine.process_flight import process_flight
+    from analysis_engine.split_hdf_to_segments import split_hdf_to_segments
+
+    copy_path = os.path.join(temp_dir, 'copy.hdf5')
+
+    def copy_hdf():
+        # Both functions write to the file, so each call starts from a copy.
+        shutil.copy(hdf_path, copy_path)
+
+    return {
+        'split_hdf_to_segments': (
+            lambda: split_hdf_to_segments(copy_path, AIRCRAFT_INFO),
+            copy_hdf),
+        'process_flight': (
+            lambda: process_flight(copy_path, AIRCRAFT_INFO['Tail Number'],
+                                   aircraft_info=AIRCRAFT_INFO),
+            copy_hdf),
+    }
+
+
+def dependency_benchmarks():
+    '''
+    :returns: Calls of dependency_order requesting every node, and requesting a few dozen KPVs with a pruned graph, keyed by benchmark name.
+    :rtype: dict
+    '''
+    from analysis_engine import settings
+    from analysis_engine.dependency_graph import dependency_order
+    from analysis_engine.node import KeyPointValueNode, NodeManager
+    from analysis_engine.utils import get_derived_nodes
+
+    derived_nodes = get_derived_nodes(settings.NODE_MODULES)
+    # A large LFL recording every parameter which the nodes depend upon but
+    # cannot derive.
+    lfl = set()
+    for node in derived_nodes.itervalues():
+        lfl.update(node.get_dependency_names())
+    lfl = sorted(lfl - set(derived_nodes) - set(AIRCRAFT_INFO))
+
+    # A customer profile requesting a few dozen KPVs.
+    kpvs = sorted(name for name, node in derived_nodes.iteritems()
+                  if issubclass(node, KeyPointValueNode))[::10][:40]
+
+    def order(requested, prune=False):
+        node_mgr = NodeManager(
+            datetime(2013, 6, 1, 8), 3600, list(lfl), requested, [],
+            derived_nodes, AIRCRAFT_INFO, {})
+        dependency_order(node_mgr, draw=False, prune=prune)
+
+    return {
+        'dependency_order (%d nodes %d LFL parameters)' % (
+            len(derived_nodes), len(lfl)):
+        lambda: order(derived_nodes.keys()),
+        'dependency_order pruned (%d KPVs %d LFL parameters)' % (
+            len(kpvs), len(lfl)):
+        lambda: order(kpvs, prune=True),
+    }
+
+
+def run(durations=(3600,), frequencies=(1, 4, 16), flights=1, param_count=0,
+        mask_density=0.01, repeat=3, seed=0, files=True, dependencies=True):
+    '''
+    Run the benchmarks for each combination of flight duration and sample
+    rate.
+
+    :returns: Results which can be serialised as JSON.
+    :rtype: dict
+    '''
+    benchmarks = {}
+    if dependencies:
+        for name, func in sorted(dependency_benchmarks().items()):
+            benchmarks[name] = {'seconds': time_call(func, repeat=repeat)}
+
+    for duration in durations:
+        for frequency in frequencies:
+            suffix = ' (%ds %gHz)' % (duration, frequency)
+            config = dict(duration=duration, frequency=frequency,
+                          flights=flights, param_count=param_count,
+                          mask_density=mask_density, seed=seed)
+            params = synthetic_parameters(**config)
+            samples = len(params['Airspeed'].array)
+            for name, func in sorted(library_benchmarks(params).items()):
+                benchmarks['library.' + name + suffix] = {
+                    'seconds': time_call(func, repeat=repeat),
+                    'samples': samples,
+                }
+            if not files:
+                continue
+            temp_dir = tempfile.mkdtemp()
+            try:
+                hdf_path = write_flight(
+                    os.path.join(temp_dir, 'synthetic.hdf5'), **config)
+                for name, (func, setup) in \
+                        sorted(file_benchmarks(hdf_path, temp_dir).items()):
+                    try:
+                        seconds = time_call(func, repeat=repeat, setup=setup)
+                    except Exception as err:
+                        benchmarks[name + suffix] = {'error': repr(err)}
+                    else:
+                        benchmarks[name + suffix] = {'seconds': seconds,
+                                                     'samples': samples}
+            finally:
+                shutil.rmtree(temp_dir)
+
+    return {
+        'created': datetime.utcnow().isoformat(),
+        'environment': environment(),
+        'config': {
+            'durations': list(durations),
+            'frequencies': list(frequencies),
+            'flights': flights,
+            'param_count': param_count,
+            'mask_density': mask_density,
+            'repeat': repeat,
+            'seed': seed,
+            'files': files,
+            'dependencies': dependencies,
+        },
+        'benchmarks': benchmarks,
+    }
+
+
+def compare(results, baseline, tolerance=0.25):
+    '''
+    Compare results against a baseline (see regressions.find_regressions).
+
+    :param results: Results of run().
+    :type results: dict
+    :param baseline: Results of a previous run().
+    :type baseline: dict
+    :param tolerance: Fraction by which a benchmark may be slower than the baseline.
+    :type tolerance: float
+    :returns: Name and description of each regression.
+    :rtype: [(str, str)]
+    '''
+    def compare_benchmark(result, previous):
+        if not previous.get('seconds'):
+            return []
+        ratio = result['seconds'] / previous['seconds']
+        if ratio > 1 + tolerance:
+            return ['%.2fx slower than the baseline' % ratio]
+        return []
+
+    return find_regressions(results['benchmarks'], baseline['benchmarks'],
+                            compare_benchmark)
+
+
+def parse_cmdline():
+    parser = argparse.ArgumentParser(
+        description='Benchmark flight processing with synthetic flights.')
+    parser.add_argument('--duration', type=int, nargs='+', default=[3600],
+                        help='Durations of each flight in seconds.')
+    parser.add_argument('--frequency', type=float, nargs='+',
+                        default=[1, 4, 16], help='Sample rates in Hz.')
+    parser.add_argument('--flights', type=int, default=1,
+                        help='Number of flights within each data file.')
+    parser.add_argument('--params', type=int, default=0,
+                        help='Number of additional parameters.')
+    parser.add_argument('--mask-density', type=float, default=0.01,
+                        help='Fraction of samples to mask.')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='Number of times to run each benchmark.')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-files', action='store_true',
+                        help='Do not time process_flight and '
+                        'split_hdf_to_segments.')
+    parser.add_argument('--no-dependencies', action='store_true',
+                        help='Do not time dependency_order.')
+    parser.add_argument('--output', help='Path to write JSON results to.')
+    parser.add_argument('--baseline', help='Path of JSON results to compare '
+                        'against.')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Fraction by which benchmarks may be slower than '
+                        'the baseline.')
+    return parser.parse_args()
+
+
+def main():
+    args = parse_cmdline()
+    results = run(durations=args.duration, frequencies=args.frequency,
+                  flights=args.flights, param_count=args.params,
+                  mask_density=args.mask_density, repeat=args.repeat,
+                  seed=args.seed, files=not args.no_files,
+                  dependencies=not args.no_dependencies)
+
+    for name, result in sorted(results['benchmarks'].items()):
+        if 'seconds' in result:
+            print '%-50s %10.4fs' % (name, result['seconds'])
+        else:
+            print '%-50s %s' % (name, result['error'])
+
+    if args.output:
+        write_results(args.output, results)
+
+    if args.baseline:
+        baseline = read_results(args.baseline)
+        if not same_environment(results, baseline):
+            print 'WARNING: The baseline was recorded within a different ' \
+                  'environment so times may not be comparable.'
+        sys.exit(report(compare(results, baseline, tolerance=args.tolerance)))
+
+
+if __name__ == '__main__':
+    main()
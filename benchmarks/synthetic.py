@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+'''
+Synthetic flight data for benchmarking.
+
+Each flight is made up of taxi, takeoff, climb, cruise, descent, landing and
+taxi phases stretched over a configurable duration and recorded at a
+configurable sample rate. Several flights may be recorded back to back to
+create multi-sector data files for split_hdf_to_segments.
+
+Usage:
+    python benchmarks/synthetic.py path [duration] [frequency] [flights]
+'''
+import sys
+
+import numpy as np
+
+from datetime import datetime, timedelta
+
+from analysis_engine.node import P
+
+
+# Airspeed (kts), Altitude STD (ft), Heading (deg, unwrapped) and Eng N1 (%)
+# at boundaries of the flight phases as fractions of the flight's duration.
+PROFILE = np.array([
+    # fraction, airspeed, altitude, heading, eng_n1
+    (0.0, 0, 0, 90, 0),
+    (0.02, 0, 0, 90, 22),     # engine start
+    (0.05, 15, 0, 180, 25),   # taxi out
+    (0.08, 15, 0, 270, 25),
+    (0.09, 150, 0, 270, 90),  # takeoff roll
+    (0.1, 180, 1500, 270, 90),
+    (0.15, 250, 10000, 320, 85),
+    (0.3, 290, 35000, 320, 80),  # top of climb
+    (0.7, 290, 35000, 340, 75),  # top of descent
+    (0.9, 180, 3000, 370, 40),
+    (0.95, 130, 0, 370, 35),  # touchdown
+    (0.96, 30, 0, 370, 60),   # reverse thrust
+    (0.97, 15, 0, 460, 25),   # taxi in
+    (0.99, 0, 0, 450, 22),
+    (1.0, 0, 0, 450, 0),      # engine shutdown
+])
+
+CORE_PARAMETERS = ('Airspeed', 'Altitude STD', 'Heading', 'Groundspeed',
+                   'Eng (1) N1', 'Eng (2) N1', 'Latitude', 'Longitude')
+
+
+def mask_randomly(array, density, rng):
+    '''
+    Mask runs of samples at random.
+
+    :param array: Array to mask in place.
+    :type array: np.ma.masked_array
+    :param density: Fraction of samples to mask.
+    :type density: float
+    :param rng: Random number generator.
+    :type rng: np.random.RandomState
+    :returns: The masked array.
+    :rtype: np.ma.masked_array
+    '''
+    if not density:
+        return array
+    run_length = 4
+    starts = rng.randint(0, len(array),
+                         size=int(len(array) * density / run_length) + 1)
+    for offset in range(run_length):
+        array[np.minimum(starts + offset, len(array) - 1)] = np.ma.masked
+    return array
+
+
+def flight_arrays(duration, frequency=1.0, rng=None):
+    '''
+    Create arrays of the core parameters for a single flight.
+
+    :param duration: Duration of the flight in seconds.
+    :type duration: int
+    :param frequency: Sample rate of the parameters in Hz.
+    :type frequency: float
+    :param rng: Random number generator used for noise.
+    :type rng: np.random.RandomState
+    :returns: Arrays of the CORE_PARAMETERS.
+    :rtype: dict
+    '''
+    rng = rng or np.random.RandomState(0)
+    samples = int(duration * frequency)
+    times = np.linspace(0, 1, samples)
+    fractions = PROFILE[:, 0]
+    airspeed = np.interp(times, fractions, PROFILE[:, 1])
+    altitude = np.interp(times, fractions, PROFILE[:, 2])
+    heading = np.interp(times, fractions, PROFILE[:, 3]) % 360
+    eng_n1 = np.interp(times, fractions, PROFILE[:, 4])
+
+    groundspeed = airspeed * (1 + altitude / 100000.0)
+    # Dead reckoning from the heading and groundspeed (1 kt ~ 1/60 deg/hr).
+    step = groundspeed / 3600.0 / 60.0 / frequency
+    latitude = 51.47 + np.cumsum(step * np.cos(np.radians(heading)))
+    longitude = -0.45 + np.cumsum(step * np.sin(np.radians(heading)))
+
+    def noisy(array, scale):
+        return np.ma.array(array + rng.normal(0, scale, samples))
+
+    return {
+        'Airspeed': np.ma.maximum(noisy(airspeed, 0.5), 0),
+        'Altitude STD': noisy(altitude, 5),
+        'Heading': noisy(heading, 0.2) % 360,
+        'Groundspeed': np.ma.maximum(noisy(groundspeed, 0.5), 0),
+        'Eng (1) N1': np.ma.maximum(noisy(eng_n1, 0.2), 0),
+        'Eng (2) N1': np.ma.maximum(noisy(eng_n1, 0.2), 0),
+        'Latitude': np.ma.array(latitude),
+        'Longitude': np.ma.array(longitude),
+    }
+
+
+def synthetic_parameters(duration=3600, frequency=1.0, flights=1,
+                         param_count=0, mask_density=0.0, seed=0,
+                         start_datetime=datetime(2013, 6, 1, 8, 0, 0)):
+    '''
+    Create parameters for one or more consecutive flights.
+
+    :param duration: Duration of each flight in seconds.
+    :type duration: int
+    :param frequency: Sample rate of the flight parameters in Hz.
+    :type frequency: float
+    :param flights: Number of flights recorded back to back.
+    :type flights: int
+    :param param_count: Number of additional noise parameters.
+    :type param_count: int
+    :param mask_density: Fraction of samples of each parameter to mask.
+    :type mask_density: float
+    :param seed: Seed of the random number generator.
+    :type seed: int
+    :param start_datetime: Datetime of the first sample.
+    :type start_datetime: datetime
+    :returns: Parameters keyed by name.
+    :rtype: dict
+    '''
+    rng = np.random.RandomState(seed)
+    arrays = [flight_arrays(duration, frequency, rng) for _ in range(flights)]
+    params = {}
+    for name in CORE_PARAMETERS:
+        array = np.ma.concatenate([a[name] for a in arrays])
+        params[name] = P(name, mask_randomly(array, mask_density, rng),
+                         frequency=frequency)
+
+    samples = len(params['Airspeed'].array)
+    for index in range(param_count):
+        name = 'Synthetic Parameter (%d)' % (index + 1)
+        array = np.ma.array(np.cumsum(rng.normal(0, 1, samples)))
+        params[name] = P(name, mask_randomly(array, mask_density, rng),
+                         frequency=frequency)
+
+    # Date and time parameters are recorded at 1Hz.
+    seconds = np.arange(int(samples / frequency))
+    dts = [start_datetime + timedelta(seconds=int(s)) for s in seconds]
+    for name in ('Year', 'Month', 'Day', 'Hour', 'Minute', 'Second'):
+        attr = name.lower()
+        params[name] = P(name, np.ma.array([getattr(dt, attr) for dt in dts]),
+                         frequency=1)
+    return params
+
+
+def write_flight(path, **kwargs):
+    '''
+    Write synthetic flights to an HDF file.
+
+    :param path: Path of the HDF file to create.
+    :type path: str
+    :param kwargs: Keyword arguments of synthetic_parameters.
+    :returns: Path of the HDF file.
+    :rtype: str
+    '''
+    from hdfaccess.file import hdf_file
+
+    params = synthetic_parameters(**kwargs)
+    airspeed = params['Airspeed']
+    with hdf_file(path, create=True) as hdf:
+        for name, param in params.iteritems():
+            hdf[name] = param
+        hdf.duration = len(airspeed.array) / airspeed.frequency
+    return path
+
+
+def main(path, duration=3600, frequency=1.0, flights=1):
+    write_flight(path, duration=int(duration), frequency=float(frequency),
+                 flights=int(flights))
+    print 'Created %s' % path
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:5])
@@ -1,4 +1,9 @@
 import collections
+import mock
+import os
+import shutil
+import stat
+import tempfile
 import unittest
 import networkx as nx
 
@@ -7,11 +12,19 @@ from datetime import datetime
 from analysis_engine.node import (DerivedParameterNode, Node, NodeManager, P)
 from analysis_engine.dependency_graph import (
     any_predecessors_in_requested,
+    decode_dependency_tree,
+    dependencies3,
     dependency_order, 
+    dump_dependency_tree,
+    encode_dependency_tree,
     graph_nodes, 
     graph_adjacencies,
     indent_tree,
     process_order,
+    read_dependency_tree,
+    register_dependency_tree,
+    requested_dependencies,
+    requested_root_nodes,
 )
 from analysis_engine.utils import get_derived_nodes
   
@@ -166,6 +179,37 @@ class TestDependencyGraph(unittest.TestCase):
         self.assertFalse(any_predecessors_in_requested('x', req, gr))
         self.assertFalse(any_predecessors_in_requested('y', req, gr))
         
+    def test_requested_root_nodes(self):
+        edges = [('a', 'b'), ('b', 'c1'), ('b', 'c2'), ('b', 'c3'), ('c2', 'd'),
+                 ('x', 'y'), ('y', 'z'), ('w', 'd')]
+        gr = nx.DiGraph(edges)
+        self.assertEqual(requested_root_nodes(gr, ['a', 'b', 'c1', 'c3']),
+                         ['a'])
+        self.assertEqual(requested_root_nodes(gr, ['b', 'y', 'z']), ['b', 'y'])
+        # 'd' is depended upon by 'c2' through its second predecessor 'b'.
+        self.assertEqual(requested_root_nodes(gr, ['d', 'a', 'w']), ['a', 'w'])
+        self.assertRaises(nx.NetworkXError, requested_root_nodes, gr,
+                          ['c1', 'missing'])
+        # Requested nodes within circular dependencies are always linked.
+        gr.add_edges_from([('p', 'q'), ('q', 'p'), ('q', 'r'), ('s', 'q')])
+        self.assertEqual(requested_root_nodes(gr, ['r', 'q', 'p']), ['q', 'p'])
+        self.assertEqual(requested_root_nodes(gr, ['p', 'q', 'x']),
+                         ['p', 'q', 'x'])
+        self.assertEqual(requested_root_nodes(gr, ['q', 's']), ['q', 's'])
+
+    def test_requested_dependencies(self):
+        mgr = NodeManager(datetime.now(), 10, self.lfl_params + ['P6'],
+                          ['P7'], ['P8'], self.derived_nodes, {}, {})
+        self.assertEqual(requested_dependencies(mgr),
+                         set(['P4', 'P5', 'P6', 'P7', 'P8', 'Raw1', 'Raw2',
+                              'Raw3', 'Raw4', 'Raw5']))
+        mgr = NodeManager(datetime.now(), 10, self.lfl_params + ['P6'],
+                          ['P5', 'P6', 'Missing'], [], self.derived_nodes, {},
+                          {})
+        # P6 is recorded within the LFL so Raw3 is not a dependency of it.
+        self.assertEqual(requested_dependencies(mgr),
+                         set(['P5', 'P6', 'Missing', 'Raw3', 'Raw4']))
+
     def test_graph_nodes_using_sample_tree(self): 
         requested = ['P7', 'P8']
         mgr2 = NodeManager(datetime.now(), 10, self.lfl_params, requested, [],
@@ -191,6 +235,17 @@ class TestDependencyGraph(unittest.TestCase):
         # should only be linked to P5
         self.assertEqual(gr.neighbors('root'), ['P5'])
     
+    def test_graph_nodes_pruned(self):
+        requested = ['P5']
+        mgr = NodeManager(datetime.now(), 1, self.lfl_params, requested, [],
+                          self.derived_nodes, {}, {})
+        gr = graph_nodes(mgr, prune=True)
+        self.assertEqual(sorted(gr.nodes()), ['P5', 'Raw3', 'Raw4', 'root'])
+        self.assertEqual(gr.neighbors('root'), ['P5'])
+        self.assertEqual(gr.node['Raw3']['node_type'], 'HDFNode')
+        self.assertEqual(dependency_order(mgr, draw=False, prune=True)[0],
+                         dependency_order(mgr, draw=False)[0])
+
     def test_graph_nodes_with_duplicate_key_in_lfl_and_derived(self):
         """ Test that LFL nodes are used in place of Derived where available.
         Tests a few of the colours
@@ -363,6 +418,179 @@ Node: Start Datetime 	Pre: [] 	Succ: [] 	Neighbors: [] 	Edges: []
 
         # try a bigger cyclic dependency on top of the above one
         
+    def test_dependencies3_deep_chain(self):
+        # Deeper than Python's recursion limit.
+        depth = 5000
+        graph = nx.DiGraph()
+        graph.add_edge('root', 0)
+        graph.add_edges_from((n, n + 1) for n in range(depth))
+        mgr = mock.Mock()
+        mgr.operational.side_effect = lambda name, available: \
+            name == depth or bool(available)
+        order = dependencies3(graph, 'root', mgr)
+        self.assertEqual(order, range(depth, -1, -1) + ['root'])
+
+    def test_dependencies3_inoperable_memoized(self):
+        # Both parents share an inoperable dependency which is only
+        # traversed once.
+        graph = nx.DiGraph()
+        graph.add_edges_from([('root', 'P1'), ('root', 'P2'), ('P1', 'Shared'),
+                              ('P2', 'Shared'), ('Shared', 'Missing'),
+                              ('P1', 'Raw1'), ('P2', 'Raw2')])
+        mgr = mock.Mock()
+        mgr.operational.side_effect = lambda name, available: \
+            name.startswith('Raw') or name in ('root', 'P1', 'P2') and \
+            bool(available)
+        order = dependencies3(graph, 'root', mgr)
+        self.assertEqual(set(order), set(['Raw1', 'P1', 'Raw2', 'P2', 'root']))
+        names = [call[0][0] for call in mgr.operational.call_args_list]
+        self.assertEqual(names.count('Shared'), 1)
+        self.assertEqual(names.count('Missing'), 1)
+
+    def test_dependencies3_circular_not_memoized(self):
+        # Heading True is inoperable beneath Heading (which it depends upon)
+        # but operational when reached from elsewhere.
+        graph = nx.DiGraph()
+        graph.add_edges_from([
+            ('root', 'Heading'), ('root', 'Heading True'),
+            ('Heading', 'Heading True'), ('Heading', 'Magnetic Variation'),
+            ('Heading True', 'Heading'), ('Heading True', 'Heading Raw')])
+        operational = {
+            'Heading': lambda available: 'Heading True' in available,
+            'Heading True': lambda available: 'Heading' in available or \
+                'Heading Raw' in available,
+            'Heading Raw': lambda available: True,
+            'Magnetic Variation': lambda available: False,
+            'root': lambda available: True,
+        }
+        mgr = mock.Mock()
+        mgr.operational.side_effect = lambda name, available: \
+            operational[name](available)
+        order = dependencies3(graph, 'root', mgr)
+        self.assertEqual(order, ['Heading Raw', 'Heading True', 'Heading',
+                                 'root'])
+
+
+    def test_requested_within_circular_dependency(self):
+        # Heading True is requested and depended upon by Track through
+        # Heading, which it depends upon. Beneath Heading, Heading True is
+        # inoperable as Heading is unavailable there.
+        class Operational(Node):
+            def __init__(self, dependencies, can_operate):
+                self.dependencies = dependencies
+                self.can_operate = can_operate
+                self.__base__ = DerivedParameterNode
+                self.__bases__ = [self.__base__]
+
+            def derive(self):
+                pass
+
+            def get_dependency_names(self):
+                return self.dependencies
+
+        derived_nodes = {
+            'Heading': Operational(
+                ['Heading Raw', 'Heading True', 'Magnetic Variation'],
+                lambda available: 'Heading Raw' in available),
+            'Heading True': Operational(
+                ['Heading', 'Magnetic Variation'],
+                lambda available: 'Heading' in available and
+                'Magnetic Variation' in available),
+            'Track': Operational(['Heading'],
+                                 lambda available: 'Heading' in available),
+        }
+        lfl_params = ['Heading Raw', 'Magnetic Variation']
+        requested = ['Track', 'Heading True']
+        for prune in (False, True):
+            mgr = NodeManager(datetime.now(), 10, lfl_params, requested, [],
+                              derived_nodes, {}, {})
+            graph = graph_nodes(mgr, prune=prune)
+            self.assertEqual(sorted(graph.successors('root')),
+                             ['Heading True', 'Track'])
+            order, _ = dependency_order(mgr, draw=False, prune=prune)
+            self.assertTrue('Heading True' in order)
+            self.assertTrue('Track' in order)
+
+
+class TestDependencyTreeStorage(unittest.TestCase):
+    def setUp(self):
+        derived_nodes = {
+            'P4': MockParam(dependencies=['Raw1', 'Raw2']),
+            'P5': MockParam(dependencies=['Raw1', 'P4']),
+            'P6': MockParam(dependencies=['Raw3']),
+        }
+        mgr = NodeManager(datetime.now(), 10, ['Raw1', 'Raw2'],
+                          ['P5', 'P6'], [], derived_nodes, {}, {})
+        self.order, self.tree = dependency_order(mgr, draw=False)
+        self.temp_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def assertGraphsEqual(self, graph, expected):
+        self.assertEqual(sorted(graph.nodes(data=True)),
+                         sorted(expected.nodes(data=True)))
+        self.assertEqual(sorted(graph.edges()), sorted(expected.edges()))
+
+    def test_encode_decode(self):
+        encoded = encode_dependency_tree(self.tree)
+        self.assertTrue(encoded.startswith('compact:'))
+        self.assertTrue(len(encoded) < len(dump_dependency_tree(self.tree)))
+        self.assertGraphsEqual(decode_dependency_tree(encoded), self.tree)
+        # Nodes without processing order labels.
+        graph = nx.DiGraph([('a', 'b'), ('a', 'c'), ('c', 'b')])
+        graph.add_node('a', label='first', color='red')
+        graph.add_node('c', color='red')
+        self.assertGraphsEqual(
+            decode_dependency_tree(encode_dependency_tree(graph)), graph)
+        self.assertRaises(ValueError, decode_dependency_tree, '{}')
+
+    def test_register_read(self):
+        path = os.path.join(self.temp_dir, 'trees')
+        tree_hash = register_dependency_tree(self.tree, path)
+        self.assertTrue(tree_hash.startswith('sha256:'))
+        self.assertEqual(register_dependency_tree(self.tree.copy(), path),
+                         tree_hash)
+        self.assertEqual(os.listdir(path), [tree_hash[len('sha256:'):]])
+        # Registered trees are readable by other users' processes.
+        umask = os.umask(0o022)
+        try:
+            other_path = os.path.join(self.temp_dir, 'shared')
+            register_dependency_tree(self.tree, other_path)
+        finally:
+            os.umask(umask)
+        self.assertEqual(stat.S_IMODE(os.stat(os.path.join(
+            other_path, tree_hash[len('sha256:'):])).st_mode), 0o644)
+        self.assertGraphsEqual(read_dependency_tree(tree_hash, path),
+                               self.tree)
+        self.assertRaises(KeyError, read_dependency_tree, tree_hash,
+                          os.path.join(self.temp_dir, 'missing'))
+        self.assertRaises(KeyError, read_dependency_tree, tree_hash)
+        # Another process registering a different tree keeps both trees.
+        other_tree = nx.DiGraph([('root', 'P6')])
+        other_hash = register_dependency_tree(other_tree, path)
+        self.assertEqual(sorted(os.listdir(path)),
+                         sorted(h[len('sha256:'):]
+                                for h in (tree_hash, other_hash)))
+        self.assertGraphsEqual(read_dependency_tree(tree_hash, path),
+                               self.tree)
+        self.assertGraphsEqual(read_dependency_tree(other_hash, path),
+                               other_tree)
+        # A tree removed from the registry is registered again.
+        os.remove(os.path.join(path, tree_hash[len('sha256:'):]))
+        self.assertEqual(register_dependency_tree(self.tree, path), tree_hash)
+        self.assertGraphsEqual(read_dependency_tree(tree_hash, path),
+                               self.tree)
+
+    def test_dump_read(self):
+        path = os.path.join(self.temp_dir, 'trees')
+        for tree_format in ('json', 'compact', 'hash'):
+            value = dump_dependency_tree(self.tree, tree_format=tree_format,
+                                         registry_path=path)
+            self.assertGraphsEqual(read_dependency_tree(value, path),
+                                   self.tree)
+        self.assertRaises(ValueError, dump_dependency_tree, self.tree,
+                          tree_format='xml')
 
 
 class TestGraphAdjacencies(unittest.TestCase):
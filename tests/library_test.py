@@ -2,9 +2,11 @@ import csv
 import mock
 import numpy as np
 import os
+import random
 import unittest
 
 from datetime import datetime
+from hashlib import sha256
 from math import sqrt
 from time import clock
 
@@ -799,6 +801,29 @@ class TestBearingsAndDistances(unittest.TestCase):
         self.assertEqual(dist[0].mask,True)
         self.assertEqual(dist[2].mask,True)
         
+    def test_matrix(self):
+        latitudes = np.ma.array([.1, .1, -.1, -.1, 1, 60.2789])
+        latitudes[0] = np.ma.masked
+        longitudes = np.ma.array([-.1, .1, .1, -.1, 0, 5.223])
+        references = [{'latitude': 0.0, 'longitude': 0.0},
+                      {'latitude': 60.280151, 'longitude': 5.222579},
+                      {'latitude': 50.856146, 'longitude': -1.183182}]
+        for chunk_size in (1, 4, 2**20):
+            brgs, dists = bearings_and_distances_matrix(
+                latitudes, longitudes,
+                [ref['latitude'] for ref in references],
+                [ref['longitude'] for ref in references],
+                chunk_size=chunk_size)
+            self.assertEqual(brgs.shape, (6, 3))
+            self.assertEqual(dists.shape, (6, 3))
+            for index, reference in enumerate(references):
+                brg, dist = bearings_and_distances(latitudes, longitudes,
+                                                   reference)
+                self.assertEqual(brgs[:, index].tolist(), brg.tolist())
+                self.assertEqual(dists[:, index].tolist(), dist.tolist())
+            self.assertTrue(brgs.mask[0].all())
+            self.assertFalse(dists.mask[1:].any())
+
     def test_bearings_and_back_again(self):
         # One should be able to go back and forth between bearings and
         # distances and latitudes and longitudes without any loss of
@@ -1021,6 +1046,30 @@ class TestCalculateTimebase(unittest.TestCase):
         start_dt = calculate_timebase(years, months, days, hours, mins, secs)
         self.assertEqual(start_dt, datetime(2012, 12, 30, 8, 20, 36))
 
+    def test_most_common_tie_uses_first(self):
+        # Two clock offsets occur twice each, the first to occur is used.
+        years = np.ma.array([2012] * 5)
+        months = np.ma.array([2] * 5)
+        days = np.ma.array([29] * 5)  # leap day
+        hours = np.ma.array([10] * 5)
+        mins = np.ma.array([10] * 5)
+        secs = np.ma.array([30, 31, 0, 1, 40], mask=[0, 0, 0, 0, 1])
+        start_dt = calculate_timebase(years, months, days, hours, mins, secs)
+        self.assertEqual(start_dt, datetime(2012, 2, 29, 10, 10, 30))
+        secs = np.ma.array([0, 31, 32, 3, 40])
+        start_dt = calculate_timebase(years, months, days, hours, mins, secs)
+        self.assertEqual(start_dt, datetime(2012, 2, 29, 10, 10, 0))
+
+    def test_invalid_days_ignored(self):
+        years = [2013] * 4
+        months = [2, 2, 3, 3]
+        days = [29, 30, 1, 1]  # 2013 is not a leap year
+        hours = [0] * 4
+        mins = [0] * 4
+        secs = [0, 1, 2, 3.5]
+        start_dt = calculate_timebase(years, months, days, hours, mins, secs)
+        self.assertEqual(start_dt, datetime(2013, 3, 1, 0, 0, 0))
+
     @unittest.skip("Implement if this is a requirement, currently "
                    "all parameters are aligned before this is being used.")
     def test_using_offset_for_seconds(self):
@@ -2064,6 +2113,15 @@ class TestHashArray(unittest.TestCase):
         self.assertEqual(hash_array(np.ma.arange(10, dtype=np.float_), [slice(0,10)], 5),
             'c29605eb4e50fbb653a19f1a28c4f0955721419f989f1ffd8cb2ed6f4914bbea')
 
+    def test_hash_array_checksum(self):
+        array = np.ma.arange(20, dtype=np.float_)
+        checksum = sha256()
+        hash_array(array[:10], [slice(0, 10)], 5, checksum=checksum)
+        self.assertEqual(
+            hash_array(array[10:], [slice(0, 3), slice(3, 10)], 5,
+                       checksum=checksum),
+            hash_array(array, [slice(0, 10), slice(13, 20)], 5))
+
 
 class TestHysteresis(unittest.TestCase):
     def test_hysteresis(self):
@@ -2895,6 +2953,76 @@ class TestMinValue(unittest.TestCase):
         self.assertEqual(v, '0')
 
 
+class TestMinValues(unittest.TestCase):
+    def test_min_values(self):
+        array = np.ma.array([5, 3, 4, 1, 7, 1, 8, 2, 9, 0])
+        array[7] = np.ma.masked
+        starts = [0, 2, 6, 7, 20, None]
+        stops = [4, 6, 8, 8, 30, 2]
+        self.assertEqual(
+            min_values(array, starts, stops),
+            [min_value(array, slice(start, stop))
+             for start, stop in zip(starts, stops)])
+        self.assertEqual(min_values(array, starts, stops)[:4],
+                         [Value(3, 1), Value(3, 1), Value(6, 8),
+                          Value(None, None)])
+
+    def test_min_values_edges(self):
+        array = np.ma.arange(5) + 5
+        self.assertEqual(min_values(array, [2, 0], [3, 2],
+                                    start_edges=[1.3, None],
+                                    stop_edges=[None, 1.5]),
+                         [Value(1.3, 6.3), Value(0, 5)])
+
+    def test_min_values_no_slices(self):
+        self.assertEqual(min_values(np.ma.arange(5), [], []), [])
+
+    def test_min_values_negative(self):
+        self.assertRaises(ValueError, min_values, np.ma.arange(5), [-2], [5])
+
+
+class TestMaxValues(unittest.TestCase):
+    def test_max_values(self):
+        array = np.ma.array([5, 3, 4, 1, 7, 1, 8, 2, 9, 9.0])
+        array[4] = np.ma.masked
+        array[6] = np.nan
+        starts = [0, 1.5, 2, 7, None, 9]
+        stops = [4, 5, 7.5, None, 2, 9]
+        self.assertEqual(
+            repr(max_values(array, starts, stops)),
+            repr([max_value(array, slice(start, stop))
+                  for start, stop in zip(starts, stops)]))
+        self.assertEqual(max_values(array, starts, stops)[-3:],
+                         [Value(8, 9), Value(0, 5), Value(None, None)])
+
+
+class TestMaxAbsValues(unittest.TestCase):
+    def test_max_abs_values(self):
+        array = np.ma.array([5, -3, 4, -9, 7, 1, -8, 2, 9, 0])
+        starts = [0, 4, 6]
+        stops = [4, 7, 10]
+        self.assertEqual(
+            max_abs_values(array, starts, stops),
+            [max_abs_value(array, slice(start, stop))
+             for start, stop in zip(starts, stops)])
+        self.assertEqual(max_abs_values(array, starts, stops),
+                         [Value(3, -9), Value(6, -8), Value(8, 9)])
+
+
+class TestAverageValues(unittest.TestCase):
+    def test_average_values(self):
+        array = np.ma.arange(30, dtype=float)
+        array[12:18] = np.ma.masked
+        starts = [0, 10, 12, 25]
+        stops = [10, 20, 18, None]
+        averages = average_values(array, starts, stops)
+        self.assertEqual(averages[0], Value(5, 4.5))
+        self.assertEqual(averages[1], Value(15, 14.5))
+        self.assertEqual(averages[2].index, 15)
+        self.assertTrue(averages[2].value is np.ma.masked)
+        self.assertEqual(averages[3], Value(27, 27.0))
+
+
 class TestMinimumUnmasked(unittest.TestCase):
     def test_min_unmasked_basic(self):
         a1= np.ma.array(data=[1.1,2.1,3.1,4.1],
@@ -3778,6 +3906,35 @@ class TestRepairMask(unittest.TestCase):
         expected = np.ma.array([0,0,6,7,0,0,0],mask=[0,0,0,0,0,0,0])
         ma_test.assert_array_equal(res, expected)
 
+    def test_repair_mask_state(self):
+        array = np.ma.array([1, 2, 3, 9, 9, 6, 9, 9, 9, 10, 11, 9, 9, 1],
+                            dtype=float,
+                            mask=[1, 0, 0, 1, 1, 0, 1, 1, 1, 0, 0, 1, 1, 0])
+        for kwargs in ({'repair_duration': None},
+                       {'repair_duration': 2},
+                       {'repair_duration': None, 'repair_above': 5}):
+            expected = repair_mask(array, copy=True, **kwargs)
+            for window in (1, 2, 3, 5, 14):
+                state = None
+                arrays = []
+                for start in range(0, len(array), window):
+                    repaired, state = repair_mask(
+                        array[start:start + window], copy=True, state=state,
+                        return_state=True, **kwargs)
+                    arrays.append(repaired)
+                # Samples held back at the end of the data are not repaired.
+                arrays.append(array[sum(map(len, arrays)):])
+                ma_test.assert_masked_array_approx_equal(
+                    np.ma.concatenate(arrays), expected)
+
+    def test_repair_mask_state_masked(self):
+        repaired, state = repair_mask(np.ma.array([1, 2], mask=True),
+                                      return_state=True)
+        self.assertEqual(repaired.mask.tolist(), [True, True])
+        self.assertEqual(state, None)
+        self.assertRaises(ValueError, repair_mask, np.ma.arange(2),
+                          extrapolate=True, return_state=True)
+
 
 class TestResample(unittest.TestCase):
     def test_resample_upsample(self):
@@ -4613,6 +4770,77 @@ class TestSlicesOr(unittest.TestCase):
         self.assertRaises(slices_or([None]))
 
 
+class TestSlicesProperties(unittest.TestCase):
+    '''
+    Property based tests of the slices_* functions using random slice lists.
+    '''
+    def setUp(self):
+        self.random = random.Random(0)
+
+    def _random_slices(self, count=6, sort=False):
+        slices = []
+        for _ in range(self.random.randint(1, count)):
+            start = self.random.randint(0, 100)
+            slices.append(slice(start, start + self.random.randint(0, 30)))
+        if sort:
+            # Sorted and disjoint.
+            slices = [slice(s.start, s.stop) for s in slices_or(slices)]
+        return slices
+
+    def _samples(self, slices):
+        return set(i for s in slices for i in range(s.start, s.stop))
+
+    def _assert_canonical(self, slices):
+        for first, second in zip(slices, slices[1:]):
+            self.assertTrue(first.stop < second.start)
+        for s in slices:
+            self.assertTrue(s.start < s.stop)
+            # As within the slices from np.ma.clump_unmasked.
+            self.assertEqual((type(s.start), type(s.stop)),
+                             (np.int64, np.int64))
+
+    def test_slices_or(self):
+        for _ in range(500):
+            first = self._random_slices()
+            second = self._random_slices()
+            begin_at = self.random.randint(0, 40)
+            end_at = self.random.randint(80, 140)
+            stop = max(s.stop for s in first + second)
+            if begin_at >= min(end_at, stop):
+                continue
+            result = slices_or(first, second, begin_at=begin_at,
+                               end_at=end_at)
+            self._assert_canonical(result)
+            expected = set(i for i in self._samples(first + second)
+                           if begin_at <= i < end_at)
+            self.assertEqual(self._samples(result), expected)
+
+    def test_slices_not(self):
+        for _ in range(500):
+            slices = self._random_slices()
+            end_at = self.random.randint(0, 160)
+            result = slices_not(slices, begin_at=0, end_at=end_at)
+            self._assert_canonical(result)
+            end = max([end_at] + [s.stop for s in slices])
+            self.assertEqual(self._samples(result),
+                             set(range(end)) - self._samples(slices))
+
+    def test_slices_and(self):
+        for _ in range(500):
+            first = self._random_slices()
+            second = self._random_slices(sort=True)
+            expected = [slice(max(a.start, b.start), min(a.stop, b.stop))
+                        for a in first for b in second
+                        if slices_overlap(a, b)]
+            self.assertEqual(slices_and(first, second), expected)
+            # Intersection of sorted disjoint slices is commutative.
+            first = self._random_slices(sort=True)
+            self.assertEqual(self._samples(slices_and(first, second)),
+                             self._samples(first) & self._samples(second))
+            self.assertEqual(slices_and(first, second),
+                             slices_and(second, first))
+
+
 class TestStepLocalCusp(unittest.TestCase):
     def test_step_cusp_basic(self):
         array = np.ma.array([3,7,9,9])
@@ -4884,6 +5112,22 @@ class TestStraightenHeadings(unittest.TestCase):
         ma_test.assert_masked_array_approx_equal(straighten_headings(data),
                                                  expected)
 
+    def test_straighten_headings_state(self):
+        heading = np.ma.array([350, 355, 5, 10, 20, 340, 330, 350, 10, 30,
+                               200, 190, 180, 170, 10, 0, 350], dtype=float)
+        heading[[3, 6, 7, 11, 12]] = np.ma.masked
+        expected = straighten_headings(heading)
+        for window in (1, 2, 3, 5, 17):
+            state = None
+            arrays = []
+            for start in range(0, len(heading), window):
+                array, state = straighten_headings(
+                    heading[start:start + window], state=state,
+                    return_state=True)
+                arrays.append(array)
+            self.assertEqual(np.ma.concatenate(arrays).tolist(),
+                             expected.tolist())
+
 
 class TestStraighten(unittest.TestCase):
     def test_offsets(self):
@@ -5212,6 +5456,52 @@ class TestValueAtIndex(unittest.TestCase):
             self.assertEquals(value_at_index(array, x, interpolate=False), expected)
 
 
+class TestValuesAtIndices(unittest.TestCase):
+    def test_values_at_indices_matches_value_at_index(self):
+        array = np.ma.array([3.0, 5.0, 2.0, 7.0, 1.0, 4.0, 8.0])
+        array[[2, 3, 6]] = np.ma.masked
+        indices = [-3, -0.5, 0, 0.25, 1, 1.5, 2, 2.5, 3.75, 4.5, 5, 5.5, 6,
+                   6.5, 10]
+        for interpolate in (True, False):
+            expected = []
+            for index in indices:
+                value = value_at_index(array, index, interpolate=interpolate)
+                expected.append(None if value is np.ma.masked else value)
+            result = values_at_indices(array, indices,
+                                       interpolate=interpolate)
+            self.assertEqual(result.tolist(), expected)
+
+    def test_values_at_indices_unmasked(self):
+        array = np.ma.arange(4)
+        result = values_at_indices(array, np.array([1.5, 3.7, -0.5, 2]))
+        self.assertEqual(result.tolist(), [1.5, 3.0, 0.0, 2.0])
+        self.assertEqual(values_at_indices(array, [np.nan]).tolist(), [None])
+
+    def test_values_at_indices_list(self):
+        indices = [-1, 0, 0.25, 1, 1.5, 2.5, 3, 4]
+        for array in (np.ma.array([3, 5, 2, 7], mask=[0, 0, 1, 0]),
+                      np.ma.array([True, False, False, True]),
+                      np.ma.array([3.5, 5.25, 2.0, 7.0], dtype=np.float32)):
+            for interpolate in (True, False):
+                result = values_at_indices_list(array, indices,
+                                                interpolate=interpolate)
+                expected = []
+                for index in indices:
+                    value = value_at_index(array, index,
+                                           interpolate=interpolate)
+                    expected.append(None if value is np.ma.masked else value)
+                self.assertEqual(result, expected)
+                for value, expected_value in zip(result, expected):
+                    if isinstance(expected_value, float):
+                        # Interpolated values are floats.
+                        self.assertTrue(isinstance(value, float))
+                    else:
+                        # Samples keep the array's dtype.
+                        self.assertEqual(type(value), type(expected_value))
+        self.assertEqual(values_at_indices_list(np.ma.arange(3), [np.nan]),
+                         [None])
+
+
 class TestVspeedLookup(unittest.TestCase):
     def test_vspdlkup_basic(self):
         self.assertEqual(vspeed_lookup('V2', 'B737-300', None, '15', 65000), 152)
@@ -5227,6 +5517,39 @@ class TestVspeedLookup(unittest.TestCase):
         self.assertEqual(vspeed_lookup('V2', 'B737-300', None, '25', 65000), None)
 
 
+class TestEngineAggregates(unittest.TestCase):
+    def test_engine_aggregates(self):
+        eng1 = P('Eng (1) N1', np.ma.array([10, 20, 30, 40, 50.0],
+                                           mask=[0, 1, 0, 1, 0]))
+        eng2 = np.ma.array([15, 25, 35, 45, 5.0], mask=[0, 0, 1, 1, 0])
+        aggregates = engine_aggregates(eng1, None, eng2)
+        self.assertEqual(aggregates.avg.tolist(),
+                         [12.5, 25, 30, None, 27.5])
+        self.assertEqual(aggregates.max.tolist(), [15, 25, 30, None, 50])
+        self.assertEqual(aggregates.min.tolist(), [10, 25, 30, None, 5])
+        self.assertEqual(aggregates.sum.tolist(), [25, 25, 30, None, 55])
+        self.assertRaises(ValueError, engine_aggregates, None, None)
+        self.assertRaises(ValueError, engine_aggregates, eng1,
+                          np.ma.arange(4))
+
+    def test_engine_aggregates_vstack_params(self):
+        rng = np.random.RandomState(0)
+        arrays = []
+        for dtype in (int, int, float, float):
+            array = np.ma.array(rng.uniform(-100, 100, 50).astype(dtype))
+            array[rng.uniform(size=50) < 0.4] = np.ma.masked
+            arrays.append(array)
+        engines = vstack_params(*arrays)
+        aggregates = engine_aggregates(*arrays)
+        for name, expected in (('avg', np.ma.average(engines, axis=0)),
+                               ('max', np.ma.max(engines, axis=0)),
+                               ('min', np.ma.min(engines, axis=0)),
+                               ('sum', np.ma.sum(engines, axis=0))):
+            result = getattr(aggregates, name)
+            self.assertEqual(result.dtype, expected.dtype)
+            self.assertEqual(result.tolist(), expected.tolist())
+
+
 class TestVstackParams(unittest.TestCase):
     def test_vstack_params(self):
         a = P('a', array=np.ma.array(range(0, 10)))
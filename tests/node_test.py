@@ -1,32 +1,40 @@
+import copy
 import mock
 import numpy as np
 import os
 import unittest
 
 from datetime import datetime
-from inspect import ArgSpec
+from inspect import ArgSpec, getargspec
 from random import shuffle
 
-from analysis_engine.library import min_value, max_value
+from analysis_engine import settings
+from analysis_engine.library import (max_abs_value, max_value, min_value,
+                                     value_at_index)
 from analysis_engine.node import (
     ApproachItem,
     ApproachNode,
     Attribute,
+    can_operate_attribute_names,
     DerivedParameterNode,
-    KeyPointValueNode, KeyPointValue,
+    EngineAggregateNode,
+    KeyPointValueNode, KeyPointValue, KPV,
     KeyTimeInstanceNode, KeyTimeInstance, KTI,
     FlightAttributeNode,
     FormattedNameNode,
+    IndexedList,
     Node, NodeManager,
     Parameter, P,
     MultistateDerivedParameterNode, M,
     load,
+    multistate_string_to_integer,
     powerset,
     SectionNode,
     Section,
     _calculate_offset,
 )
 
+from flightdatautilities import units as ut
 from hdfaccess.file import hdf_file
 from hdfaccess.parameter import MappedArray
 
@@ -68,6 +76,31 @@ class TestCalculateOffset(unittest.TestCase):
             offset = _calculate_offset(test[1][0], test[0][1])
             self.assertAlmostEqual(offset, test[1][1], places=3)
 
+
+class TestRecordTypes(unittest.TestCase):
+    def test_slots(self):
+        for record in (KeyPointValue(1, 2, 'a'), KeyTimeInstance(1, 'a'),
+                       ApproachItem('LANDING', slice(1, 2))):
+            self.assertFalse(hasattr(record, '__dict__'))
+            self.assertRaises(AttributeError, setattr, record, 'unknown', 1)
+            self.assertEqual(record.__class__(**record.todict()), record)
+
+    def test_copy(self):
+        kpv = KeyPointValue(1, 2, 'a')
+        kpv_copy = copy.copy(kpv)
+        self.assertEqual(kpv_copy, kpv)
+        self.assertFalse(kpv_copy is kpv)
+        kpv_copy.index = 3
+        self.assertEqual(kpv.index, 1)
+
+    def test_ordering(self):
+        ktis = [KeyTimeInstance(3, 'a'), KeyTimeInstance(1, 'b'),
+                KeyTimeInstance(2, 'c')]
+        self.assertEqual([k.index for k in sorted(ktis)], [1, 2, 3])
+        self.assertTrue(ktis[1] < ktis[0])
+        self.assertTrue(ktis[0] >= ktis[2])
+
+
 class TestNode(unittest.TestCase):
     
     def test_node_attributes(self):
@@ -451,6 +484,73 @@ class TestNodeManager(unittest.TestCase):
             defaults=(DerivedParameterNode('o'),))
         self.assertRaises(TypeError, mgr.operational, 'y', Attribute('o', 2))
 
+    def test_operational_memoized(self):
+        class Operable(DerivedParameterNode):
+            calls = 0
+
+            @classmethod
+            def can_operate(cls, available, family=Attribute('Family')):
+                cls.calls += 1
+                return 'a' in available and family.value == 'B737'
+
+            def derive(self, a=P('a'), b=P('b')):
+                pass
+
+        mgr = NodeManager(None, 10, ['a', 'b'], [], [],
+                          {'Operable': Operable}, {'Family': 'B737'}, {})
+        self.assertTrue(mgr.operational('Operable', ['a', 'b']))
+        self.assertTrue(mgr.operational('Operable', ['b', 'a']))
+        self.assertFalse(mgr.operational('Operable', ['b']))
+        self.assertEqual(Operable.calls, 2)
+        # Attributes are built once.
+        self.assertTrue(mgr.get_attribute('Family') is
+                        mgr.get_attribute('Family'))
+
+    def test_can_operate_attribute_names(self):
+        class Operable(DerivedParameterNode):
+            @classmethod
+            def can_operate(cls, available, family=Attribute('Family')):
+                return True
+
+        class OperableSub(Operable):
+            @classmethod
+            def can_operate(cls, available, series=Attribute('Series'),
+                            family=Attribute('Family')):
+                return True
+
+        with mock.patch('analysis_engine.node.inspect.getargspec',
+                        wraps=getargspec) as mock_getargspec:
+            self.assertEqual(can_operate_attribute_names(Operable),
+                             ('Family',))
+            self.assertEqual(can_operate_attribute_names(Operable),
+                             ('Family',))
+            self.assertEqual(mock_getargspec.call_count, 1)
+            # Subclasses are inspected separately.
+            self.assertEqual(can_operate_attribute_names(OperableSub),
+                             ('Series', 'Family'))
+            self.assertEqual(mock_getargspec.call_count, 2)
+            # A patched can_operate is inspected again.
+            with mock.patch.object(Operable, 'can_operate',
+                                   classmethod(lambda cls, available: True)):
+                self.assertEqual(can_operate_attribute_names(Operable), ())
+            self.assertEqual(can_operate_attribute_names(Operable),
+                             ('Family',))
+            self.assertEqual(mock_getargspec.call_count, 4)
+
+    def test_hdf_keys_indexed(self):
+        mgr = NodeManager(None, 10, ['a', 'b'], [], [], {}, {}, {})
+        self.assertTrue(isinstance(mgr.hdf_keys, IndexedList))
+        self.assertEqual(mgr.hdf_keys, ['a', 'b'])
+        mgr.hdf_keys.append('c')
+        self.assertTrue('c' in mgr.hdf_keys)
+        self.assertTrue(mgr.operational('c', []))
+        mgr.hdf_keys.remove('a')
+        self.assertFalse('a' in mgr.hdf_keys)
+        mgr.hdf_keys[0] = 'd'
+        self.assertEqual(mgr.hdf_keys, ['d', 'c'])
+        self.assertTrue('d' in mgr.hdf_keys)
+        self.assertFalse('b' in mgr.hdf_keys)
+
     def test_get_attribute(self):
         aci = {'a': 'a_value', 'b': None}
         afr = {'x': 'x_value', 'y': None}
@@ -830,6 +930,46 @@ class TestSectionNode(unittest.TestCase):
         self.assertEqual(node.get_longest(), node[1])
         self.assertEqual(node.get_longest(within_slice=slice(0, 8)), node[0])
 
+    def test_interval_index(self):
+        node = SectionNode(items=[Section('a', slice(10, 20), 10, 20),
+                                  Section('b', slice(None, 5), None, 5),
+                                  Section('a', slice(30, None), 30, None),
+                                  Section('b', slice(10, 15), 10, 15),
+                                  Section('a', slice(2, 12), 2, 12),
+                                  Section('b', slice(None, None), None, None)])
+        queries = [('get', (), {'name': 'a'}),
+                   ('get', (), {'containing_index': 12}),
+                   ('get', (), {'containing_index': 20, 'name': 'b'}),
+                   ('get', (), {'within_slice': slice(5, 25),
+                                'within_use': 'start'}),
+                   ('get', (), {'within_slice': slice(None, 16),
+                                'within_use': 'stop'}),
+                   ('get_first', (), {'first_by': 'stop', 'name': 'a'}),
+                   ('get_ordered_by_index', (), {'containing_index': 11})]
+        for index in (-1, 2, 5, 10, 12.5, 20, 30, 50):
+            for use in ('start', 'stop'):
+                queries.extend([('get_next', (index,), {'use': use}),
+                                ('get_previous', (index,), {'use': use}),
+                                ('get_next', (index,),
+                                 {'use': use, 'name': 'b'}),
+                                ('get_previous', (index,),
+                                 {'use': use, 'name': 'a'})])
+            queries.append(('get_surrounding', (index,), {}))
+        expected = []
+        with mock.patch.object(SectionNode, '_get_interval_index',
+                               return_value=None):
+            for method, args, kwargs in queries:
+                expected.append(getattr(node, method)(*args, **kwargs))
+        for (method, args, kwargs), result in zip(queries, expected):
+            self.assertEqual(getattr(node, method)(*args, **kwargs), result)
+        self.assertTrue('_interval_index' in node.__dict__)
+        self.assertFalse('_interval_index' in node.__getstate__())
+        # Modifying the node clears the interval index.
+        node.append(Section('c', slice(40, 45), 40, 45))
+        self.assertFalse('_interval_index' in node.__dict__)
+        self.assertEqual(node.get_next(35), node[-1])
+        self.assertEqual(node.get_surrounding(42), [node[2], node[5], node[6]])
+
 
 class TestFormattedNameNode(unittest.TestCase):
     def setUp(self):
@@ -878,6 +1018,71 @@ class TestFormattedNameNode(unittest.TestCase):
                                  'Speed in descent at 400 ft',
                                  'Speed in descent at 700 ft',])
 
+    def test_names_cached(self):
+        class SpeedAtAltitude(FormattedNameNode):
+            NAME_FORMAT = 'Speed at %(altitude)d ft'
+            NAME_VALUES = {'altitude': [100, 200]}
+            def derive(self, *args, **kwargs):
+                pass
+
+        class SpeedAtAltitudeSub(SpeedAtAltitude):
+            NAME_FORMAT = 'Sub Speed at %(altitude)d ft'
+
+        names = SpeedAtAltitude.names()
+        self.assertEqual(names, ['Speed at 100 ft', 'Speed at 200 ft'])
+        # The returned list can be modified without affecting the cache.
+        names.append('Speed at 300 ft')
+        self.assertEqual(SpeedAtAltitude.names(),
+                         ['Speed at 100 ft', 'Speed at 200 ft'])
+        self.assertTrue('_name_cache' in SpeedAtAltitude.__dict__)
+        # Subclasses build their own cache.
+        self.assertEqual(SpeedAtAltitudeSub.names(),
+                         ['Sub Speed at 100 ft', 'Sub Speed at 200 ft'])
+        self.assertEqual(SpeedAtAltitude.names(),
+                         ['Speed at 100 ft', 'Speed at 200 ft'])
+        # Reassigning NAME_VALUES invalidates the cache.
+        SpeedAtAltitude.NAME_VALUES = {'altitude': [300]}
+        self.assertEqual(SpeedAtAltitude.names(), ['Speed at 300 ft'])
+        node = SpeedAtAltitude()
+        self.assertEqual(node.format_name(altitude=300), 'Speed at 300 ft')
+        self.assertRaises(ValueError, node.format_name, altitude=100)
+
+    def test_format_name(self):
+        class SpeedInPhaseAtAltitude(FormattedNameNode):
+            NAME_FORMAT = 'Speed in %(phase)s at %(altitude)d ft'
+            NAME_VALUES = {'altitude': [100, 400],
+                           'phase': ['ascent', 'descent']}
+            def derive(self, *args, **kwargs):
+                pass
+        node = SpeedInPhaseAtAltitude()
+        self.assertEqual(node.format_name(phase='ascent', altitude=400),
+                         'Speed in ascent at 400 ft')
+        self.assertEqual(
+            node.format_name({'phase': 'descent'}, altitude=100, unused=1),
+            'Speed in descent at 100 ft')
+        # Values which are not within NAME_VALUES are formatted.
+        self.assertEqual(node.format_name(phase='ascent', altitude=400.2),
+                         'Speed in ascent at 400 ft')
+        self.assertRaises(ValueError, node.format_name, phase='ascent',
+                          altitude=200)
+        self.assertRaises(KeyError, node.format_name, phase='ascent')
+        self.assertRaises(TypeError, node.format_name, phase='ascent',
+                          altitude='400')
+
+    def test_format_name_value_types(self):
+        class SpeedAtAltitude(FormattedNameNode):
+            NAME_FORMAT = 'Speed at %(altitude)s ft'
+            NAME_VALUES = {'altitude': [1, 100]}
+            def derive(self, *args, **kwargs):
+                pass
+        node = SpeedAtAltitude()
+        self.assertEqual(node.format_name(altitude=1), 'Speed at 1 ft')
+        # Equal values of other types are formatted rather than looked up.
+        self.assertRaises(ValueError, node.format_name, altitude=1.0)
+        self.assertRaises(ValueError, node.format_name, altitude=True)
+        self.assertEqual(node.format_name(altitude=np.int64(100)),
+                         'Speed at 100 ft')
+
     def test__validate_name(self):
         """ Ensures that created names have a validated option
         """
@@ -1185,6 +1390,39 @@ class TestKeyPointValueNode(unittest.TestCase):
         self.assertEqual(list(knode),
                          [KeyPointValue(index=8, value=7, name='Kpv')])
 
+    def test_create_kpvs_at_ktis_interpolated(self):
+        array = np.ma.array([5, 6, 7, 8, 9, 10, 11, 12.0])
+        array[[0, 3, 4]] = np.ma.masked
+        indices = [-1, 0, 0.5, 1.25, 2.5, 3, 3.5, 4.5, 7, 7.5, 9]
+        ktis = KTI('KTI', items=[KeyTimeInstance(i, 'a') for i in indices])
+        for interpolate in (True, False):
+            knode = self.knode.__class__(frequency=2, offset=0.4)
+            knode.create_kpvs_at_ktis(array, ktis, interpolate=interpolate)
+            expected = [
+                KeyPointValue(index=index, value=value, name='Kpv')
+                for index, value in
+                ((i, value_at_index(array, i, interpolate=interpolate))
+                 for i in indices)
+                if value is not None and value is not np.ma.masked]
+            self.assertEqual(list(knode), expected)
+        self.assertEqual([kpv.value for kpv in knode],
+                         [6, 6, 7, 10, 12, 12, 12])
+
+    def test_create_kpvs_at_ktis_value_types(self):
+        # Values are passed to create_kpv with the types value_at_index
+        # returns.
+        array = np.ma.array([True, False, False, True])
+        indices = [-1, 0, 1.5, 2.5, 3, 5]
+        ktis = KTI('KTI', items=[KeyTimeInstance(i, 'a') for i in indices])
+        with mock.patch.object(self.knode, 'create_kpv') as create_kpv:
+            self.knode.create_kpvs_at_ktis(array, ktis)
+        values = [c[0][1] for c in create_kpv.call_args_list]
+        expected = [value_at_index(array, i) for i in indices]
+        self.assertEqual(values, expected)
+        self.assertEqual([type(v) for v in values],
+                         [np.bool_, np.bool_, float, float, np.bool_,
+                          np.bool_])
+
     def test_create_kpvs_within_slices(self):
         knode = self.knode
         function = mock.Mock()
@@ -1224,6 +1462,29 @@ class TestKeyPointValueNode(unittest.TestCase):
         self.assertEqual(list(knode),
                          [KeyPointValue(index=3.25, value=15, name='Kpv')])
 
+    def test_create_kpvs_within_slices_segmented(self):
+        array = np.ma.array([3, -9, 4, 9, 7, 1, -8, 2, 9, 0, 5, -9])
+        array[4] = np.ma.masked
+        slices = [slice(6, 9), slice(2, 5), slice(10, 12), slice(3, 3),
+                  slice(1, 1.5), Section('Section', slice(4, 6), 3.5, 6.25)]
+        for function in (max_value, min_value, max_abs_value):
+            knode = self.knode.__class__(frequency=2, offset=0.4)
+            knode.create_kpvs_within_slices(array, slices, function)
+            expected = []
+            for slice_ in slices:
+                if isinstance(slice_, Section):
+                    index, value = function(array, slice_.slice,
+                                            slice_.start_edge,
+                                            slice_.stop_edge)
+                else:
+                    index, value = function(
+                        array, slice_, slice_.start,
+                        slice_.stop if slice_.stop % 1 else None)
+                if index is not None:
+                    expected.append(KeyPointValue(index=index, value=value,
+                                                  name='Kpv'))
+            self.assertEqual(list(knode), expected)
+
     def test_create_kpv_from_slices(self):
         knode = self.knode
         slices = [slice(20, 30), slice(5, 10)]
@@ -1246,6 +1507,24 @@ class TestKeyPointValueNode(unittest.TestCase):
                         [slice(1, 2), slice(3, 4), slice(5, 6)], max_value)
         self.assertEqual(list(knode)[-1],
                          KeyPointValue(index=5, value=20, name='Kpv'))
+
+    def test_create_kpv_from_slices_joined(self):
+        # Values are found within each slice rather than the joined slices,
+        # so check against finding them within the joined slices.
+        array = np.ma.array([3, -9, 4, 9, 7, 1, -8, 2, 9, 0, 5, -9])
+        array[4] = np.ma.masked
+        slices = [slice(6, 9), slice(2, 5), slice(10, None), slice(3, 3),
+                  slice(None, 2)]
+        joined_array = np.ma.concatenate([array[s] for s in sorted(slices)])
+        for function, expected in ((max_value, (3, 9)),
+                                   (min_value, (1, -9)),
+                                   (max_abs_value, (1, -9))):
+            self.assertEqual(function(joined_array)[1], expected[1])
+            knode = self.knode.__class__(frequency=2, offset=0.4)
+            knode.create_kpv_from_slices(array, slices, function)
+            self.assertEqual(list(knode), [
+                KeyPointValue(index=expected[0], value=expected[1],
+                              name='Kpv')])
         
     def test_create_kpvs_from_slice_durations_basic(self):
         # Basic
@@ -1417,6 +1696,68 @@ class TestKeyPointValueNode(unittest.TestCase):
                          [KeyPointValue(index=1.95, value=12.5, name='Speed at 1000ft'),
                           KeyPointValue(index=5.45, value=12.5, name='Speed at 1000ft')])
 
+    def test_columnar(self):
+        items = [KeyPointValue(12, 30, 'Slowest'),
+                 KeyPointValue(342, 60, 'Fast'),
+                 KeyPointValue(2, 14, 'Slowest'),
+                 KeyPointValue(50, 30, 'Fast'),
+                 KeyPointValue(2, 369, 'Warp 10')]
+        kpv_node = self.speed_class(items=items, columnar=True)
+        list_node = self.speed_class(items=items)
+        self.assertEqual(list_node._get_columns(), None)
+        kwargs_list = [{},
+                       {'name': 'Fast'},
+                       {'name': 'Unknown', 'within_slice': slice(0, 10)},
+                       {'within_slice': slice(None, 50)},
+                       {'within_slice': slice(12, None), 'name': 'Slowest'},
+                       {'within_slices': [slice(0, 3), slice(50, 51)]}]
+        for kwargs in kwargs_list:
+            for method in ('get', 'get_ordered_by_index', 'get_first',
+                           'get_last', 'get_max', 'get_min',
+                           'get_ordered_by_value'):
+                self.assertEqual(getattr(kpv_node, method)(**kwargs),
+                                 getattr(list_node, method)(**kwargs))
+        self.assertRaises(ValueError, kpv_node.get, name='Unknown')
+        param = Parameter('p', frequency=0.5, offset=1.5)
+        self.assertEqual(kpv_node.get_aligned(param),
+                         list_node.get_aligned(param))
+        self.assertEqual(kpv_node.get_aligned(param).get_first().index, 0.25)
+        self.assertTrue(kpv_node.get(name='Fast').columnar)
+        self.assertTrue(kpv_node.get_aligned(param).columnar)
+        # Modifying the node clears the columns.
+        kpv_node.append(KeyPointValue(1, 5, 'Warp 10'))
+        self.assertFalse('_columns' in kpv_node.__dict__)
+        self.assertEqual(kpv_node.get_first(), KeyPointValue(1, 5, 'Warp 10'))
+        self.assertEqual(kpv_node.get_min(), KeyPointValue(1, 5, 'Warp 10'))
+        kpv_node[-1] = KeyPointValue(400, 500, 'Fast')
+        self.assertEqual(kpv_node.get_last(name='Fast'),
+                         KeyPointValue(400, 500, 'Fast'))
+        # Cached columns are not pickled.
+        self.assertTrue('_columns' in kpv_node.__dict__)
+        self.assertFalse('_columns' in kpv_node.__getstate__())
+
+    def test_modified_in_place(self):
+        kpv_node = KPV(items=[KeyPointValue(1, 10, 'Speed'),
+                              KeyPointValue(2, 20, 'Speed')])
+        self.assertEqual(kpv_node.get_max().value, 20)
+        kpv_node[0].value = 99
+        self.assertEqual(kpv_node.get_max().value, 99)
+        kpv_node[1].index = 0.5
+        self.assertEqual(kpv_node.get_first().index, 0.5)
+        param = Parameter('p', frequency=2)
+        self.assertEqual(kpv_node.get_aligned(param),
+                         [KeyPointValue(2, 99, 'Speed'),
+                          KeyPointValue(1, 20, 'Speed')])
+        # get_aligned takes the index from the items of columnar nodes.
+        columnar_node = KPV(items=[KeyPointValue(1, 10, 'Speed'),
+                                   KeyPointValue(2, 20, 'Speed')],
+                            columnar=True)
+        self.assertEqual(columnar_node.get_max().value, 20)
+        columnar_node[1].index = 0.5
+        self.assertEqual(columnar_node.get_aligned(param),
+                         [KeyPointValue(2, 10, 'Speed'),
+                          KeyPointValue(1, 20, 'Speed')])
+
     def test_get_min(self):
         # Test empty Node first.
         empty_kpv_node = KeyPointValueNode()
@@ -1799,6 +2140,24 @@ class TestDerivedParameterNode(unittest.TestCase):
         self.assertEqual(spd.at(0), 0) # Extrapolation at bottom end
         self.assertEqual(spd.at(11), 19) # Extrapolation at top end
 
+    def test_parameter_at_many(self):
+        array = np.ma.arange(20.0)
+        array[[4, 10, 11]] = np.ma.masked
+        spd = Parameter('Airspeed', array, 2, 0.75)
+        secs = [0.75, 1.75, 2.5, 9.75, 0, 11, 2.75, 5.75, 6.0, 6.25, None]
+        result = spd.at_many(secs)
+        self.assertEqual(result, [spd.at(s) for s in secs])
+        # Index 3.5 lies between an unmasked and a masked sample.
+        self.assertEqual(result[2], 3)
+        self.assertEqual(result[5:], [19, None, None, None, None, None])
+        self.assertEqual(spd.at_many([]), [])
+        # Samples keep the array's dtype as at returns them.
+        gear = Parameter('Gear Down', np.ma.array([False, True, True]))
+        result = gear.at_many([0, 1, 0.5])
+        self.assertEqual(result, [gear.at(s) for s in (0, 1, 0.5)])
+        self.assertEqual([type(v) for v in result],
+                         [np.bool_, np.bool_, float])
+
     @mock.patch('analysis_engine.node.slices_above')
     def test_slices_above(self, slices_above):
         '''
@@ -1903,6 +2262,87 @@ class TestDerivedParameterNode(unittest.TestCase):
 
 
 
+class TestEngineAggregateNode(unittest.TestCase):
+    def setUp(self):
+        class EngN1Max(EngineAggregateNode):
+            align_frequency = 4
+            align_offset = 0
+
+            def derive(self, eng1=P('Eng (1) N1'), eng2=P('Eng (2) N1')):
+                self.array = self.engine_aggregates(eng1, eng2).max
+
+        class EngN1Min(EngN1Max):
+            def derive(self, eng1=P('Eng (1) N1'), eng2=P('Eng (2) N1')):
+                self.array = self.engine_aggregates(eng1, eng2).min
+
+        self.max_class = EngN1Max
+        self.min_class = EngN1Min
+        self.eng1 = P('Eng (1) N1', np.ma.arange(10.0), frequency=1,
+                      offset=0.25)
+        self.eng2 = P('Eng (2) N1', np.ma.arange(10.0)[::-1], frequency=1,
+                      offset=0.75)
+
+    def test_derive(self):
+        node = self.max_class()
+        node.derive(self.eng1, self.eng2)
+        self.assertEqual(node.array.tolist(), [9, 8, 7, 6, 5, 5, 6, 7, 8, 9])
+        node.derive(self.eng1, None)
+        self.assertEqual(node.array.tolist(), range(10))
+
+    def test_get_derived_engine_cache(self):
+        engine_cache = {}
+        eng_max = self.max_class()
+        eng_max.engine_cache = engine_cache
+        eng_max.get_derived([self.eng1, self.eng2])
+        self.assertEqual(len(engine_cache), 1)
+        self.assertEqual((eng_max.frequency, eng_max.offset), (4, 0))
+
+        eng_min = self.min_class()
+        eng_min.engine_cache = engine_cache
+        with mock.patch.object(P, 'get_aligned') as get_aligned:
+            eng_min.get_derived([self.eng1, self.eng2])
+        self.assertFalse(get_aligned.called)
+        self.assertEqual((eng_min.frequency, eng_min.offset), (4, 0))
+
+        expected = self.min_class().get_derived([self.eng1, self.eng2])
+        self.assertEqual(eng_min.array.tolist(), expected.array.tolist())
+        self.assertEqual(len(eng_min.array), 40)
+        # Different dependencies are not shared.
+        eng_max.get_derived([self.eng1, None])
+        self.assertEqual(len(engine_cache), 2)
+        self.assertEqual(eng_max._aggregates, None)
+
+    def test_get_derived_engine_cache_checks_derive(self):
+        class EngN1Avg(self.max_class):
+            def derive(self, eng1=P('Eng (1) N1'), eng2=P('Eng (2) N1')):
+                self.array = self.engine_aggregates(eng1, eng2).avg
+                return True
+
+        engine_cache = {}
+        eng_max = self.max_class()
+        eng_max.engine_cache = engine_cache
+        eng_max.get_derived([self.eng1, self.eng2])
+        # Cached aggregates are passed to derive by the base get_derived,
+        # which checks what derive returns.
+        eng_avg = EngN1Avg()
+        eng_avg.engine_cache = engine_cache
+        self.assertRaises(UserWarning, eng_avg.get_derived,
+                          [self.eng1, self.eng2])
+        self.assertEqual(eng_avg._shared_aggregates, None)
+
+    def test_release_engine_aggregates(self):
+        engine_cache = {}
+        eng_max = self.max_class()
+        eng_max.engine_cache = engine_cache
+        eng_max.get_derived([self.eng1, self.eng2])
+        eng_max.get_derived([self.eng1, None])
+        eng_max.release_engine_aggregates([self.eng1, self.eng2])
+        self.assertEqual(engine_cache.keys(),
+                         [eng_max._engine_cache_key([self.eng1, None])])
+        self.assertEqual(self.max_class.engine_cache_group(),
+                         self.min_class.engine_cache_group())
+
+
 class TestMultistateDerivedParameterNode(unittest.TestCase):
     def setUp(self):
         self.hdf_path = os.path.join(test_data_path, 'test_node.hdf')
@@ -1981,6 +2421,28 @@ class TestMultistateDerivedParameterNode(unittest.TestCase):
         ## create values where no mapping exists and expect a keyerror
         #self.assertRaises(ValueError, multi_p.__setattr__,
                           #'array', np.ma.array(['zonk', 'two']*2, mask=[1,0,0,0]))
+
+    def test_multistate_string_to_integer(self):
+        mapping = {0: 'zero', 1: 'one', 2: 'two', 5: '7'}
+        array = np.ma.array(['two', 'one', '7', '3', 'zonk', 'one'],
+                            mask=[0, 0, 0, 0, 1, 0])
+        int_array = multistate_string_to_integer(array, mapping)
+        self.assertEqual(int_array.dtype, int)
+        # Unmapped integer strings are converted and masked values filled.
+        self.assertEqual(int_array.data.tolist(), [2, 1, 5, 3, 9999, 1])
+        self.assertEqual(int_array.mask.tolist(),
+                         [False, False, False, False, True, False])
+        array.mask[4] = False
+        self.assertRaisesRegexp(ValueError, 'found for zonk',
+                                multistate_string_to_integer, array, mapping)
+
+    def test_setattr_list(self):
+        mapping = {0: 'zero', 1: 'one', 2: 'two'}
+        multi_p = MultistateDerivedParameterNode('multi', values_mapping=mapping)
+        multi_p.array = ['two', 'zero', 'two', 'one']
+        self.assertEqual(multi_p.array.raw.tolist(), [2, 0, 2, 1])
+        self.assertEqual(multi_p.array.values_mapping, mapping)
+        self.assertRaises(KeyError, setattr, multi_p, 'array', ['zonk'])
     
     @mock.patch('analysis_engine.node.Node.get_derived')
     def test_getattribute(self, get_derived):
@@ -2033,6 +2495,100 @@ class TestMultistateDerivedParameterNode(unittest.TestCase):
         self.assertEqual(list(res.array), expected)
         os.remove(dest)
         
+class TestStorageDtype(unittest.TestCase):
+    def test_compact_units(self):
+        param = P('Eng (1) N1', np.ma.array([10.1, 20.2, 30.3], mask=[0, 1, 0]))
+        param.units = ut.PERCENT
+        self.assertEqual(param.get_storage_dtype(), np.float32)
+        param.compact()
+        self.assertEqual(param.array.dtype, np.float32)
+        self.assertEqual(param.array.mask.tolist(), [False, True, False])
+        param.widen()
+        self.assertEqual(param.array.dtype, np.float64)
+        self.assertAlmostEqual(param.array[2], 30.3, places=5)
+
+    def test_compact_unchanged(self):
+        latitude = P('Latitude', np.ma.array([51.4712345678]))
+        latitude.units = ut.DEGREE
+        self.assertEqual(latitude.get_storage_dtype(), None)
+        latitude.compact()
+        self.assertEqual(latitude.array.dtype, np.float64)
+        # Integer arrays are not converted to floating point.
+        param = P('Eng (1) N1', np.ma.arange(3))
+        param.units = ut.PERCENT
+        dtype = param.array.dtype
+        param.compact()
+        self.assertEqual(param.array.dtype, dtype)
+
+    def test_storage_dtypes_setting(self):
+        # The setting is read when called, not when node is imported.
+        latitude = P('Latitude', np.ma.array([51.4712345678]))
+        latitude.units = ut.DEGREE
+        with mock.patch.dict(settings.DERIVED_PARAMETER_STORAGE_DTYPES,
+                             {ut.DEGREE: 'float32'}):
+            self.assertEqual(latitude.get_storage_dtype(), np.float32)
+        with mock.patch.object(settings, 'DERIVED_PARAMETER_STORAGE_DTYPES',
+                               {}):
+            param = P('Eng (1) N1', np.ma.array([10.1]))
+            param.units = ut.PERCENT
+            self.assertEqual(param.get_storage_dtype(), None)
+        self.assertEqual(latitude.get_storage_dtype(), None)
+
+    def test_compact_storage_dtype(self):
+        class FlapAngle(DerivedParameterNode):
+            units = ut.DEGREE
+            storage_dtype = 'float32'
+        flap = FlapAngle('Flap Angle', np.ma.array([0, 5.0, 15]))
+        flap.compact()
+        self.assertEqual(flap.array.dtype, np.float32)
+
+    def test_compact_multistate(self):
+        values_mapping = {0: 'Up', 1: 'Down'}
+        gear = M('Gear Down', MappedArray([0, 1, 1, 0], mask=[0, 0, 1, 0],
+                                          values_mapping=values_mapping),
+                 values_mapping=values_mapping)
+        gear.compact()
+        self.assertEqual(gear.array.dtype, np.int8)
+        self.assertEqual(gear.array.raw.tolist(), [0, 1, None, 0])
+        self.assertEqual(gear.array[1], 'Down')
+        gear.widen()
+        self.assertEqual(gear.array.dtype, np.dtype(int))
+        self.assertEqual(gear.array.raw.tolist(), [0, 1, None, 0])
+        self.assertEqual(gear.array[1], 'Down')
+        raw = gear.array.raw.copy()
+        raw[1] = 200
+        self.assertEqual(raw.tolist(), [0, 200, None, 0])
+        # Masked samples hold the fill value.
+        gear.array = np.ma.array([0, 1, 999999], mask=[0, 0, 1])
+        self.assertEqual(gear.get_storage_dtype(), np.int8)
+        gear.array = np.ma.array([0, 1, 300])
+        self.assertEqual(gear.get_storage_dtype(), np.int16)
+        gear.array = np.ma.array([0, 1, 70000])
+        self.assertEqual(gear.get_storage_dtype(), None)
+
+    def test_kpv_values(self):
+        # KPVs are unchanged within float32 precision.
+        class AirspeedMax(KeyPointValueNode):
+            def derive(self, airspeed=P('Airspeed')):
+                pass
+        array = np.ma.array(np.random.RandomState(0).uniform(0, 400, 1000))
+        slices = [slice(0, 100), slice(250, 600), slice(700, 1000)]
+        airspeed = P('Airspeed', array.copy())
+        airspeed.units = ut.KT
+        airspeed.compact()
+        airspeed.widen()
+        for function in (max_value, min_value):
+            expected = AirspeedMax()
+            expected.create_kpvs_within_slices(array, slices, function)
+            kpvs = AirspeedMax()
+            kpvs.create_kpvs_within_slices(airspeed.array, slices, function)
+            self.assertEqual([k.index for k in kpvs],
+                             [k.index for k in expected])
+            for kpv, expected_kpv in zip(kpvs, expected):
+                self.assertAlmostEqual(kpv.value, expected_kpv.value,
+                                       places=4)
+
+
 class TestNodeTypeAbbreviation(unittest.TestCase):
     def test_node_type_abbr_attribute(self):
         class NAME(DerivedParameterNode):
@@ -0,0 +1,233 @@
+import h5py
+import numpy as np
+import os
+import shutil
+import tempfile
+import unittest
+
+from mock import Mock
+
+from hdfaccess.parameter import MappedArray
+
+from analysis_engine.node import M, P
+from analysis_engine.parameter_store import ParameterStore, parameter_signature
+
+
+def write_series(h5, name, data, mask, **attrs):
+    '''
+    Write a parameter to an h5py file in the layout of hdfaccess.
+    '''
+    if name in h5['series']:
+        del h5['series'][name]
+    group = h5['series'].create_group(name)
+    group.create_dataset('data', data=data, compression='gzip')
+    group.create_dataset('mask', data=mask, compression='gzip')
+    for key, value in attrs.items():
+        group.attrs[key] = value
+
+
+class TestParameterSignature(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.h5 = h5py.File(os.path.join(self.temp_dir, 'flight.hdf5'), 'w')
+        self.h5.create_group('series')
+        write_series(self.h5, 'Airspeed', np.arange(10.0), np.zeros(10, bool),
+                     frequency=1.0)
+        self.hdf = Mock()
+        self.hdf.hdf = self.h5
+
+    def tearDown(self):
+        self.h5.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_parameter_signature(self):
+        signature = parameter_signature(self.hdf, 'Airspeed')
+        # Writing other parameters and attributes does not change it.
+        write_series(self.h5, 'Airspeed Derived', np.arange(10.0),
+                     np.zeros(10, bool), frequency=1.0)
+        self.h5.attrs['dependency_tree'] = '{}'
+        self.assertEqual(parameter_signature(self.hdf, 'Airspeed'), signature)
+        self.h5['series']['Airspeed'].attrs['frequency'] = 2.0
+        self.assertNotEqual(parameter_signature(self.hdf, 'Airspeed'),
+                            signature)
+        write_series(self.h5, 'Airspeed', np.arange(20.0), np.zeros(20, bool),
+                     frequency=1.0)
+        self.assertNotEqual(parameter_signature(self.hdf, 'Airspeed'),
+                            signature)
+        self.assertRaises(KeyError, parameter_signature, self.hdf, 'Heading')
+
+    def test_parameter_signature_rewritten(self):
+        # Data rewritten in place keeps its shape, dtype and storage size.
+        self.h5['series'].create_group('Heading').create_dataset(
+            'data', data=np.arange(10.0))
+        signature = parameter_signature(self.hdf, 'Heading')
+        self.h5['series']['Heading']['data'][...] = np.arange(10.0)[::-1]
+        self.assertNotEqual(parameter_signature(self.hdf, 'Heading'),
+                            signature)
+
+
+class TestParameterStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.store = ParameterStore(self.temp_dir)
+
+    def tearDown(self):
+        self.store.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def test_save_load(self):
+        array = np.ma.array([1.0, 2.0, 3.0, 4.0], mask=[0, 1, 0, 0])
+        self.store.save(P('Airspeed', array, frequency=2, offset=0.25))
+        self.assertTrue('Airspeed' in self.store)
+        self.assertEqual(self.store.keys(), ['Airspeed'])
+        param = self.store.load('Airspeed')
+        self.assertEqual(param.name, 'Airspeed')
+        self.assertEqual(param.frequency, 2)
+        self.assertEqual(param.offset, 0.25)
+        self.assertEqual(param.array.tolist(), [1.0, None, 3.0, 4.0])
+        self.assertTrue(isinstance(param.array.data, np.memmap))
+
+    def test_save_load_nomask(self):
+        self.store.save(P('Altitude STD', np.ma.arange(5)))
+        param = self.store.load('Altitude STD')
+        self.assertEqual(param.array.tolist(), [0, 1, 2, 3, 4])
+        self.assertFalse(np.ma.getmaskarray(param.array).any())
+
+    def test_save_replaces(self):
+        self.store.save(P('Airspeed', np.ma.arange(5)))
+        self.store.save(P('Airspeed', np.ma.array([7, 8], mask=[1, 0])))
+        self.assertEqual(self.store.load('Airspeed').array.tolist(), [None, 8])
+
+    def test_save_load_multistate(self):
+        values_mapping = {0: '-', 1: 'Down'}
+        array = MappedArray([0, 1, 1, 0], mask=[0, 0, 1, 0],
+                            values_mapping=values_mapping)
+        self.store.save(M('Gear Down', array, values_mapping=values_mapping))
+        param = self.store.load('Gear Down')
+        self.assertTrue(isinstance(param, M))
+        self.assertEqual(param.values_mapping, values_mapping)
+        self.assertEqual(param.array.raw.tolist(), [0, 1, None, 0])
+        self.assertEqual(param.array[1], 'Down')
+
+    def test_load_copy_on_write(self):
+        self.store.save(P('Airspeed', np.ma.arange(5)))
+        param = self.store.load('Airspeed')
+        param.array[0] = 10
+        param.array[1] = np.ma.masked
+        self.assertEqual(param.array.tolist(), [10, None, 2, 3, 4])
+        self.assertEqual(self.store.load('Airspeed').array.tolist(),
+                         [0, 1, 2, 3, 4])
+
+    def test_load_missing(self):
+        self.assertRaises(KeyError, self.store.load, 'Airspeed')
+
+    def test_get_param(self):
+        hdf = Mock()
+        hdf.get_param.return_value = P('Airspeed', np.ma.arange(3),
+                                       frequency=4)
+        param = self.store.get_param(hdf, 'Airspeed')
+        self.assertEqual(param.array.tolist(), [0, 1, 2])
+        self.assertEqual(param.frequency, 4)
+        param = self.store.get_param(hdf, 'Airspeed')
+        hdf.get_param.assert_called_once_with('Airspeed', valid_only=True)
+
+    def test_get_param_missing(self):
+        hdf = Mock()
+        hdf.get_param.side_effect = KeyError('Airspeed')
+        self.assertRaises(KeyError, self.store.get_param, hdf, 'Airspeed')
+        self.assertFalse('Airspeed' in self.store)
+
+    def test_close_removes(self):
+        self.store.save(P('Airspeed', np.ma.arange(3)))
+        self.store.close()
+        self.assertFalse(os.path.exists(self.temp_dir))
+
+
+class TestParameterStoreCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, 'flight.hdf5.cache')
+        self.h5 = h5py.File(os.path.join(self.temp_dir, 'flight.hdf5'), 'w')
+        self.h5.create_group('series')
+        write_series(self.h5, 'Airspeed', [1, 2, 3], [0, 1, 0],
+                     frequency=2.0, supf_offset=0.5)
+        write_series(self.h5, 'Gear Down', [0, 1, 1], [0, 0, 0],
+                     frequency=1.0, supf_offset=0.0)
+        self.hdf = Mock()
+        self.hdf.hdf = self.h5
+        values_mapping = {0: '-', 1: 'Down'}
+        params = {
+            'Airspeed': P('Airspeed', np.ma.array([1, 2, 3], mask=[0, 1, 0]),
+                          frequency=2, offset=0.5),
+            'Gear Down': M('Gear Down', MappedArray(
+                [0, 1, 1], values_mapping=values_mapping),
+                values_mapping=values_mapping),
+        }
+        self.hdf.get_param.side_effect = lambda name, valid_only: params[name]
+
+    def tearDown(self):
+        self.h5.close()
+        shutil.rmtree(self.temp_dir, ignore_errors=True)
+
+    def process(self):
+        '''
+        Use the parameters as process_flight does, writing derived parameters
+        and attributes to the HDF file.
+        '''
+        store = ParameterStore(self.path, keep_source=True)
+        airspeed = store.get_param(self.hdf, 'Airspeed')
+        gear_down = store.get_param(self.hdf, 'Gear Down')
+        derived = P('Airspeed Derived', np.ma.arange(3))
+        store.save(derived)
+        self.assertEqual(
+            store.get_param(self.hdf, 'Airspeed Derived').array.tolist(),
+            [0, 1, 2])
+        write_series(self.h5, 'Airspeed Derived', np.arange(3),
+                     np.zeros(3, bool), frequency=1.0)
+        self.h5.attrs['dependency_tree'] = '{}'
+        self.h5.attrs['analysis_version'] = '1'
+        store.close()
+        return airspeed, gear_down
+
+    def test_reuse(self):
+        self.process()
+        self.assertEqual(self.hdf.get_param.call_count, 2)
+
+        airspeed, gear_down = self.process()
+        # The second run is read from the cache.
+        self.assertEqual(self.hdf.get_param.call_count, 2)
+        self.assertEqual(airspeed.array.tolist(), [1, None, 3])
+        self.assertEqual(airspeed.frequency, 2)
+        self.assertEqual(airspeed.offset, 0.5)
+        self.assertTrue(isinstance(airspeed.array.data, np.memmap))
+        self.assertEqual(gear_down.values_mapping, {0: '-', 1: 'Down'})
+        self.assertEqual(gear_down.array.raw.tolist(), [0, 1, 1])
+        # Only the arrays of parameters from the source file remain.
+        self.assertEqual(len(os.listdir(self.path)), 4)
+
+    def test_parameter_changed(self):
+        self.process()
+        write_series(self.h5, 'Airspeed', [1, 2, 3, 4], [0, 0, 0, 0],
+                     frequency=2.0, supf_offset=0.5)
+        self.process()
+        self.assertEqual(
+            [call[0][0] for call in self.hdf.get_param.call_args_list],
+            ['Airspeed', 'Gear Down', 'Airspeed'])
+
+    def test_parameter_rewritten(self):
+        self.process()
+        self.h5['series']['Airspeed']['data'][...] = [3, 2, 1]
+        self.process()
+        self.assertEqual(
+            [call[0][0] for call in self.hdf.get_param.call_args_list],
+            ['Airspeed', 'Gear Down', 'Airspeed'])
+
+    def test_parameter_invalid(self):
+        self.process()
+        self.h5['series']['Airspeed'].attrs['invalid'] = 1
+        self.hdf.get_param.side_effect = KeyError('Airspeed')
+        store = ParameterStore(self.path, keep_source=True)
+        self.assertRaises(KeyError, store.get_param, self.hdf, 'Airspeed')
+        self.assertFalse('Airspeed' in store)
+        self.assertTrue('Gear Down' in store)
+        store.close()
@@ -1,5 +1,30 @@
+import mock
+import numpy as np
+import os
+import shutil
+import tempfile
 import unittest
 
+from datetime import datetime
+from mock import Mock
+
+from hdfaccess.file import hdf_file
+from hdfaccess.parameter import MappedArray
+
+from flightdatautilities import units as ut
+
+from analysis_engine import hooks, settings
+from analysis_engine.dependency_graph import dependency_order
+from analysis_engine.library import max_value, min_value, runs_of_ones
+from analysis_engine.node import (DerivedParameterNode, KeyPointValueNode, M,
+                                  MultistateDerivedParameterNode, NodeManager,
+                                  P)
+from analysis_engine.process_flight import (DerivedParameterWriter,
+                                            derive_parameters, process_flight)
+
+test_data_path = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                              'test_data')
+
 
 class TestProcessFlight(unittest.TestCase):
 
@@ -15,3 +40,203 @@ class TestProcessFlight(unittest.TestCase):
         '''
         self.assertTrue(False, msg='Test not implemented.')
 
+
+
+class TestDerivedParameterWriter(unittest.TestCase):
+    def setUp(self):
+        self.hdf = Mock(spec=['set_param'])
+
+    def test_batch(self):
+        writer = DerivedParameterWriter(self.hdf, batch_size=2)
+        airspeed = P('Airspeed', np.ma.arange(3))
+        writer.set_param(airspeed)
+        self.assertFalse(self.hdf.set_param.called)
+        self.assertTrue('Airspeed' in writer)
+        writer.set_param(P('Heading', np.ma.arange(3)))
+        self.assertEqual(
+            [c[0][0].name for c in self.hdf.set_param.call_args_list],
+            ['Airspeed', 'Heading'])
+        self.assertFalse('Airspeed' in writer)
+        writer.set_param(P('Altitude STD', np.ma.arange(3)))
+        self.assertEqual(self.hdf.set_param.call_count, 2)
+        writer.flush()
+        self.assertEqual(self.hdf.set_param.call_count, 3)
+        writer.flush()
+        self.assertEqual(self.hdf.set_param.call_count, 3)
+
+    def test_get_param(self):
+        writer = DerivedParameterWriter(self.hdf, batch_size=10)
+        writer.set_param(P('Airspeed', np.ma.array([1, 2, 3], mask=[0, 1, 0]),
+                           frequency=2, offset=0.5))
+        values_mapping = {0: '-', 1: 'Down'}
+        writer.set_param(M('Gear Down', MappedArray(
+            [0, 1, 1], values_mapping=values_mapping),
+            values_mapping=values_mapping))
+        airspeed = writer.get_param('Airspeed')
+        self.assertEqual(airspeed.array.tolist(), [1, None, 3])
+        self.assertEqual(airspeed.frequency, 2)
+        self.assertEqual(airspeed.offset, 0.5)
+        # Modifying the array does not modify the queued parameter.
+        airspeed.array[0] = 10
+        self.assertEqual(writer.get_param('Airspeed').array.tolist(),
+                         [1, None, 3])
+        gear_down = writer.get_param('Gear Down')
+        self.assertTrue(isinstance(gear_down, M))
+        self.assertEqual(gear_down.array.raw.tolist(), [0, 1, 1])
+        self.assertEqual(gear_down.values_mapping, values_mapping)
+        self.assertRaises(KeyError, writer.get_param, 'Heading')
+
+    def test_dataset_kwargs(self):
+        class HDF(object):
+            DATASET_KWARGS = {'compression': 'gzip', 'compression_opts': 6}
+
+            def __init__(self):
+                self.written = []
+
+            def set_param(self, param):
+                self.written.append(dict(self.DATASET_KWARGS))
+
+        hdf = HDF()
+        writer = DerivedParameterWriter(
+            hdf, dataset_kwargs={'compression': 'lzf', 'chunks': True})
+        writer.set_param(P('Airspeed', np.ma.arange(3)))
+        self.assertEqual(hdf.written, [{'compression': 'lzf',
+                                        'chunks': True}])
+        self.assertEqual(hdf.DATASET_KWARGS,
+                         {'compression': 'gzip', 'compression_opts': 6})
+        self.assertFalse('DATASET_KWARGS' in hdf.__dict__)
+        # Dataset options are not silently ignored by versions of hdfaccess
+        # which do not support them.
+        del HDF.DATASET_KWARGS
+        self.assertRaises(ValueError, DerivedParameterWriter, hdf,
+                          dataset_kwargs={'compression': 'lzf'})
+        DerivedParameterWriter(hdf, dataset_kwargs={})
+
+
+class AirspeedMaximum(KeyPointValueNode):
+    def derive(self, airspeed=P('Airspeed')):
+        self.create_kpv(*max_value(airspeed.array))
+
+
+class TestProcessFlightCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.hdf_path = os.path.join(self.temp_dir, 'flight.hdf5')
+        shutil.copy(os.path.join(test_data_path, 'airspeed_reference.hdf5'),
+                    self.hdf_path)
+        self.settings = (settings.CACHE_LFL_PARAMETERS,
+                         hooks.PRE_FLIGHT_ANALYSIS)
+        settings.CACHE_LFL_PARAMETERS = True
+        hooks.PRE_FLIGHT_ANALYSIS = None
+
+    def tearDown(self):
+        settings.CACHE_LFL_PARAMETERS, hooks.PRE_FLIGHT_ANALYSIS = \
+            self.settings
+        shutil.rmtree(self.temp_dir)
+
+    @mock.patch('analysis_engine.process_flight.get_derived_nodes')
+    def test_reprocess(self, get_derived_nodes):
+        get_derived_nodes.return_value = {'Airspeed Maximum': AirspeedMaximum}
+        aircraft_info = {'Tail Number': 'G-ABCD', 'Family': 'B737 Classic'}
+
+        def process():
+            return process_flight(self.hdf_path, 'G-ABCD',
+                                  aircraft_info=aircraft_info,
+                                  requested=['Airspeed Maximum'],
+                                  include_flight_attributes=False)
+
+        with mock.patch.object(hdf_file, 'get_param', autospec=True,
+                               side_effect=hdf_file.get_param) as get_param:
+            first = process()
+            self.assertEqual(get_param.call_count, 1)
+            self.assertTrue(os.path.isdir(self.hdf_path + '.cache'))
+            # The file was modified by processing, but Airspeed is loaded
+            # from the cache.
+            second = process()
+            self.assertEqual(get_param.call_count, 1)
+        self.assertEqual([(kpv.index, kpv.value) for kpv in second['kpv']],
+                         [(kpv.index, kpv.value) for kpv in first['kpv']])
+
+
+class AirspeedCorrected(DerivedParameterNode):
+    units = ut.KT
+
+    def derive(self, airspeed=P('Airspeed')):
+        self.array = airspeed.array * 1.0123 + 0.321
+
+
+class AirspeedFast(MultistateDerivedParameterNode):
+    values_mapping = {0: '-', 1: 'Fast'}
+
+    def derive(self, airspeed=P('Airspeed Corrected')):
+        self.array = np.ma.where(airspeed.array > 100, 'Fast', '-')
+
+
+class AirspeedCorrectedWhileFastMax(KeyPointValueNode):
+    def derive(self, airspeed=P('Airspeed Corrected'),
+               fast=M('Airspeed Fast')):
+        self.create_kpvs_within_slices(
+            airspeed.array, runs_of_ones(fast.array == 'Fast'), max_value)
+
+
+class AirspeedCorrectedMin(KeyPointValueNode):
+    def derive(self, airspeed=P('Airspeed Corrected')):
+        self.create_kpv(*min_value(airspeed.array))
+
+
+class AirspeedFastWeighted(KeyPointValueNode):
+    def derive(self, fast=M('Airspeed Fast')):
+        weights = fast.array.raw.copy()
+        # Overflows a compact int8 array unless it is widened.
+        weights[weights == 1] = 1000
+        self.create_kpv(*max_value(weights))
+
+
+class TestDeriveParametersCompact(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.settings = (settings.COMPACT_DERIVED_PARAMETERS,
+                         settings.DERIVED_PARAMETER_WRITE_BATCH_SIZE)
+
+    def tearDown(self):
+        settings.COMPACT_DERIVED_PARAMETERS, \
+            settings.DERIVED_PARAMETER_WRITE_BATCH_SIZE = self.settings
+        shutil.rmtree(self.temp_dir)
+
+    def derive(self, compact, batch_size):
+        settings.COMPACT_DERIVED_PARAMETERS = compact
+        settings.DERIVED_PARAMETER_WRITE_BATCH_SIZE = batch_size
+        hdf_path = os.path.join(self.temp_dir, 'flight.hdf5')
+        shutil.copy(os.path.join(test_data_path, 'airspeed_reference.hdf5'),
+                    hdf_path)
+        derived_nodes = {
+            'Airspeed Corrected': AirspeedCorrected,
+            'Airspeed Fast': AirspeedFast,
+            'Airspeed Corrected While Fast Max':
+            AirspeedCorrectedWhileFastMax,
+            'Airspeed Corrected Min': AirspeedCorrectedMin,
+            'Airspeed Fast Weighted': AirspeedFastWeighted,
+        }
+        requested = [name for name in derived_nodes
+                     if issubclass(derived_nodes[name], KeyPointValueNode)]
+        with hdf_file(hdf_path) as hdf:
+            node_mgr = NodeManager(
+                datetime(2013, 6, 1), hdf.duration, hdf.valid_param_names(),
+                requested, [], derived_nodes, {}, {})
+            process_order, _ = dependency_order(node_mgr, draw=False)
+            kpvs = derive_parameters(hdf, node_mgr, process_order)[1]
+        return sorted(kpvs, key=lambda k: (k.name, k.index))
+
+    def test_kpvs(self):
+        expected = self.derive(False, 1)
+        self.assertEqual(
+            [k.value for k in expected if k.name == 'Airspeed Fast Weighted'],
+            [1000])
+        for batch_size in (1, 100):
+            # Dependencies are read from the HDF file or the write batch.
+            kpvs = self.derive(True, batch_size)
+            self.assertEqual([(k.name, k.index) for k in kpvs],
+                             [(k.name, k.index) for k in expected])
+            for kpv, expected_kpv in zip(kpvs, expected):
+                self.assertAlmostEqual(kpv.value, expected_kpv.value,
+                                       places=4)
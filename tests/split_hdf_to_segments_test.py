@@ -3,15 +3,21 @@ import numpy as np
 import os.path
 import unittest
 
-from datetime import datetime
+from datetime import datetime, timedelta
 
+from analysis_engine import settings
 from analysis_engine.split_hdf_to_segments import (
     _calculate_start_datetime,
+    _chain_fallback_dts,
     _get_normalised_split_params,
     _mask_invalid_years,
+    _slice_segment_params,
     append_segment_info,
+    split_hdf_to_segments,
     split_segments,
+    split_segments_streaming,
     TimebaseError)
+from analysis_engine.library import hash_array, runs_of_ones
 from analysis_engine.node import P,  Parameter
 
 from hdfaccess.file import hdf_file
@@ -369,6 +375,57 @@ class TestSplitSegments(unittest.TestCase):
         # the engine only parameters would split too early, during the taxi_in
         self.assertEqual(np.ma.argmin(norm_array), 715)
 
+    def test__get_normalised_split_params_chunked(self):
+        eng_1_n1 = np.ma.array([0, 50, 100, 100, 50, 0], dtype=float)
+        eng_1_n1[1] = np.ma.masked
+        eng_2_n1 = np.ma.array([0, 100, 50, 100, 50, 0], dtype=float)
+        eng_2_n1[1] = np.ma.masked
+        groundspeed = np.ma.array([0, 0, 10, 100, 10, 0], dtype=float)
+        arrays = {
+            'Eng (1) N1': eng_1_n1,
+            'Eng (2) N1': eng_2_n1,
+            'Groundspeed': groundspeed,
+        }
+        hdf = mock.MagicMock()
+        hdf.__getitem__.side_effect = \
+            lambda key: Parameter(key, array=arrays[key].copy(), frequency=2)
+        expected = np.ma.array([0, 0, 0.5333333333333333, 1, 0.3666666666666667, 0])
+        for chunk_size in (1, 4, 6, 100):
+            norm_array, freq = _get_normalised_split_params(
+                hdf, chunk_size=chunk_size)
+            self.assertEqual(freq, 2)
+            self.assertEqual(norm_array.tolist(), expected.tolist())
+        hdf.__getitem__.side_effect = KeyError
+        self.assertEqual(_get_normalised_split_params(hdf), (None, None))
+
+    def test_split_segments_streaming(self):
+        for filename in ('split_segments_1.hdf5', 'split_segments_2.hdf5',
+                         'split_segments_3.hdf5',
+                         'split_segments_multiple_types.hdf5'):
+            temp_path = copy_file(os.path.join(test_data_path, filename))
+            hdf = hdf_file(temp_path)
+            expected = split_segments(hdf)
+            airspeed = hdf['Airspeed']
+            # Windows smaller than the slow slices and than the whole data.
+            for window_duration in (64, 4096):
+                results = split_segments_streaming(
+                    hdf, window_duration=window_duration)
+                self.assertEqual(
+                    [(segment_type, segment_slice) for
+                     segment_type, segment_slice, _info in results],
+                    expected, msg=filename)
+                for _segment_type, segment_slice, (go_fast_index,
+                                                   airspeed_hash) in results:
+                    array = airspeed.array[
+                        int(segment_slice.start * airspeed.frequency):
+                        int(segment_slice.stop * airspeed.frequency)]
+                    self.assertEqual(go_fast_index, np.ma.where(
+                        array > settings.AIRSPEED_THRESHOLD)[0][0])
+                    self.assertEqual(airspeed_hash, hash_array(
+                        array.data,
+                        runs_of_ones(array.data > settings.AIRSPEED_THRESHOLD),
+                        settings.AIRSPEED_HASH_MIN_SAMPLES))
+
 
 class mocked_hdf(object):
     def __init__(self, path=None):
@@ -496,6 +553,55 @@ class TestSegmentInfo(unittest.TestCase):
         self.assertEqual(seg.stop_dt, datetime(2012,12,25,0,0,50)) # +50 seconds of airspeed
     
     
+    @mock.patch('analysis_engine.settings.MAX_TIMEBASE_AGE', None)
+    @mock.patch('analysis_engine.split_hdf_to_segments.sha_hash_file')
+    @mock.patch('analysis_engine.split_hdf_to_segments.hdf_file',
+                new_callable=mocked_hdf)
+    def test_append_segment_info_segment_params(self, hdf_file_patch,
+                                                sha_hash_file_patch):
+        expected = append_segment_info('fast', 'START_AND_STOP',
+                                       slice(10, 1000), 4)
+        hdf = mocked_hdf()('fast')
+        segment_params = dict(
+            (name, hdf[name]) for name in
+            ('Airspeed', 'Year', 'Month', 'Day', 'Hour', 'Minute', 'Second'))
+        seg = append_segment_info('fast', 'START_AND_STOP', slice(10, 1000),
+                                  4, segment_params=segment_params)
+        self.assertEqual(seg, expected)
+
+    @mock.patch('analysis_engine.settings.MAX_TIMEBASE_AGE', None)
+    @mock.patch('analysis_engine.split_hdf_to_segments.sha_hash_file')
+    @mock.patch('analysis_engine.split_hdf_to_segments.hdf_file',
+                new_callable=mocked_hdf)
+    def test_append_segment_info_airspeed_info(self, hdf_file_patch,
+                                               sha_hash_file_patch):
+        expected = append_segment_info('fast', 'START_AND_STOP',
+                                       slice(10, 1000), 4)
+        seg = append_segment_info('fast', 'START_AND_STOP', slice(10, 1000),
+                                  4, airspeed_info=(100, 'ABCDEFG'))
+        self.assertEqual(seg.hash, 'ABCDEFG')
+        self.assertEqual(seg.go_fast_dt, datetime(2012, 12, 25, 0, 1, 40))
+        self.assertEqual(seg.start_dt, expected.start_dt)
+        self.assertEqual(seg.stop_dt, expected.stop_dt)
+
+    def test_slice_segment_params(self):
+        params = {
+            'Airspeed': P('Airspeed', np.ma.arange(20), frequency=2),
+            'Year': P('Year', np.ma.arange(5), frequency=0.25, offset=0.5),
+        }
+        segment_params = _slice_segment_params(params, slice(4, 8))
+        self.assertEqual(segment_params['Airspeed'].array.tolist(),
+                         range(8, 16))
+        self.assertEqual(segment_params['Airspeed'].frequency, 2)
+        self.assertEqual(segment_params['Year'].array.tolist(), [1])
+        self.assertEqual(segment_params['Year'].offset, 0.5)
+        segment_params = _slice_segment_params(params, slice(8, None))
+        self.assertEqual(segment_params['Airspeed'].array.tolist(),
+                         range(16, 20))
+        # The original arrays are not modified through the segment.
+        segment_params['Airspeed'].array[0] = np.ma.masked
+        self.assertEqual(np.ma.count(params['Airspeed'].array), 20)
+
     @mock.patch('analysis_engine.split_hdf_to_segments.sha_hash_file')
     @mock.patch('analysis_engine.split_hdf_to_segments.hdf_file',
                 new_callable=mocked_hdf)  
@@ -606,4 +712,41 @@ class TestSegmentInfo(unittest.TestCase):
         # result is a year behind the fallback datetime, even though the
         # fallback Year was used.
         self.assertEqual(res.year, datetime.now().year -1)
-        #self.assertEqual(res, datetime(2012,6,01,11,11,1))
\ No newline at end of file
+        #self.assertEqual(res, datetime(2012,6,01,11,11,1))
+
+
+class TestSplitHdfToSegments(unittest.TestCase):
+    def test_chain_fallback_dts(self):
+        self.assertEqual(_chain_fallback_dts(None, [10, 20]), [None, None])
+        dt = datetime(2012, 12, 25)
+        self.assertEqual(_chain_fallback_dts(dt, [10, 20, 30]),
+                         [dt, dt + timedelta(seconds=10),
+                          dt + timedelta(seconds=30)])
+
+    @mock.patch('analysis_engine.settings.MAX_TIMEBASE_AGE', None)
+    @mock.patch('analysis_engine.split_hdf_to_segments.split_segments')
+    @mock.patch('analysis_engine.split_hdf_to_segments.validate_aircraft')
+    @mock.patch('analysis_engine.split_hdf_to_segments.write_segment')
+    @mock.patch('analysis_engine.split_hdf_to_segments.sha_hash_file')
+    @mock.patch('analysis_engine.split_hdf_to_segments.hdf_file',
+                new_callable=mocked_hdf)
+    def test_workers(self, hdf_file_patch, sha_hash_file_patch,
+                     write_segment_patch, validate_aircraft_patch,
+                     split_segments_patch):
+        hdf_file_patch.superframe_present = False
+        sha_hash_file_patch.return_value = 'ABCDEFG'
+        split_segments_patch.return_value = [
+            ('START_AND_STOP', slice(0, 1000)),
+            ('GROUND_ONLY', slice(1000, 1100)),
+            ('START_AND_STOP', slice(1100, 2000)),
+        ]
+        fallback_dt = datetime(2012, 12, 25)
+        serial = split_hdf_to_segments('/tmp/flight.hdf5', {},
+                                       fallback_dt=fallback_dt)
+        concurrent = split_hdf_to_segments('/tmp/flight.hdf5', {},
+                                           fallback_dt=fallback_dt, workers=2)
+        self.assertEqual([s.path for s in concurrent],
+                         ['/tmp/flight.001.hdf5', '/tmp/flight.002.hdf5',
+                          '/tmp/flight.003.hdf5'])
+        self.assertEqual([s.part for s in concurrent], [1, 2, 3])
+        self.assertEqual(concurrent, serial)
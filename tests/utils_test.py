@@ -1,3 +1,8 @@
+import h5py
+import numpy as np
+import os
+import shutil
+import tempfile
 import unittest
 
 from mock import Mock, patch
@@ -12,6 +17,7 @@ from analysis_engine.utils import (
     list_ktis,
     list_lfl_parameter_dependencies,
     list_parameters,
+    read_param_window,
     )
 
 class TestTrimmer(unittest.TestCase):
@@ -52,6 +58,52 @@ class TestTrimmer(unittest.TestCase):
         self.assertEqual(dest, strip_hdf.return_value)
 
 
+class TestReadParamWindow(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.h5 = h5py.File(os.path.join(self.temp_dir, 'flight.hdf5'), 'w')
+        series = self.h5.create_group('series')
+        airspeed = series.create_group('Airspeed')
+        airspeed.create_dataset('data', data=np.arange(20.0))
+        airspeed.create_dataset('mask', data=np.arange(20) % 5 == 0)
+        airspeed.attrs['frequency'] = 2.0
+        airspeed.attrs['supf_offset'] = 0.25
+        airspeed.attrs['values_mapping'] = 'null'
+        heading = series.create_group('Heading')
+        heading.create_dataset('data', data=np.arange(10.0))
+        heading.attrs['frequency'] = 1.0
+        heading.attrs['invalid'] = 1
+        gear = series.create_group('Gear Down')
+        gear.create_dataset('data', data=np.zeros(10, dtype=int))
+        gear.attrs['frequency'] = 1.0
+        gear.attrs['values_mapping'] = '{"0": "Up", "1": "Down"}'
+        self.hdf = Mock()
+        self.hdf.hdf = self.h5
+
+    def tearDown(self):
+        self.h5.close()
+        shutil.rmtree(self.temp_dir)
+
+    def test_read_param_window(self):
+        airspeed = read_param_window(self.hdf, 'Airspeed', 2, 4.5)
+        self.assertEqual(airspeed.name, 'Airspeed')
+        self.assertEqual(airspeed.frequency, 2.0)
+        self.assertEqual(airspeed.offset, 0.25)
+        self.assertEqual(airspeed.array.tolist(),
+                         [4.0, None, 6.0, 7.0, 8.0])
+        airspeed = read_param_window(self.hdf, 'Airspeed', 9)
+        self.assertEqual(airspeed.array.tolist(), [18.0, 19.0])
+        heading = read_param_window(self.hdf, 'Heading', 8)
+        self.assertEqual(heading.array.tolist(), [8.0, 9.0])
+        self.assertEqual(heading.offset, 0)
+        self.assertRaises(KeyError, read_param_window, self.hdf, 'Heading',
+                          valid_only=True)
+        self.assertRaises(KeyError, read_param_window, self.hdf, 'Pitch')
+
+    def test_read_param_window_multistate(self):
+        self.assertRaises(ValueError, read_param_window, self.hdf,
+                          'Gear Down', 0, 5)
+
 
 class TestGetNames(unittest.TestCase):
     def test_list_parameters(self):